@@ -1,9 +1,20 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set the variables
         file_path: str = params.get("file_path")
         sheet_name: str = params.get("sheet_name")
@@ -33,12 +44,8 @@ def main(params: dict):
             return "Error: an input param is missing"
 
         ##Read the book and load it
-        df: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
-        list_df: pd.DataFrame = pd.read_excel(
-            list_file, sheet_name=sheet_name_list, engine="openpyxl"
-        )
+        df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
+        list_df: pd.DataFrame = load_excel(list_file, sheet_name=sheet_name_list)
 
         ##Apply validation
         df["is_valid"] = df.apply(
@@ -58,13 +65,12 @@ def main(params: dict):
         if not need_iaxis:
             if not filtered_file.empty:
                 ##Get the coordinates
-                filtered_file["COORDINATE_1"] = filtered_file.apply(
-                    lambda row: f"{get_excel_column_name(col_idx1 + 1)}{row.name + 2}",
-                    axis=1,
-                )
-                filtered_file["COORDINATE_2"] = filtered_file.apply(
-                    lambda row: f"{get_excel_column_name(col_idx2 + 1)}{row.name + 2}",
-                    axis=1,
+                add_coordinates(
+                    filtered_file,
+                    {
+                        "COORDINATE_1": col_idx1 + 1,
+                        "COORDINATE_2": col_idx2 + 1,
+                    },
                 )
                 ##Store the inconsistencies into the inconsistencies file
                 return append_inconsistencias(
@@ -78,13 +84,8 @@ def main(params: dict):
             new_df = df[df.iloc[:, col_idx1].isin(inconsistencies_col)].copy()
             ##Get the coordinates
             if not new_df.empty:
-                new_df["COORDINATE_1"] = new_df.apply(
-                    lambda row: f"{get_excel_column_name(col_idx1 + 1)}{row.name + 2}",
-                    axis=1,
-                )
-                new_df["COORDINATE_2"] = new_df.apply(
-                    lambda row: f"{get_excel_column_name(col_idx2 + 1)}{row.name + 2}",
-                    axis=1,
+                add_coordinates(
+                    new_df, {"COORDINATE_1": col_idx1 + 1, "COORDINATE_2": col_idx2 + 1}
                 )
                 ##Store the inconsistencies into the inconsistencies file
                 append_inconsistencias(inconsistencies_file, new_sheet, new_df)
@@ -95,15 +96,6 @@ def main(params: dict):
         return f"Error: {e}"
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 def validate(
     key: str, value: str, validated: dict[str], exception_list: list[str]
 ) -> bool:
@@ -119,16 +111,11 @@ def validate(
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
     if os.path.exists(file_path):
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=True)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=False, sheet_name=new_sheet)
-            return "Inconsistencias registradas correctamente"
+        inconsistency_sink(file_path).add(new_sheet, data_frame)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
 
 
 if __name__ == "__main__":
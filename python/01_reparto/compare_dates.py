@@ -1,8 +1,19 @@
 import pandas as pd #type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 def main(params):
   try:
+    configure_sinks(params)
     ##Set variables
     sheet_name = params.get("sheet_name")
     file_path = params.get("file_name") 
@@ -16,7 +27,7 @@ def main(params):
       return "Error: an input param is missing"
 
     ##Load workbook
-    df: pd.DataFrame = pd.read_excel(file_path, engine="openpyxl", sheet_name=sheet_name)
+    df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
     ## Convert both columns to datetime to ensure comparison works
     df.iloc[:, col_idx1] = pd.to_datetime(df.iloc[:, col_idx1], errors='coerce')  # Convert to datetime
@@ -36,37 +47,22 @@ def main(params):
 
     ##Validate if the file is empty and save depends on that
     if not filtered_file.empty:
-      filtered_file['COORDENADAS_1'] = filtered_file.apply(
-        lambda row: f"{get_excel_column_name(col_idx1 + 1)}{row.name + 2}", axis=1
-      )
-      filtered_file['COORDENADAS_2'] = filtered_file.apply(
-        lambda row: f"{get_excel_column_name(col_idx2 + 1)}{row.name + 2}", axis=1
+      add_coordinates(
+          filtered_file, {'COORDENADAS_1': col_idx1 + 1, 'COORDENADAS_2': col_idx2 + 1}
       )
 
       new_sheet_name = "Fechas"
-      if os.path.exists(inconsistencias_file):
-        with pd.ExcelFile(inconsistencias_file, engine="openpyxl") as xls:
-          if new_sheet_name in xls.sheet_names:
-            existing_df = pd.read_excel(xls, sheet_name=new_sheet_name, engine="openpyxl")
-            filtered_file = pd.concat([existing_df, filtered_file], ignore_index=True)
-
-      with pd.ExcelWriter(inconsistencias_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        filtered_file.to_excel(writer, sheet_name=new_sheet_name, index=False)
-        return "Inconsistencias registradas correctamente"
+      inconsistency_sink(inconsistencias_file).add(new_sheet_name, filtered_file)
+      error = flush_inconsistencies()
+      if error is not None:
+        return f"Error: {error}"
+      return "Inconsistencias registradas correctamente"
     else:
       return f"No hay inconsistencias en las columnas {col_idx1} vs {col_idx2}"
 
   except Exception as e:
     return f"Error: {e}"
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ''
-    while n > 0:
-        n, remainder = divmod(n-1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
 def less(df: pd.DataFrame, col_idx1: int, col_idx2: int):
   df["VALIDACION_FECHA"]= df.iloc[:, col_idx1] < df.iloc[:, col_idx2]
   return df[~df["VALIDACION_FECHA"]].copy()
@@ -1,9 +1,20 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 
 def main(params: dict) -> None:
     try:
+        configure_sinks(params)
         ##Set initial variables
         file_path: str = params.get("file_path")
         inconsistencies_file: str = params.get("inconsistencias_file")
@@ -29,15 +40,9 @@ def main(params: dict) -> None:
             return "ERROR: an input required param is missing"
 
         ##Read work books
-        file_df: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
-        list_df: pd.DataFrame = pd.read_excel(
-            list_file, sheet_name=sheet_list, engine="openpyxl"
-        )
-        except_df: pd.DataFrame = pd.read_excel(
-            list_file, sheet_name=except_sheet_name, engine="openpyxl"
-        )
+        file_df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
+        list_df: pd.DataFrame = load_excel(list_file, sheet_name=sheet_list)
+        except_df: pd.DataFrame = load_excel(list_file, sheet_name=except_sheet_name)
 
         ##Validate and cross depends on the "Poliza" number
         col_file_1_name = file_df.columns[col_idx]
@@ -61,12 +66,8 @@ def main(params: dict) -> None:
         ].copy()
 
         if not inconsistencies.empty:
-            inconsistencies["COORDINATE_1"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(col_idx + 1)}{row.name + 2}",
-                axis=1,
-            )
-            inconsistencies["COORDINATE_2"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(17)}{row.name + 2}", axis=1
+            add_coordinates(
+                inconsistencies, {"COORDINATE_1": col_idx + 1, "COORDINATE_2": 17}
             )
             return append_inconsistencias(
                 inconsistencies_file, "NombreEstandarizados", inconsistencies
@@ -79,25 +80,11 @@ def main(params: dict) -> None:
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
     if os.path.exists(file_path):
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=True)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=False, sheet_name=new_sheet)
-            return "Inconsistencias registradas correctamente"
-
-
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
+        inconsistency_sink(file_path).add(new_sheet, data_frame)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
 
 
 if __name__ == "__main__":
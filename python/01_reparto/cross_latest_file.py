@@ -1,10 +1,21 @@
 import pandas as pd  # type: ignore
 from datetime import datetime
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import DateRange, load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 
 def main(params: dict) -> None:
     try:
+        configure_sinks(params)
         ##Set local variables
         path_file: str = params.get("file_path")
         sheet_name: str = params.get("sheet_name")
@@ -33,24 +44,17 @@ def main(params: dict) -> None:
         cut = pd.to_datetime(cut_date, format="%d/%m/%Y")
         cut_off_date = cut - pd.DateOffset(months=1)
 
-        ##Load the work books needed
+        ##Load the work books needed, only the rows between the dates are read
+        date_range = DateRange(col_idx, initial_date, cut_off_date, "neither")
         ##Current base reparto
-        path_file_df: pd.DataFrame = pd.read_excel(
-            path_file, sheet_name=sheet_name, engine="openpyxl"
+        file_filtered: pd.DataFrame = load_excel(
+            path_file, sheet_name=sheet_name, date_range=date_range
         )
-        file_filtered: pd.DataFrame = path_file_df[
-            (path_file_df.iloc[:, col_idx] > initial_date)
-            & (path_file_df.iloc[:, col_idx] < cut_off_date)
-        ]
 
         # Base reparto latest month
-        latest_file_df: pd.DataFrame = pd.read_excel(
-            latest_file, sheet_name=sheet_latest_name, engine="openpyxl"
+        latest_filtered: pd.DataFrame = load_excel(
+            latest_file, sheet_name=sheet_latest_name, date_range=date_range
         )
-        latest_filtered: pd.DataFrame = latest_file_df[
-            (latest_file_df.iloc[:, col_idx] > initial_date)
-            & (latest_file_df.iloc[:, col_idx] < cut_off_date)
-        ]
         file_filtered: pd.DataFrame = file_filtered.iloc[:, :111]
 
         latest_filtered.columns = file_filtered.columns
@@ -104,21 +108,14 @@ def main(params: dict) -> None:
 
         if not inconsistencies.empty:
             # Add a column with Excel coordinates (e.g., A2, B3) of the inconsistent cells
-            inconsistencies["COORDENADAS_1"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(1)}{row.name + 2}",
-                axis=1,
-            )
-            inconsistencies["COORDENADAS_2"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(3)}{row.name + 2}",
-                axis=1,
-            )
-            inconsistencies["COORDENADAS_3"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(33)}{row.name + 2}",
-                axis=1,
-            )
-            inconsistencies["COORDENADAS_4"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(35)}{row.name + 2}",
-                axis=1,
+            add_coordinates(
+                inconsistencies,
+                {
+                    "COORDENADAS_1": 1,
+                    "COORDENADAS_2": 3,
+                    "COORDENADAS_3": 33,
+                    "COORDENADAS_4": 35,
+                },
             )
 
             return append_inconsistencias(
@@ -134,25 +131,11 @@ def main(params: dict) -> None:
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
     if os.path.exists(file_path):
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=True)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=False, sheet_name=new_sheet)
-            return "Inconsistencias registradas correctamente"
-
-
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
+        inconsistency_sink(file_path).add(new_sheet, data_frame)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
 
 
 if __name__ == "__main__":
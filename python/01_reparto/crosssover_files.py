@@ -1,9 +1,20 @@
 import pandas as pd #type: ignore
 import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel, load_sheets
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 def sudameris(params: dict):
     try:
+        configure_sinks(params)
         ## Set initial variables
         sudameris_bank = params.get("sudameris_bank")
         base_reparto = params.get("base_reparto")
@@ -27,12 +38,8 @@ def sudameris(params: dict):
         cut_off_date = pd.to_datetime(cut_off_date, format="%d/%m/%Y")
 
         ## Read work books
-        sudameris: pd.DataFrame = pd.read_excel(
-            sudameris_bank, sheet_name=sheet_sudameris, engine="openpyxl"
-        )
-        reparto: pd.DataFrame = pd.read_excel(
-            base_reparto, sheet_name=sheet_reparto, engine="openpyxl"
-        )
+        sudameris: pd.DataFrame = load_excel(sudameris_bank, sheet_name=sheet_sudameris)
+        reparto: pd.DataFrame = load_excel(base_reparto, sheet_name=sheet_reparto)
         
         ## Filter workbooks based on date column
         filtered_sudameris = sudameris[(sudameris.iloc[:, date_col_idx] >= initial_date) & 
@@ -58,27 +65,24 @@ def sudameris(params: dict):
         if inconsistencies.empty:
             return "All values from 'Banco Sudameris' are present in 'Base Reparto'"
         else:
-            inconsistencies['COORDENADAS'] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(vs_col + 1)}{row.name + 2}", axis=1
-            )       
+            inconsistencies['COORDENADAS'] = coordinates(
+                inconsistencies.index, vs_col + 1
+            )
             ## Create a sheet name to store the inconsistencies
             new_sheet = "BancoSudameris"
             
-            if os.path.exists(in_file):
-                with pd.ExcelFile(in_file, engine="openpyxl") as xls:
-                    if new_sheet in xls.sheet_names:
-                        existing_file = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                        inconsistencies = pd.concat([existing_file, inconsistencies], ignore_index=True)
-
-            with pd.ExcelWriter(in_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                inconsistencies.to_excel(writer, index=False, sheet_name=new_sheet)
-                return "Inconsistencies registered successfully"
+            inconsistency_sink(in_file).add(new_sheet, inconsistencies)
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"Error: {error}"
+            return "Inconsistencies registered successfully"
 
     except Exception as e:
         return f"Error: {e}"
 
 def agrario(params: dict):
     try:
+        configure_sinks(params)
         ## Set initial variables
         agrario_bank = params.get("agrario_bank")
         base_reparto = params.get("base_reparto")
@@ -103,9 +107,9 @@ def agrario(params: dict):
 
         ## Read work books
         agrario_sheets = ["DEUDORES - LINEA GENERAL", "EMPLEADOS BANCO AGRARIO", "TARJETAS  BANCO AGRARIO"]
-        data_frames = (pd.read_excel(agrario_bank, sheet_name=sheet) for sheet in agrario_sheets)
-        agrario = pd.concat(data_frames, ignore_index=True)
-        reparto = pd.read_excel(base_reparto, sheet_name=sheet_reparto, engine="openpyxl")
+        data_frames = load_sheets(agrario_bank, agrario_sheets, align=True)
+        agrario = pd.concat(data_frames.values(), ignore_index=True)
+        reparto = load_excel(base_reparto, sheet_name=sheet_reparto)
         
         ## Filter workbooks based on date column
         filtered_agrario = agrario[(agrario.iloc[:, date_col_idx] >= initial_date) & 
@@ -131,35 +135,22 @@ def agrario(params: dict):
         if inconsistencies.empty:
             return "All values from 'Banco agrario' are present in 'Base Reparto'"
         else:
-            inconsistencies['COORDENADAS'] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(vs_col + 1)}{row.name + 2}", axis=1
+            inconsistencies['COORDENADAS'] = coordinates(
+                inconsistencies.index, vs_col + 1
             )
 
             ## Create a sheet name to store the inconsistencies
             new_sheet = "BancoAgrario"
             
-            if os.path.exists(in_file):
-                with pd.ExcelFile(in_file, engine="openpyxl") as xls:
-                    if new_sheet in xls.sheet_names:
-                        existing_file = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                        inconsistencies = pd.concat([existing_file, inconsistencies], ignore_index=True)
-
-            with pd.ExcelWriter(in_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-                inconsistencies.to_excel(writer, index=False, sheet_name=new_sheet)
-                return "Inconsistencies registered successfully"
+            inconsistency_sink(in_file).add(new_sheet, inconsistencies)
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"Error: {error}"
+            return "Inconsistencies registered successfully"
 
     except Exception as e:
         return f"Error: {e}"
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ''
-    while n > 0:
-        n, remainder = divmod(n-1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 def validate_comments(string: str) -> bool:
     """This method works to validate is the input has any string character
     and know if is a comment"""
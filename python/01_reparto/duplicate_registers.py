@@ -1,9 +1,20 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 
 def main(params: dict) -> str:
     try:
+        configure_sinks(params)
         ##Set the initial variables
         file_path: str = params.get("file_path")
         sheet_name: str = params.get("sheet_name")
@@ -16,12 +27,8 @@ def main(params: dict) -> str:
             return "ERROR: an input required param is missing"
 
         ##Read the work books
-        base: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
-        exception_df = pd.read_excel(
-            exception_file, sheet_name=sheet_exception, engine="openpyxl"
-        )
+        base: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
+        exception_df = load_excel(exception_file, sheet_name=sheet_exception)
 
         ##Replace the NaN values with 0 in column "Credito"
         base.iloc[:, 98] = base.iloc[:, 98].fillna(0)
@@ -95,23 +102,13 @@ def append_inconsistencies_file(
 
     data_frame = data_frame.copy()
     if os.path.exists(path_file):
-        data_frame["COORDENADAS_1"] = data_frame.apply(
-            lambda row: f"{get_excel_column_name(0 + 1)}{row.name + 2}", axis=1
-        )
-        data_frame["COORDENADAS_2"] = data_frame.apply(
-            lambda row: f"{get_excel_column_name(2 + 1)}{row.name + 2}", axis=1
-        )
-
-        with pd.ExcelFile(path_file, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=True)
+        add_coordinates(data_frame, {"COORDENADAS_1": 1, "COORDENADAS_2": 3})
 
-        with pd.ExcelWriter(
-            path_file, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, sheet_name=new_sheet, index=False)
-            return "Inconsistencias registradas correctamente"
+        inconsistency_sink(path_file).add(new_sheet, data_frame)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
 
 
 def validate_empty_df(path_file: str, new_sheet: str, data_frame: pd.DataFrame) -> str:
@@ -132,15 +129,6 @@ def validate_empty_df(path_file: str, new_sheet: str, data_frame: pd.DataFrame)
         return "Validation realizada, no se encontraron inconsistencias"
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 if __name__ == "__main__":
     params = {
         "file_path": r"C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE REPARTO 2024.xlsx",
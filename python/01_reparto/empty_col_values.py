@@ -1,9 +1,21 @@
 import pandas as pd #type: ignore
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 def main(params: dict):
   """This function validate if a column cell should be empty or not 
   an report an inconsistency into a file. This validation only works with mandatory empty columns"""
   try: 
+    configure_sinks(params)
     ##Set the initial variables to reuse the source code
     file_path = params.get ("file_path")
     sheet_name = params.get("sheet_name")
@@ -15,7 +27,7 @@ def main(params: dict):
       return "Error: an input required file is missing"
 
     ##Read the work book
-    book: pd.DataFrame = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+    book: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
     ##Apply validation
     book["EMPTY_VALUES"] = book.iloc[:, col_idx].astype(str).apply(lambda value: is_valid(value))
@@ -29,22 +41,14 @@ def main(params: dict):
 
     ##Write into the inconsistencies file
     if not inconsistencies.empty:
-      inconsistencies['COORDENADAS'] = inconsistencies.apply(
-        lambda row: f"{get_excel_column_name(col_idx + 1)}{row.name + 2}", axis=1
-      )
+      inconsistencies['COORDENADAS'] = coordinates(inconsistencies.index, col_idx + 1)
 
       in_sheet_name = "ValidacionColumnasSinEspacios"
-      with pd.ExcelFile(inconsistencies_file, engine="openpyxl") as xls:
-        if in_sheet_name in xls.sheet_names:
-          exiting = pd.read_excel(xls, sheet_name=in_sheet_name, engine="openpyxl")
-          inconsistencies = pd.concat([exiting, inconsistencies], ignore_index=True)
-
-      with pd.ExcelWriter(
-          inconsistencies_file, engine="openpyxl", mode="a", 
-          if_sheet_exists="replace"
-        ) as writer:
-        inconsistencies.to_excel(writer, sheet_name=in_sheet_name, index=False)
-        return "Inconsistencias registradas correctamente"
+      inconsistency_sink(inconsistencies_file).add(in_sheet_name, inconsistencies)
+      error = flush_inconsistencies()
+      if error is not None:
+        return f"Error: {error}"
+      return "Inconsistencias registradas correctamente"
       
     else:
       return "No se encontraron inconsistencias"
@@ -58,14 +62,6 @@ def is_valid(input: str) -> bool:
   else:
     return False
   
-def get_excel_column_name(n):
-  """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-  result = ''
-  while n > 0:
-      n, remainder = divmod(n-1, 26)
-      result = chr(65 + remainder) + result
-  return result
-
 """Apply with a use case"""
 if __name__ == "__main__":
   params = {
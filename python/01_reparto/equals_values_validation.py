@@ -1,8 +1,19 @@
 import pandas as pd #type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 def main(params: dict):
   try:
+    configure_sinks(params)
     ##Set variables
     file_path = params.get("file_path")
     inconsistencias_file = params.get("inconsistencias_file")
@@ -18,8 +29,8 @@ def main(params: dict):
       return "Error: an input param required is missing"
 
     ##Read File
-    df: pd.DataFrame = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
-    list_df: pd.DataFrame = pd.read_excel(list_file, sheet_name="EXCEPCIONES SARLAF", engine="openpyxl")
+    df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
+    list_df: pd.DataFrame = load_excel(list_file, sheet_name="EXCEPCIONES SARLAF")
 
     ##Apply validation
     df["VALIDATION_SARLAF"] = df.apply(
@@ -41,23 +52,17 @@ def main(params: dict):
     if filtered_file.empty:
       return "Validación realizada correctamente, no hay inconsistencias para registrar"
     else:
-      filtered_file["COORDENADA_1"] = filtered_file.apply(
-          lambda row: f"{get_excel_column_name(col1 + 1)}{row.name + 2}", axis=1
-      )
-      filtered_file["COORDENADA_2"] = filtered_file.apply(
-          lambda row: f"{get_excel_column_name(col2 + 1)}{row.name + 2}", axis=1
+      add_coordinates(
+          filtered_file, {"COORDENADA_1": col1 + 1, "COORDENADA_2": col2 + 1}
       )
       
       new_sheet_name = "SarlafValidacion"
       if os.path.exists(inconsistencias_file):
-        with pd.ExcelFile(inconsistencias_file, engine="openpyxl") as xls:
-          if new_sheet_name in xls.sheet_names:
-            existing_file = pd.read_excel(xls, sheet_name=new_sheet_name, engine="openpyxl")
-            filtered_file = pd.concat([existing_file, filtered_file], ignore_index=True)
-        
-        with pd.ExcelWriter(inconsistencias_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-          filtered_file.to_excel(writer, sheet_name=new_sheet_name, index=False)
-          return "Inconsistencias registradas correctamente"
+        inconsistency_sink(inconsistencias_file).add(new_sheet_name, filtered_file)
+        error = flush_inconsistencies()
+        if error is not None:
+            return f"Error: {error}"
+        return "Inconsistencias registradas correctamente"
 
   except Exception as e:
     return f"Error: {e}"
@@ -71,14 +76,6 @@ def is_valid(value1: str, value2: str, list_exception: list[str], is_radicado: b
     validation = (value1 == value2) or (value1 in list_exception)
     return validation
 
-def get_excel_column_name(n):
-  """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-  result = ''
-  while n > 0:
-      n, remainder = divmod(n-1, 26)
-      result = chr(65 + remainder) + result
-  return result
-
 if __name__ == "__main__":
   params  = {
     "file_path": r"C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE REPARTO 2024.xlsx",
@@ -1,5 +1,9 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import DateRange, load_sheets, save_excel
 
 
 def main(params):
@@ -33,27 +37,25 @@ def main(params):
         cut_off_date = pd.to_datetime(cut_off_date_input, format="%d/%m/%Y")
         start_date = pd.to_datetime(start_date_input, format="%d/%m/%Y")
 
-        # Open file using pandas
-        df = pd.read_excel(file_path, engine="openpyxl", sheet_name=sheet_name)
-        otros_gastos = pd.read_excel(file_path, sheet_name="OGDS", engine="openpyxl")
+        # Open file using pandas, reading only the rows from start_date to cut_off_date
+        date_range = DateRange(
+            column_index, start_date, cut_off_date, date_format="%d/%m/%Y"
+        )
+        sheets = load_sheets(file_path, [sheet_name, "OGDS"], date_range=date_range)
+        df = sheets[sheet_name]
+        otros_gastos = sheets["OGDS"]
         ## Assign the columns of the first data frame
         otros_gastos.columns = df.columns
         
-        df: pd.DataFrame = pd.concat([df, otros_gastos], ignore_index=True)
+        filter_file: pd.DataFrame = pd.concat([df, otros_gastos], ignore_index=True)
 
         # Convert the column to datetime using the column index
-        df.iloc[:, column_index] = pd.to_datetime(
-            df.iloc[:, column_index], format="%d/%m/%Y"
+        filter_file.iloc[:, column_index] = pd.to_datetime(
+            filter_file.iloc[:, column_index], format="%d/%m/%Y"
         )
 
-        # Filter from start_date to cut_off_date
-        filter_file = df[
-            (df.iloc[:, column_index] >= start_date)
-            & (df.iloc[:, column_index] <= cut_off_date)
-        ]
-
         # Copy to temp file to make validations
-        filter_file.to_excel(temp_file, index=False, sheet_name=sheet_name)
+        save_excel(filter_file, temp_file, sheet_name=sheet_name)
         return "SUCCESS: file copied successfully"
 
     except Exception as e:
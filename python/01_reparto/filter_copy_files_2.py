@@ -1,5 +1,9 @@
 import pandas as pd #type: ignore
 import os 
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
 
 
 def main(params: dict):
@@ -23,8 +27,8 @@ def main(params: dict):
     cut_off_date = pd.to_datetime(cut_off_date, format="%d/%m/%Y")
     
     ##Read the books and make a filter
-    otros_ramos_df = pd.read_excel(otros_ramos_file, sheet_name=sheet_otros_ramos, engine="openpyxl")
-    desempleo_df = pd.read_excel(desempleo_file, sheet_name=sheet_desempleo, engine="openpyxl")
+    otros_ramos_df = load_excel(otros_ramos_file, sheet_name=sheet_otros_ramos)
+    desempleo_df = load_excel(desempleo_file, sheet_name=sheet_desempleo)
 
     ##Convert the column to date type
     otros_ramos_df.iloc[:, col_idx] = pd.to_datetime(otros_ramos_df.iloc[:, col_idx], format="%d/%m/%Y")
@@ -3,10 +3,20 @@ from datetime import datetime
 import re
 import traceback
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set initial variables
         file_path: str = params.get("file_path")
         sheet_name: str = params.get("sheet_name")
@@ -24,17 +34,13 @@ def main(params: dict):
         date = f"01/01/{year}"
         initial_date = pd.to_datetime(date, format="%d/%m/%Y")
 
-        current_df: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
+        current_df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
         current_filtered: pd.DataFrame = current_df[
             (current_df.iloc[:, col_idx] > initial_date)
             & (current_df.iloc[:, col_idx] < cut_date)
         ].copy()
 
-        latest_df: pd.DataFrame = pd.read_excel(
-            latest_file, sheet_name=sheet_name, engine="openpyxl"
-        )
+        latest_df: pd.DataFrame = load_excel(latest_file, sheet_name=sheet_name)
         latest_filtered: pd.DataFrame = latest_df[
             (latest_df.iloc[:, col_idx] > initial_date)
             & (latest_df.iloc[:, col_idx] < cut_date)
@@ -167,13 +173,8 @@ def save_to_file(data_frame: pd.DataFrame, file_path: str, sheet_name: str) -> N
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
     if os.path.exists(file_path):
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=False)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=True, sheet_name=new_sheet)
-            return "Inconsistencias registradas correctamente"
+        inconsistency_sink(file_path).add(new_sheet, data_frame, index=True)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
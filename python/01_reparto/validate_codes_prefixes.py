@@ -1,9 +1,20 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set variables
         file_path = params.get("file_path")
         sheet_name = params.get("sheet_name")
@@ -17,9 +28,7 @@ def main(params: dict):
             return "Error: an input param required is missing"
 
         ##Read the file
-        df: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
+        df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
         ##Select cols to compare if the ramo code match with the siniestro
         siniestro = df.iloc[:, siniestro_col].astype(str)
@@ -42,56 +51,31 @@ def main(params: dict):
             return "Todos los códigos coinciden correctamente"
         else:
             # Add a column with Excel coordinates (e.g., A2, B3) of the inconsistent cells
-            inconsistencies["COORDENADA_1"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(siniestro_col + 1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADA_1"] = coordinates(
+                inconsistencies.index, siniestro_col + 1
             )
             # Add a column with Excel coordinates (e.g., A2, B3) of the inconsistent cells
-            inconsistencies["COORDENADA_2"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(ramo_col + 1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADA_2"] = coordinates(
+                inconsistencies.index, ramo_col + 1
             )
             # Add a column with Excel coordinates (e.g., A2, B3) of the inconsistent cells
-            inconsistencies["COORDENADA_3"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(document_col + 1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADA_3"] = coordinates(
+                inconsistencies.index, document_col + 1
             )
 
             new_sheet_name = "ValidationCodigosRamo"
-            if os.path.exists(inconsistencies_file):
-                with pd.ExcelFile(inconsistencies_file, engine="openpyxl") as xls:
-                    if new_sheet_name in xls.sheet_names:
-                        existing_df = pd.read_excel(
-                            xls, sheet_name=new_sheet_name, engine="openpyxl"
-                        )
-                        inconsistencies = pd.concat(
-                            [existing_df, inconsistencies], ignore_index=True
-                        )
-
-            with pd.ExcelWriter(
-                inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                inconsistencies.to_excel(
-                    writer, sheet_name="ValidacionCodigos", index=False
-                )
-                return "Inconsistencias registradas correctamente"
+            inconsistency_sink(inconsistencies_file).add(
+                "ValidacionCodigos", inconsistencies
+            )
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"Error: {error}"
+            return "Inconsistencias registradas correctamente"
 
     except Exception as e:
         return f"Error: {e}"
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 if __name__ == "__main__":
     dic = {
         "inconsistencies_file": "C:/ProgramData/AutomationAnywhere/Bots/Logs/AD_RCSN_SabanaPagosYBasesParaSinestralidad/OutputFolder/Inconsistencias/InconBaseReparto.xlsx",
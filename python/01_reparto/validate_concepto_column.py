@@ -1,9 +1,27 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
+from utils.row_cases import cases, source, text, when
+
+## Ramo (12) OTROS GASTOS takes a concepto (35) of the list, the rest leave it empty
+CONCEPTO_CASES = cases(
+    when(text(12) == "OTROS GASTOS", text(35).isin(source(0))),
+    default=text(35) == "nan",
+)
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set variables
         file_path = params.get("file_path")
         inconsistencies_file = params.get("inconsistencies_file")
@@ -14,20 +32,13 @@ def main(params: dict):
             return "Error: an input params is missing"
 
         ##Read the work book
-        book: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name="CASOS NUEVOS", engine="openpyxl"
-        )
-        listas: pd.DataFrame = pd.read_excel(
-            list_file, sheet_name="LISTAS", engine="openpyxl"
-        )
+        book: pd.DataFrame = load_excel(file_path, sheet_name="CASOS NUEVOS")
+        listas: pd.DataFrame = load_excel(list_file, sheet_name="LISTAS")
 
         ## Concepto list values allowed
         concepto_list: list[str] = listas["CONCEPTO"].dropna().astype(str).to_list()
         ## Make the validation
-        book["is_valid"] = book.apply(
-            lambda row: is_valid(str(row.iloc[12]), str(row.iloc[35]), concepto_list),
-            axis=1,
-        )
+        book["is_valid"] = is_valid(book, concepto_list)
 
         ##Filter the inconsistencies data frame
         inconsistencies: pd.DataFrame = book[~book["is_valid"]].copy()
@@ -36,50 +47,25 @@ def main(params: dict):
         if inconsistencies.empty:
             return "INFO: validación de columna Concepto realizada correctamente, no se encontraron inconsistencias"
         else:
-            inconsistencies["COORDENADAS"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(35 + 1)}{row.name + 2}", axis=1
-            )
+            inconsistencies["COORDENADAS"] = coordinates(inconsistencies.index, 36)
 
             ## Create a sheet name to store the inconsistencies
             new_sheet = "ValidacionConceptoColumna"
 
-            if os.path.exists(inconsistencies_file):
-                with pd.ExcelFile(inconsistencies_file, engine="openpyxl") as xls:
-                    if new_sheet in xls.sheet_names:
-                        existing_file = pd.read_excel(
-                            xls, sheet_name=new_sheet, engine="openpyxl"
-                        )
-                        inconsistencies = pd.concat(
-                            [existing_file, inconsistencies], ignore_index=True
-                        )
-
-            with pd.ExcelWriter(
-                inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                inconsistencies.to_excel(writer, index=False, sheet_name=new_sheet)
-                return "Inconsistencies registered successfully"
+            inconsistency_sink(inconsistencies_file).add(new_sheet, inconsistencies)
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"ERROR: {error}"
+            return "Inconsistencies registered successfully"
 
     except Exception as e:
         print(f"ERROR: {str(e)}")
 
 
-def is_valid(ramo: str, concepto: str, lista: list[str]) -> bool:
-    """Method to validate if the ramo is OTROS GASTOS and depends on that validate into a list"""
-    if ramo == "OTROS GASTOS":
-        return concepto in lista
-    return concepto == "nan"
-
-
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
+def is_valid(book: pd.DataFrame, lista: list[str]) -> pd.Series:
+    """Method to validate if the ramo is OTROS GASTOS and depends on that validate into a list, on every row"""
+    ## The columns of the cases are positions
+    return CONCEPTO_CASES(book.set_axis(range(len(book.columns)), axis=1), lista)
 
 
 """Apply with a use case"""
@@ -1,9 +1,20 @@
 import pandas as pd #type: ignore
 import os
 from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 def main(params: dict):
   try:
+    configure_sinks(params)
     ##Set variables
     file_path = params.get("file_path")
     col_idx = int(params.get("col_idx"))
@@ -15,7 +26,7 @@ def main(params: dict):
       return "Error: input param is missing"
 
     ##Read data base
-    df: pd.DataFrame = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+    df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
     ## Create a new column to validate dates, considering null
     df["valid_date"] = df.iloc[:, col_idx].apply(lambda x: is_valid(x, is_null))
@@ -28,19 +39,13 @@ def main(params: dict):
     if (filtered_file.empty):
       return "Validación correcta, no hay inconsistencias"
     else:
-      filtered_file['COORDENADAS'] = filtered_file.apply(
-      lambda row: f"{get_excel_column_name(col_idx + 1)}{row.name + 2}", axis=1
-      )
+      filtered_file['COORDENADAS'] = coordinates(filtered_file.index, col_idx + 1)
       new_sheet_name = "ValidacionTipoFecha"
-      if os.path.exists(inconsistencias_file):
-        with pd.ExcelFile(inconsistencias_file, engine="openpyxl") as xls:
-          if new_sheet_name in xls.sheet_names:
-            existing_df = pd.read_excel(xls, sheet_name=new_sheet_name, engine="openpyxl")
-            filtered_file = pd.concat([existing_df, filtered_file], ignore_index=True)
-      
-      with pd.ExcelWriter(inconsistencias_file, engine="openpyxl", mode="a", if_sheet_exists="replace") as writer:
-        filtered_file.to_excel(writer, sheet_name=new_sheet_name, index=False)
-        return "Inconsistencias registradas correctamente"
+      inconsistency_sink(inconsistencias_file).add(new_sheet_name, filtered_file)
+      error = flush_inconsistencies()
+      if error is not None:
+        return f"Error: {error}"
+      return "Inconsistencias registradas correctamente"
 
   except Exception as e:
     return f"Error: {e}"
@@ -60,14 +65,6 @@ def is_valid(value: str, is_null: bool):
       except (ValueError, TypeError):
         return False
       
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ''
-    while n > 0:
-        n, remainder = divmod(n-1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
 if __name__ == "__main__":
   params = {
     "file_path": "C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE REPARTO 2024.xlsx",
@@ -2,10 +2,21 @@ import pandas as pd #type: ignore
 import os
 import re
 from typing import List
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set initial variables
         file_path = params.get("file_path")
         inconsistencias_file = params.get("inconsistencias_file")
@@ -19,12 +30,8 @@ def main(params: dict):
             return "Error: An input param is missing"
 
         ##Load and read work book
-        df: pd.DataFrame = pd.read_excel(
-            file_path, engine="openpyxl", sheet_name=sheet_name
-        )
-        list_df = pd.read_excel(
-            list_file, engine="openpyxl", sheet_name="CARACTERES ESPECIALES"
-        )
+        df: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
+        list_df = load_excel(list_file, sheet_name="CARACTERES ESPECIALES")
 
         ##Apply validation to the file
         df["is_valid"] = (
@@ -49,31 +56,18 @@ def main(params: dict):
             )
         else:
             # Add a column with Excel coordinates (e.g., A2, B3) of the inconsistent cells
-            inconsistencies["COORDENADAS"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(col_idx + 1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADAS"] = coordinates(
+                inconsistencies.index, col_idx + 1
             )
 
             new_sheet = "CaracteresEspeciales"
-            if os.path.exists(inconsistencias_file):
-                with pd.ExcelFile(inconsistencias_file, engine="openpyxl") as xls:
-                    if new_sheet in xls.sheet_names:
-                        existing_file = pd.read_excel(
-                            xls, engine="openpyxl", sheet_name=new_sheet
-                        )
-                        existing_file = existing_file.dropna(how="all", axis=1)
-                        inconsistencies = pd.concat(
-                            [existing_file, inconsistencies], ignore_index=True
-                        )
-
-            with pd.ExcelWriter(
-                inconsistencias_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                inconsistencies.to_excel(writer, index=False, sheet_name=new_sheet)
-                return "Inconsistencias registradas correctamente"
+            inconsistency_sink(inconsistencias_file).add(
+                new_sheet, inconsistencies, drop_empty_columns=True
+            )
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"Error: {error}"
+            return "Inconsistencias registradas correctamente"
 
     except Exception as e:
         return f"Error: {e}"
@@ -95,15 +89,6 @@ def clean(string: str, exception_list: List[str]) -> bool:
     return True
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 if __name__ == "__main__":
     params = {
         "file_path": r"C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE REPARTO 2024.xlsx",
@@ -1,10 +1,21 @@
 import pandas as pd  # type: ignore
 import os
 import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set initial variables
         file_path = params.get("file_path")
         in_file = params.get("in_file")
@@ -19,8 +30,8 @@ def main(params: dict):
             return "Error: an input param is missing"
 
         ##Read the work book
-        df = pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
-        list_df = pd.read_excel(list_file, sheet_name="LISTAS", engine="openpyxl")
+        df = load_excel(file_path, sheet_name=sheet_name)
+        list_df = load_excel(list_file, sheet_name="LISTAS")
 
         lst = list_df[list_col].dropna().astype(str).to_list()
 
@@ -33,30 +44,17 @@ def main(params: dict):
             return "Validación realizada, no se encontraron inconsistencias"
         else:
             col_index = df.columns.get_loc(col_name) + 1  # Get column number (1-based)
-            is_in["COORDENADAS"] = is_in.apply(
-                lambda row: f"{get_excel_column_name(col_index)}{row.name + 2}", axis=1
-            )
+            is_in["COORDENADAS"] = coordinates(is_in.index, col_index)
 
             ##Register into the inconsistencies file
             new_sheet = in_sheet
             ##Validate is the inconsistencies file exist
-            if os.path.exists(in_file):
-                with pd.ExcelFile(in_file, engine="openpyxl") as xls:
-                    if new_sheet in xls.sheet_names:
-                        existing_file = pd.read_excel(
-                            xls, engine="openpyxl", sheet_name=new_sheet
-                        )
-                        existing_file = existing_file.dropna(
-                            how="all", axis=1
-                        )  ##Does not include the empty columns
-                        is_in = pd.concat([existing_file, is_in], ignore_index=True)
-
             ##Store data
-            with pd.ExcelWriter(
-                in_file, engine="openpyxl", mode="a", if_sheet_exists="replace"
-            ) as writer:
-                is_in.to_excel(writer, sheet_name=new_sheet, index=False)
-                return "Inconsistencias registradas correctamente"
+            inconsistency_sink(in_file).add(new_sheet, is_in, drop_empty_columns=True)
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"Error: {error}"
+            return "Inconsistencias registradas correctamente"
 
     except Exception as e:
         return f"Error: {e}"
@@ -68,15 +66,6 @@ def clean(string):
     return string
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 if __name__ == "__main__":
     params = {
         "file_path": "C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE REPARTO 2024.xlsx",
@@ -2,7 +2,19 @@ import pandas as pd  # type: ignore
 import numpy as np  # type: ignore
 from typing import Optional
 import os
-from openpyxl import load_workbook  # type: ignore
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.inconsistency_sink import (
+    cap_findings,
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.rule_caps import cap_message
+from utils.coordinates import add_coordinates, coordinates
+from utils.xlsx_patch import patch_cells
 
 
 class Consecutivo:
@@ -24,54 +36,39 @@ class Consecutivo:
 
     def read_excel(self, file_path: str, sheet_name: str) -> pd.DataFrame:
         """Method for returning a data frame"""
-        return pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+        return load_excel(file_path, sheet_name=sheet_name)
 
-    def save_inconsistencies_file(self, df: pd.DataFrame, new_sheet: str) -> bool:
+    def save_inconsistencies_file(
+        self, df: pd.DataFrame, new_sheet: str, total: Optional[int] = None
+    ) -> bool:
+        """Method to keep the inconsistencies, the file is written once per session"""
         if os.path.exists(self.inconsistencies_file):
-            with pd.ExcelFile(self.inconsistencies_file, engine="openpyxl") as xls:
-                if new_sheet in xls.sheet_names:
-                    existing = pd.read_excel(
-                        xls, engine="openpyxl", sheet_name=new_sheet
-                    )
-                    df = pd.concat([existing, df], ignore_index=True)
-
-            with pd.ExcelWriter(
-                self.inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                df.to_excel(writer, sheet_name=new_sheet, index=False)
-                return True
+            inconsistency_sink(self.inconsistencies_file).add(
+                new_sheet, df, total=total
+            )
+            return True
         else:
             return False
 
-    def excel_col_name(self, number) -> str:
-        """Method to convert (1-based) to Excel column name"""
-        result = ""
-        while number > 0:
-            number, reminder = divmod(number - 1, 26)
-            result = chr(65 + reminder) + result
-        return result
-
     def validate_inconsistencies(
         self, df: pd.DataFrame, col_idx, sheet_name: str
     ) -> str:
         """Method to validate the inconsistencies before append in a inconsistencies file"""
         if not df.empty:
-            df = df.copy()
+            ## The findings past the cap of the rule are only counted
+            total = len(df)
+            df = cap_findings(df, sheet_name).copy()
             if isinstance(col_idx, int):
-                df[f"COORDENADAS"] = df.apply(
-                    lambda row: f"{self.excel_col_name(col_idx + 1)}{row.name + 2}",
-                    axis=1,
-                )
+                df[f"COORDENADAS"] = coordinates(df.index, col_idx + 1)
             else:
-                for i in col_idx:
-                    df[f"COORDENADAS_{i + 2}"] = df.apply(
-                        lambda row: f"{self.excel_col_name(i + 1)}{row.name + 2}",
-                        axis=1,
-                    )
-            self.save_inconsistencies_file(df, sheet_name)
+                add_coordinates(df, {f"COORDENADAS_{i + 2}": i + 1 for i in col_idx})
+            self.save_inconsistencies_file(df, sheet_name, total)
+            ## Every validation is called on its own, its sheet is written now
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"ERROR: {error}"
+            if total > len(df):
+                return cap_message(sheet_name, total, len(df))
             return "SUCCESS: Inconsistencies guardadas correctamente"
         else:
             return "INFO: Validacion realizada, no se encontraron inconsistencias"
@@ -192,27 +189,18 @@ class Consecutivo:
     def update_data(
         self, consecutivo_inicial: int, consecutivo_final: int, lista_consecutivos: list
     ) -> None:
-        # Cargar el archivo existente
-        book = load_workbook(self.exception_file)
-        sheet = book["CONSECUTIVO SAP"]
-
-        # Limpiar los datos antiguos en la columna 1 (consecutivos pendientes)
-        max_row = sheet.max_row  # Obtiene el número máximo de filas usadas
-        for row in range(2, max_row + 1):  # Empieza en la fila 2
-            sheet.cell(row=row, column=1).value = None  # Borra los valores antiguos
+        # Reemplazar los consecutivos pendientes de la columna 1 por la lista nueva
+        values = {
+            f"A{row}": consecutivo
+            for row, consecutivo in enumerate(lista_consecutivos, start=2)
+        }
 
         # Actualizar valores
-        sheet.cell(row=2, column=2).value = consecutivo_inicial  # Consecutivo inicial
-        sheet.cell(row=2, column=3).value = consecutivo_final  # Consecutivo final
-
-        # Actualizar lista de consecutivos pendientes
-        row = 1
-        for consecutivo in lista_consecutivos:
-            row += 1
-            sheet.cell(row=row, column=1).value = consecutivo
+        values["B2"] = consecutivo_inicial  # Consecutivo inicial
+        values["C2"] = consecutivo_final  # Consecutivo final
 
-        # Guardar cambios
-        book.save(self.exception_file)
+        # Guardar cambios, reescribiendo solo estas celdas de la hoja
+        patch_cells(self.exception_file, "CONSECUTIVO SAP", values, cleared=("A2",))
         return True
 
 
@@ -224,6 +212,7 @@ consecutivo: Optional[Consecutivo] = None
 def main(params: dict) -> bool:
     try:
         global consecutivo
+        configure_sinks(params)
 
         ## Get the variables
         file_path: str = params.get("file_path")
@@ -1,5 +1,9 @@
 import pandas as pd  # type: ignore
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import DateRange, load_excel, load_sheets, save_excel
 
 
 def main(params: dict):
@@ -32,16 +36,18 @@ def main(params: dict):
         begin_date = pd.to_datetime(begin_date, format="%d/%m/%Y")
         cut_off_date = pd.to_datetime(cut_off_date, format="%d/%m/%Y")
 
-        ##Read the books and make a filter
-        otros_ramos_df: pd.DataFrame = pd.read_excel(
-            otros_ramos_file, sheet_name=sheet_otros_ramos, engine="openpyxl"
+        ##Read the books and make a filter, only the rows between the dates are read
+        date_range = DateRange(
+            col_idx, begin_date, cut_off_date, date_format="%d/%m/%Y"
         )
-        desempleo_df: pd.DataFrame = pd.read_excel(
-            desempleo_file, sheet_name=sheet_desempleo, engine="openpyxl"
+        otros_ramos: dict = load_sheets(
+            otros_ramos_file, [sheet_otros_ramos, "OGDS"], date_range=date_range
         )
-        otros_gastos: pd.DataFrame = pd.read_excel(
-            otros_ramos_file, sheet_name="OGDS", engine="openpyxl"
+        otros_ramos_df: pd.DataFrame = otros_ramos[sheet_otros_ramos]
+        desempleo_df: pd.DataFrame = load_excel(
+            desempleo_file, sheet_name=sheet_desempleo, date_range=date_range
         )
+        otros_gastos: pd.DataFrame = otros_ramos["OGDS"]
 
         otros_ramos_df: pd.DataFrame = otros_ramos_df.dropna(
             subset=[otros_ramos_df.columns[0]]
@@ -66,14 +72,8 @@ def main(params: dict):
             base_pagos.iloc[:, col_idx], format="%d/%m/%Y"
         )
 
-        ##Make a filter
-        base_pagos = base_pagos[
-            (base_pagos.iloc[:, col_idx] >= begin_date)
-            & (base_pagos.iloc[:, col_idx] <= cut_off_date)
-        ]
-
         ##Save changes into a temp folder
-        base_pagos.to_excel(destination_path, index=False, sheet_name="PAGOS")
+        save_excel(base_pagos, destination_path, sheet_name="PAGOS")
         return "Temp file created successfully"
 
     except Exception as e:
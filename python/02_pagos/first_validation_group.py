@@ -1,12 +1,46 @@
 import pandas as pd  # type:ignore
 from typing import Optional
 import os
-import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.exception_index import exception_index
+from utils.frame_cache import FrameCache
+from utils.inconsistency_sink import (
+    cap_findings,
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.rule_caps import cap_message
+from utils.rules import Rule, RuleEngine, build_rules, rule_set_result, rule_steps
+from utils.coordinates import add_coordinates, coordinates
+from utils.column_kernels import (
+    allowed_values,
+    cell_text,
+    exact_length,
+    in_range,
+    int_text,
+)
+from utils.row_cases import cases, date, month, source, text, when
+from utils.text_patterns import (
+    BAD_SPACING,
+    DOUBLE_SPACE,
+    FECHA_VENCIMIENTO,
+    NULLABLE_PERCENTAGE,
+    PERCENTAGE,
+    RADICADO,
+    SPECIAL_CHARACTER,
+)
 
 
 class FirstValidationGroup:
     """Class to make the fist validation in the 'Base de Pagos' process"""
 
+    ## Parsed sheets shared by every validation of the bot session
+    frame_cache: FrameCache = FrameCache()
+
     def __init__(
         self,
         path_file: str,
@@ -20,110 +54,95 @@ class FirstValidationGroup:
         self.exception_file = exception_file
 
     def read_excel(self, file_path: str, sheet_name: str) -> pd.DataFrame:
-        """Method for returning a data frame"""
-        return pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
-
-    def save_inconsistencies_file(self, df: pd.DataFrame, new_sheet: str) -> bool:
+        """Method for returning a data frame, the sheet is parsed once per session"""
+        return self.frame_cache.get(
+            file_path,
+            sheet_name,
+            lambda: load_excel(file_path, sheet_name),
+        )
+
+    def read_columns(self, *columns: int) -> pd.DataFrame:
+        """Method for returning only some columns of the main sheet, labeled by their position"""
+        columns = tuple(sorted(set(columns)))
+        data_frame: pd.DataFrame = self.frame_cache.get(
+            self.path_file,
+            self.sheet_name,
+            lambda: load_excel(self.path_file, self.sheet_name, usecols=columns),
+            columns,
+        )
+        data_frame.columns = list(columns)
+        data_frame.attrs = {"projection": columns}
+        return data_frame
+
+    def read_rows(self, index: pd.Index) -> pd.DataFrame:
+        """Method for returning every column of some rows of the main sheet"""
+        data_frame = self.frame_cache.peek(self.path_file, self.sheet_name)
+        if data_frame is not None:
+            return data_frame.loc[index]
+        return load_excel(self.path_file, self.sheet_name, rows=index.to_list())
+
+    def exception_values(self, sheet_name: str, column) -> frozenset:
+        """Method for returning the values of a column of the exception file as a set"""
+        return exception_index(self.exception_file).values(sheet_name, column)
+
+    def save_inconsistencies_file(
+        self, df: pd.DataFrame, new_sheet: str, total: Optional[int] = None
+    ) -> bool:
+        """Method to keep the inconsistencies, the file is written once per session"""
         if os.path.exists(self.inconsistencies_file):
-            with pd.ExcelFile(self.inconsistencies_file, engine="openpyxl") as xls:
-                if new_sheet in xls.sheet_names:
-                    existing = pd.read_excel(
-                        xls, engine="openpyxl", sheet_name=new_sheet
-                    )
-                    df = pd.concat([existing, df], ignore_index=True)
-
-            with pd.ExcelWriter(
-                self.inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                df.to_excel(writer, sheet_name=new_sheet, index=False)
-                return True
+            inconsistency_sink(self.inconsistencies_file).add(
+                new_sheet, df, total=total
+            )
+            return True
         else:
             return False
 
-    def excel_col_name(self, number) -> str:
-        """Method to convert (1-based) to Excel column name"""
-        result = ""
-        while number > 0:
-            number, reminder = divmod(number - 1, 26)
-            result = chr(65 + reminder) + result
-        return result
-
     def validate_inconsistencies(
         self, df: pd.DataFrame, col_idx, sheet_name: str
     ) -> str:
         """Method to validate the inconsistencies before append in a inconsistencies file"""
         if not df.empty:
-            df = df.copy()
+            ## The findings past the cap of the rule are only counted
+            total = len(df)
+            df = cap_findings(df, sheet_name).copy()
+            if "projection" in df.attrs:
+                ## Only some columns were read, report the whole rows of the sheet
+                helper_columns = df.drop(columns=list(df.attrs["projection"]))
+                df = pd.concat([self.read_rows(df.index), helper_columns], axis=1)
             if isinstance(col_idx, int):
-                df[f"COORDENADAS"] = df.apply(
-                    lambda row: f"{self.excel_col_name(col_idx + 1)}{row.name + 2}",
-                    axis=1,
-                )
+                df[f"COORDENADAS"] = coordinates(df.index, col_idx + 1)
             else:
-                for i in col_idx:
-                    df[f"COORDENADAS_{i + 2}"] = df.apply(
-                        lambda row: f"{self.excel_col_name(i+1)}{row.name + 2}",
-                        axis=1,
-                    )
-            self.save_inconsistencies_file(df, sheet_name)
+                add_coordinates(df, {f"COORDENADAS_{i + 2}": i + 1 for i in col_idx})
+            self.save_inconsistencies_file(df, sheet_name, total)
+            if total > len(df):
+                return cap_message(sheet_name, total, len(df))
             return "SUCCESS: Inconsistencies guardadas correctamente"
         else:
             return "INFO: Validacion realizada, no se encontraron inconsistencias"
 
+    def run_rules(self, rules: list) -> list:
+        """Method to run rules against the main sheet, loaded once for all of them (see RuleEngine)"""
+        return RuleEngine(self).run(rules)
+
+    def run_rule(self, rule) -> str:
+        """Method to run a rule on its own, its inconsistencies written to the file before returning"""
+        result: str = self.run_rules([rule])[0]
+        error = flush_inconsistencies()
+        if error is not None:
+            return f"ERROR: {error}"
+        return result
+
     def validate_empty_col(self, col_idx: int, mandatory: bool) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        if mandatory:
-            data_frame["is_valid"] = data_frame.iloc[:, col_idx].isna()
-            inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-            return self.validate_inconsistencies(
-                inconsistencies, col_idx, "ValidacionColumnasVacias"
-            )
-        else:
-            data_frame["is_valid"] = data_frame.iloc[:, col_idx].isna()
-            inconsistencies: pd.DataFrame = data_frame[data_frame["is_valid"]]
-            return self.validate_inconsistencies(
-                inconsistencies, col_idx, "ValidacionColumnasVacias"
-            )
+        return self.run_rule(empty_col_rule(col_idx, mandatory))
 
     def number_type(self, col_idx: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(self.exception_file, "LISTAS")
-        list_exception: list = exception_df["SAP"].dropna().astype(str).tolist()
-
-        def validate_with_exception_list(value: str) -> bool:
-            value = value.replace(".", "")
-            try:
-                int(value)
-                return True
-            except ValueError:
-                return value in list_exception
-
-        data_frame["is_valid"] = (
-            data_frame.iloc[:, col_idx]
-            .astype(str)
-            .apply(lambda value: validate_with_exception_list(value))
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, "DatoTipoNumero")
+        return self.run_rule(number_type_rule(col_idx))
 
     def date_type(self, col_idx: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = pd.to_datetime(
-            data_frame.iloc[:, col_idx], errors="coerce"
-        ).notna()
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, "DatosTipoFecha")
+        return self.run_rule(date_type_rule(col_idx))
 
     def value_length(self, col_idx: int, length: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = data_frame.iloc[:, col_idx].apply(
-            lambda value: len(str(value)) == length
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, "LongitudValor")
+        return self.run_rule(value_length_rule(col_idx, length))
 
     def validate_exception_list(
         self,
@@ -132,181 +151,43 @@ class FirstValidationGroup:
         exception_sheet: str,
         new_sheet: str,
     ) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_data_frame: pd.DataFrame = self.read_excel(
-            self.exception_file, exception_sheet
+        rule = exception_list_rule(
+            col_idx, exception_col_name, exception_sheet, new_sheet
         )
-        col_exception: pd.Series = exception_data_frame[exception_col_name].dropna()
-        data_frame["is_valid"] = data_frame.iloc[:, col_idx].isin(col_exception)
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, new_sheet)
+        return self.run_rule(rule)
 
     def no_special_characters(self, col_idx: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = (
-            data_frame.iloc[:, col_idx]
-            .astype(str)
-            .apply(
-                lambda value: not pd.isna(value)
-                and bool(re.search(r"[^a-zA-Z0-9]", value))
-            )
-        )
-
-        inconsistencies: pd.DataFrame = data_frame[data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, col_idx, "ValidacionCaracteresEspaciales"
-        )
+        return self.run_rule(special_characters_rule(col_idx))
 
     def month_depends_on_date(
         self, date_idx: int, month_idx: int, exception_sheet: str, exception_idx: int
     ) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, exception_sheet
-        )
-        exception_list: pd.Series = (
-            exception_df.iloc[:, exception_idx].astype(str).dropna().to_list()
-        )
-
-        ## Create s sub function to know the correct month depends on the number
-        months: dict = {
-            1: "ENERO",
-            2: "FEBRERO",
-            3: "MARZO",
-            4: "ABRIL",
-            5: "MAYO",
-            6: "JUNIO",
-            7: "JULIO",
-            8: "AGOSTO",
-            9: "SEPTIEMBRE",
-            10: "OCTUBRE",
-            11: "NOVIEMBRE",
-            12: "DICIEMBRE",
-        }
-
-        ## Create a sub function to validate the consistency of the date
-        def validate_consistency(date: str, month: str, radicado: str) -> bool:
-            date_parse = pd.to_datetime(date, format="%Y-%m-%d", errors="coerce")
-            get_month = date_parse.month
-            ## Call the dictionary
-            standard_month = months.get(get_month)
-            return (month == standard_month) or (radicado in exception_list)
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_consistency(
-                row.iloc[date_idx], str(row.iloc[month_idx]), str(row.iloc[2])
-            ),
-            axis=1,
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, month_idx, "ValidacionMesCorte"
-        )
+        rule = month_rule(date_idx, month_idx, exception_sheet, exception_idx)
+        return self.run_rule(rule)
 
     def radicado_format(self, col_idx) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = data_frame.iloc[:, col_idx].apply(
-            lambda value: bool(re.search(r"^\d{4}\s\d{2}\s\d{3}\s\d{6}$", str(value)))
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, col_idx, "FormatoNumeroRadicado"
-        )
+        return self.run_rule(radicado_format_rule(col_idx))
 
     def acuerdo_range(self, col_idx: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = data_frame.iloc[:, col_idx].apply(
-            lambda value: 1 <= value <= 30
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, col_idx, "ValidacionAcuerdo"
-        )
+        return self.run_rule(acuerdo_range_rule(col_idx))
 
     def coaseguradora(
         self, file_idx: int, exception_sheet: str, exception_col: str
     ) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, exception_sheet
-        )
-        exception_col: pd.Series = exception_df[exception_col].dropna()
-        file_col: pd.Series = data_frame.iloc[:, file_idx]
-        data_frame["is_valid"] = (file_col.isin(exception_col)) | (pd.isna(file_col))
-
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, file_idx, "CompañiaCoaseguradora"
-        )
+        rule = coaseguradora_rule(file_idx, exception_sheet, exception_col)
+        return self.run_rule(rule)
 
     def only_two_options(self, col_idx: int, options: list[str], new_sheet: str) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["id_valid"] = data_frame.iloc[:, col_idx].apply(
-            lambda value: (value in options) or (pd.isna(value))
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["id_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, new_sheet)
+        return self.run_rule(two_options_rule(col_idx, options, new_sheet))
 
     def no_white_spaces(self, col_idx: int, new_sheet: str) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = (
-            data_frame.iloc[:, col_idx]
-            .astype(str)
-            .apply(
-                lambda value: (pd.isna(value)) or not (bool(re.search(r"\s\s+", value)))
-            )
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, new_sheet)
+        return self.run_rule(white_spaces_rule(col_idx, new_sheet))
 
     def percentage_format(self, col_idx: int, can_be_null: bool) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-
-        def validate_format(value: str) -> bool:
-            value = value.replace(" ", "")
-            normal_percentage = bool(re.search(r"^\d+\.\d{1,2}$", value))
-            concat_percentage = bool(re.search(r"^\d{2}%;\d{2}%$", value))
-            if not can_be_null:
-                return normal_percentage or concat_percentage or value == "1"
-            else:
-                is_nan: bool = value.lower() == "nan"
-                return normal_percentage or concat_percentage or is_nan
-
-        data_frame["is_valid"] = (
-            data_frame.iloc[:, col_idx]
-            .astype(str)
-            .apply(lambda value: validate_format(value))
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, col_idx, "FormatoPorcentaje"
-        )
+        return self.run_rule(percentage_format_rule(col_idx, can_be_null))
 
     def identification_pagos_iaxis(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, "OTRAS EXCEPCIONES"
-        )
-        exception_list: pd.Series = (
-            exception_df.iloc[:, 5].dropna().astype(str).to_list()
-        )
-
-        ## Create a  subfunction to validate the identification
-        def validate_identification(identificador_pagos: str, radicado: str) -> bool:
-            if bool(re.search(r"(^\s+|\s+$|\s{2,})", identificador_pagos)):
-                return False
-            else:
-                return (identificador_pagos != "nan") or (radicado in exception_list)
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_identification(str(row.iloc[75]), str(row.iloc[2])),
-            axis=1,
-        )
-
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, [12, 75], "IdentificacionPagosIaxis"
-        )
+        return self.run_rule(identification_rule())
 
     def need_exception(
         self,
@@ -317,227 +198,472 @@ class FirstValidationGroup:
         list_sheet: str,
         list_idx: int,
     ) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        ## List data frame
-        list_df: pd.DataFrame = self.read_excel(self.exception_file, list_sheet)
-        list_col: list[str] = list_df.iloc[:, list_idx].dropna().astype(str).to_list()
-        ## Exception values
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, exception_sheet
-        )
-        exception_col: list[str] = (
-            exception_df.iloc[:, exception_idx].dropna().astype(str).to_list()
-        )
-        file_col: pd.Series = data_frame.iloc[:, col_idx].astype(str)
-        data_frame["is_valid"] = (file_col.isin(exception_col)) | (
-            file_col.isin(list_col)
+        rule = need_exception_rule(
+            col_idx, exception_sheet, exception_idx, new_sheet, list_sheet, list_idx
         )
-
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, col_idx, new_sheet)
+        return self.run_rule(rule)
 
     def banks_validation(self) -> str:
-        ## Data frames
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        list_df: pd.DataFrame = self.read_excel(self.exception_file, "LISTAS")
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, "OTRAS EXCEPCIONES"
-        )
-        new_list_df: pd.DataFrame = list_df.iloc[:, 1:3].dropna()
-        exception_list: list[str] = (
-            exception_df.iloc[:, 1].dropna().astype(str).to_list()
-        )
-        col_1_name: str = data_frame.columns[64]
-        col_2_name: str = new_list_df.columns[0]
-        merged_df: pd.DataFrame = data_frame.merge(
-            new_list_df,
-            how="left",
-            left_on=col_1_name,
-            right_on=col_2_name,
-            suffixes=("_PAGOS", "_LISTAS"),
-        )
-        merged_df["is_valid"] = (merged_df.iloc[:, 65] == merged_df.iloc[:, -1]) | (
-            merged_df.iloc[:, 64].astype(str).isin(exception_list)
-        )
-        inconsistencies: pd.DataFrame = merged_df[~merged_df["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, 64, "ValidacionBancos")
+        return self.run_rule(banks_rule())
 
     def mandatory_desempleo(self, new_sheet: str, col_idx: int) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-
-        ## Sub function to validate
-        def validation(desempleo: str, character: str) -> bool:
-            ramos: list[str] = ["DESEMPLEO"]
-            maybe: list[str] = ["VIDA GRUPO DEUDORES"]
-            is_desempleo = desempleo in ramos
-            is_valid_character = character == "SI" or character == "NO"
-            first_validation = is_desempleo and is_valid_character
-            second_validation = not is_desempleo and character == "nan"
-            third_validation = (desempleo in maybe and is_valid_character) or (
-                desempleo in maybe and character == "nan"
-            )
-            return first_validation or second_validation or third_validation
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validation(
-                str(row.iloc[12]),  # Ramo
-                str(row.iloc[col_idx]),  # Special column
-            ),
-            axis=1,
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, [12, col_idx], new_sheet)
+        return self.run_rule(desempleo_rule(new_sheet, col_idx))
 
     def no_empty(self, col_idx: int, option: str, new_sheet: str) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-
-        ## Sub function to validate
-
-        def validate_empty(value: str) -> bool:
-            return value == "nan" or value == option
-
-        data_frame["is_valid"] = data_frame.iloc[:, col_idx].apply(
-            lambda value: validate_empty(str(value))
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, [col_idx], new_sheet)
+        return self.run_rule(no_empty_rule(col_idx, option, new_sheet))
 
     def check_sarlaf(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-
-        ## Sub function to validate
-        def validate_sarlaf(sarlaf: str, bien_diligenciado: str) -> bool:
-            if sarlaf == "SI":
-                return bien_diligenciado == "X"
-            else:
-                return bien_diligenciado == "nan"
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_sarlaf(
-                str(row.iloc[85]), str(row.iloc[86])  # Special column
-            ),
-            axis=1,
-        )
-
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, [85, 86], "CheckBeneficiarioSarlaf"
-        )
+        return self.run_rule(sarlaf_rule())
 
     def fecha_vencimiento(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, "OTRAS EXCEPCIONES"
-        )
-        exception_list: list[str] = (
-            exception_df.iloc[:, 3].dropna().astype(str).to_list()
-        )
-
-        ## Sub function to validate the expiration date
-        def validate_date(ramo: str, expiration_date: str) -> bool:
-            if ramo == "DESEMPLEO":
-                return bool(re.search(r"^\d{2}/\d{2}/\d{4};\d{1,12}$", expiration_date))
-            else:
-                return (expiration_date == "nan") or ramo in exception_list
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_date(
-                str(row.iloc[12]),  ## Ramo
-                str(row.iloc[97]),  ## Fecha vencimiento
-            ),  # Ramo
-            axis=1,
-        )
-
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, [12, 97], "FechaVencimiento"
-        )
+        return self.run_rule(fecha_vencimiento_rule())
 
     def evento_cinco(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        data_frame["is_valid"] = data_frame["EVENTO 5"].apply(
-            lambda value: (pd.isna(value)) | (value == "SI" or value == "NO")
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, 110, "ValidacionEventoCinco"
-        )
+        return self.run_rule(evento_cinco_rule())
 
     def sap(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(
-            self.exception_file, "OTRAS EXCEPCIONES"
-        )
-        exception_list: list[str] = (
-            exception_df.iloc[:, 4].dropna().astype(str).to_list()
-        )
-
-        ## Sub function for making the validation
-        def validate_number(radicado: str, sap: str) -> bool:
-            try:
-                int(sap)
-                return True
-            except ValueError:
-                return radicado in exception_list
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_number(
-                str(row.iloc[2]),  # Radicado
-                str(row.iloc[77]),  # SAP
-            ),
-            axis=1,
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, 77, "ValidacionSap")
+        return self.run_rule(sap_rule())
 
     def otros_documentos(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        polizas: list[str] = [
-            "3400004306",
-            "3400003706",
-            "3400004407",
-            "3400003704",
-        ]
-        allowed: list[str] = ["SI", "NO", "NA"]
-        data_frame = data_frame[data_frame.iloc[:, 11].astype(str) == "334"]
-
-        ## Sub function to validate the cell format
-        def validate_cell_format(poliza: str, value: str) -> bool:
-            if poliza in polizas:
-                return value in allowed
-            else:
-                return value == "nan"
-
-        data_frame["is_valid"] = data_frame.apply(
-            lambda row: validate_cell_format(
-                str(row.iloc[6]),  # Poliza
-                str(row.iloc[103]),  # Otros documentos
-            ),
-            axis=1,
-        )
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(
-            inconsistencies, [6, 103], "ValidacionOtrosDocumentos"
-        )
+        return self.run_rule(otros_documentos_rule())
 
     def concepto(self) -> str:
-        data_frame: pd.DataFrame = self.read_excel(self.path_file, self.sheet_name)
-        exception_df: pd.DataFrame = self.read_excel(self.exception_file, "LISTAS")
-        exception_list: list[str] = (
-            exception_df["CONCEPTO"].dropna().astype(str).to_list()
+        return self.run_rule(concepto_rule())
+
+
+## Rules of the validations, built from the parameters of their bot steps
+
+
+def empty_col_rule(col_idx: int, mandatory: bool) -> Rule:
+    return Rule(
+        "validate_empty_col",
+        (col_idx,),
+        lambda data_frame: data_frame[col_idx].isna(),
+        "ValidacionColumnasVacias",
+        col_idx,
+        keep=not mandatory,
+    )
+
+
+def number_type_rule(col_idx: int) -> Rule:
+    value = text(col_idx).without(".")
+    return Rule(
+        "number_type",
+        (col_idx,),
+        value.pipe(int_text) | value.isin(source(0)),
+        "DatoTipoNumero",
+        col_idx,
+        exceptions=(("LISTAS", "SAP"),),
+    )
+
+
+def date_type_rule(col_idx: int) -> Rule:
+    return Rule(
+        "date_type",
+        (col_idx,),
+        date(col_idx).notna(),
+        "DatosTipoFecha",
+        col_idx,
+    )
+
+
+def value_length_rule(col_idx: int, length: int) -> Rule:
+    return Rule(
+        "value_length",
+        (col_idx,),
+        text(col_idx).pipe(exact_length, length),
+        "LongitudValor",
+        col_idx,
+    )
+
+
+def exception_list_rule(
+    col_idx: int, exception_col_name: int, exception_sheet: str, new_sheet: str
+) -> Rule:
+    def check(data_frame: pd.DataFrame, exception_df: pd.DataFrame) -> pd.Series:
+        col_exception: pd.Series = exception_df[exception_col_name].dropna()
+        return data_frame[col_idx].isin(col_exception)
+
+    return Rule(
+        "validate_exception_list",
+        (col_idx,),
+        check,
+        new_sheet,
+        col_idx,
+        exceptions=((exception_sheet, None),),
+    )
+
+
+def special_characters_rule(col_idx: int) -> Rule:
+    return Rule(
+        "no_special_characters",
+        (col_idx,),
+        text(col_idx).matches(SPECIAL_CHARACTER),
+        "ValidacionCaracteresEspaciales",
+        col_idx,
+        keep=True,
+    )
+
+
+def month_rule(
+    date_idx: int, month_idx: int, exception_sheet: str, exception_idx: int
+) -> Rule:
+    ## The correct month depends on the number of the month of the date
+    months: dict = {
+        1: "ENERO",
+        2: "FEBRERO",
+        3: "MARZO",
+        4: "ABRIL",
+        5: "MAYO",
+        6: "JUNIO",
+        7: "JULIO",
+        8: "AGOSTO",
+        9: "SEPTIEMBRE",
+        10: "OCTUBRE",
+        11: "NOVIEMBRE",
+        12: "DICIEMBRE",
+    }
+    standard_month = month(date_idx, "%Y-%m-%d").map(months)
+    ## Every cell of the exception column as text, "nan" for the empty ones,
+    ## so the rows without radicado pass when the column has empty cells
+    radicados = source(0).pipe(
+        lambda exception_df: cell_text(exception_df.iloc[:, exception_idx])
+    )
+
+    return Rule(
+        "month_depends_on_date",
+        (date_idx, month_idx, 2),
+        (text(month_idx) == standard_month) | text(2).isin(radicados),
+        "ValidacionMesCorte",
+        month_idx,
+        exceptions=((exception_sheet, None),),
+    )
+
+
+def radicado_format_rule(col_idx) -> Rule:
+    return Rule(
+        "radicado_format",
+        (col_idx,),
+        text(col_idx).matches(RADICADO),
+        "FormatoNumeroRadicado",
+        col_idx,
+    )
+
+
+def acuerdo_range_rule(col_idx: int) -> Rule:
+    return Rule(
+        "acuerdo_range",
+        (col_idx,),
+        lambda data_frame: in_range(data_frame[col_idx], 1, 30),
+        "ValidacionAcuerdo",
+        col_idx,
+    )
+
+
+def coaseguradora_rule(file_idx: int, exception_sheet: str, exception_col: str) -> Rule:
+    def check(data_frame: pd.DataFrame, exception_df: pd.DataFrame) -> pd.Series:
+        exception_values: pd.Series = exception_df[exception_col].dropna()
+        file_col: pd.Series = data_frame[file_idx]
+        return (file_col.isin(exception_values)) | (pd.isna(file_col))
+
+    return Rule(
+        "coaseguradora",
+        (file_idx,),
+        check,
+        "CompañiaCoaseguradora",
+        file_idx,
+        exceptions=((exception_sheet, None),),
+    )
+
+
+def two_options_rule(col_idx: int, options: list[str], new_sheet: str) -> Rule:
+    return Rule(
+        "only_two_options",
+        (col_idx,),
+        lambda data_frame: allowed_values(data_frame[col_idx], options),
+        new_sheet,
+        col_idx,
+        flag="id_valid",
+    )
+
+
+def white_spaces_rule(col_idx: int, new_sheet: str) -> Rule:
+    return Rule(
+        "no_white_spaces",
+        (col_idx,),
+        ~text(col_idx).matches(DOUBLE_SPACE),
+        new_sheet,
+        col_idx,
+    )
+
+
+def percentage_format_rule(col_idx: int, can_be_null: bool) -> Rule:
+    ## Both formats of the percentage, with "1" or the empty cell, in a single pass
+    pattern = NULLABLE_PERCENTAGE if can_be_null else PERCENTAGE
+    return Rule(
+        "percentage_format",
+        (col_idx,),
+        text(col_idx).without(" ").matches(pattern),
+        "FormatoPorcentaje",
+        col_idx,
+    )
+
+
+def identification_rule() -> Rule:
+    identificador_pagos = text(75)
+    ## Spaces at the start, at the end or together are never valid
+    return Rule(
+        "identification_pagos_iaxis",
+        (75, 2),
+        ~identificador_pagos.matches(BAD_SPACING)
+        & ((identificador_pagos != "nan") | text(2).isin(source(0))),
+        "IdentificacionPagosIaxis",
+        [12, 75],
+        exceptions=(("OTRAS EXCEPCIONES", 5),),
+    )
+
+
+def need_exception_rule(
+    col_idx: int,
+    exception_sheet: str,
+    exception_idx: int,
+    new_sheet: str,
+    list_sheet: str,
+    list_idx: int,
+) -> Rule:
+    def check(
+        data_frame: pd.DataFrame, list_col: frozenset, exception_col: frozenset
+    ) -> pd.Series:
+        file_col: pd.Series = data_frame[col_idx].astype(str)
+        return (file_col.isin(exception_col)) | (file_col.isin(list_col))
+
+    return Rule(
+        "need_exception",
+        (col_idx,),
+        check,
+        new_sheet,
+        col_idx,
+        exceptions=((list_sheet, list_idx), (exception_sheet, exception_idx)),
+    )
+
+
+def banks_rule() -> Rule:
+    def merge(
+        data_frame: pd.DataFrame, list_df: pd.DataFrame, exception_list: frozenset
+    ) -> pd.DataFrame:
+        new_list_df: pd.DataFrame = list_df.iloc[:, 1:3].dropna()
+        col_1_name: str = data_frame.columns[64]
+        col_2_name: str = new_list_df.columns[0]
+        return data_frame.merge(
+            new_list_df,
+            how="left",
+            left_on=col_1_name,
+            right_on=col_2_name,
+            suffixes=("_PAGOS", "_LISTAS"),
         )
 
-        ## Sub function to validate the concepto
-        def validate_concepto(concepto: str) -> bool:
-            return concepto in exception_list
-
-        data_frame["is_valid"] = data_frame["CONCEPTO"].apply(
-            lambda value: validate_concepto(str(value))
+    def check(
+        merged_df: pd.DataFrame, list_df: pd.DataFrame, exception_list: frozenset
+    ) -> pd.Series:
+        return (merged_df.iloc[:, 65] == merged_df.iloc[:, -1]) | (
+            merged_df.iloc[:, 64].astype(str).isin(exception_list)
         )
 
-        inconsistencies: pd.DataFrame = data_frame[~data_frame["is_valid"]]
-        return self.validate_inconsistencies(inconsistencies, 35, "ValidacionConcepto")
-
+    return Rule(
+        "banks_validation",
+        None,
+        check,
+        "ValidacionBancos",
+        64,
+        exceptions=(("LISTAS", None), ("OTRAS EXCEPCIONES", 1)),
+        prepare=merge,
+    )
+
+
+def desempleo_rule(new_sheet: str, col_idx: int) -> Rule:
+    ramo = text(12)
+    character = text(col_idx)  # Special column
+    is_valid_character = character.isin(["SI", "NO"])
+
+    return Rule(
+        "mandatory_desempleo",
+        (12, col_idx),
+        cases(
+            when(ramo == "DESEMPLEO", is_valid_character),
+            when(
+                ramo == "VIDA GRUPO DEUDORES", is_valid_character | (character == "nan")
+            ),
+            default=character == "nan",
+        ),
+        new_sheet,
+        [12, col_idx],
+    )
+
+
+def no_empty_rule(col_idx: int, option: str, new_sheet: str) -> Rule:
+    ## The value is empty or the option
+    options: list = ["nan", option] if isinstance(option, str) else ["nan"]
+    return Rule(
+        "no_empty",
+        (col_idx,),
+        text(col_idx).isin(options),
+        new_sheet,
+        [col_idx],
+    )
+
+
+def sarlaf_rule() -> Rule:
+    bien_diligenciado = text(86)  # Special column
+    return Rule(
+        "check_sarlaf",
+        (85, 86),
+        cases(
+            when(text(85) == "SI", bien_diligenciado == "X"),
+            default=bien_diligenciado == "nan",
+        ),
+        "CheckBeneficiarioSarlaf",
+        [85, 86],
+    )
+
+
+def fecha_vencimiento_rule() -> Rule:
+    ramo = text(12)
+    expiration_date = text(97)
+    return Rule(
+        "fecha_vencimiento",
+        (12, 97),
+        cases(
+            when(ramo == "DESEMPLEO", expiration_date.matches(FECHA_VENCIMIENTO)),
+            default=(expiration_date == "nan") | ramo.isin(source(0)),
+        ),
+        "FechaVencimiento",
+        [12, 97],
+        exceptions=(("OTRAS EXCEPCIONES", 3),),
+    )
+
+
+def evento_cinco_rule() -> Rule:
+    return Rule(
+        "evento_cinco",
+        None,
+        lambda data_frame: allowed_values(data_frame["EVENTO 5"], ["SI", "NO"]),
+        "ValidacionEventoCinco",
+        110,
+    )
+
+
+def sap_rule() -> Rule:
+    ## The SAP is a number, or the radicado has an exception
+    return Rule(
+        "sap",
+        (2, 77),
+        text(77).pipe(int_text) | text(2).isin(source(0)),
+        "ValidacionSap",
+        77,
+        exceptions=(("OTRAS EXCEPCIONES", 4),),
+    )
+
+
+def otros_documentos_rule() -> Rule:
+    polizas: list[str] = [
+        "3400004306",
+        "3400003706",
+        "3400004407",
+        "3400003704",
+    ]
+    allowed: list[str] = ["SI", "NO", "NA"]
+    value = text(103)  # Otros documentos
+
+    return Rule(
+        "otros_documentos",
+        (11, 6, 103),
+        cases(
+            when(text(6).isin(polizas), value.isin(allowed)),  # Poliza
+            default=value == "nan",
+        ),
+        "ValidacionOtrosDocumentos",
+        [6, 103],
+        prepare=lambda data_frame: data_frame[data_frame[11].astype(str) == "334"],
+    )
+
+
+def concepto_rule() -> Rule:
+    ## Sub function to validate the concepto
+    def check(data_frame: pd.DataFrame, exception_list: frozenset) -> pd.Series:
+        return data_frame["CONCEPTO"].apply(lambda value: str(value) in exception_list)
+
+    return Rule(
+        "concepto",
+        None,
+        check,
+        "ValidacionConcepto",
+        35,
+        exceptions=(("LISTAS", "CONCEPTO"),),
+    )
+
+
+## Rules of a rule set, by id, with the factory and the conversion of its parameters
+RULES: dict = {
+    "validate_empty_col": (empty_col_rule, {"col_idx": int, "is_mandatory": None}),
+    "number_type": (number_type_rule, {"col_idx": int}),
+    "date_type": (date_type_rule, {"col_idx": int}),
+    "value_length": (value_length_rule, {"col_idx": int, "length": int}),
+    "validate_exception_list": (
+        exception_list_rule,
+        {
+            "col_idx": int,
+            "exception_col_name": None,
+            "exception_sheet": None,
+            "new_sheet": None,
+        },
+    ),
+    "no_special_characters": (special_characters_rule, {"col_idx": int}),
+    "month_depends_on_date": (
+        month_rule,
+        {
+            "date_idx": int,
+            "month_idx": int,
+            "exception_sheet": None,
+            "exception_idx": int,
+        },
+    ),
+    "radicado_format": (radicado_format_rule, {"col_idx": int}),
+    "acuerdo_range": (acuerdo_range_rule, {"col_idx": int}),
+    "coaseguradora": (
+        coaseguradora_rule,
+        {"file_idx": int, "exception_sheet": None, "exception_col": None},
+    ),
+    "only_two_options": (
+        two_options_rule,
+        {"col_idx": int, "options": None, "new_sheet": None},
+    ),
+    "no_white_spaces": (white_spaces_rule, {"col_idx": int, "new_sheet": None}),
+    "percentage_format": (
+        percentage_format_rule,
+        {"col_idx": int, "can_be_null": bool},
+    ),
+    "identification_pagos_iaxis": (identification_rule, {}),
+    "need_exception": (
+        need_exception_rule,
+        {
+            "col_idx": int,
+            "exception_sheet": None,
+            "exception_idx": int,
+            "new_sheet": None,
+            "list_sheet": None,
+            "list_idx": int,
+        },
+    ),
+    "banks_validation": (banks_rule, {}),
+    "mandatory_desempleo": (desempleo_rule, {"new_sheet": None, "col_idx": int}),
+    "no_empty": (no_empty_rule, {"col_idx": int, "option": None, "new_sheet": None}),
+    "check_sarlaf": (sarlaf_rule, {}),
+    "fecha_vencimiento": (fecha_vencimiento_rule, {}),
+    "evento_cinco": (evento_cinco_rule, {}),
+    "sap": (sap_rule, {}),
+    "otros_documentos": (otros_documentos_rule, {}),
+    "concepto": (concepto_rule, {}),
+}
 
 ## Set global variables
 validation_group: Optional[FirstValidationGroup] = None
@@ -546,6 +672,7 @@ validation_group: Optional[FirstValidationGroup] = None
 def main(params: dict) -> bool:
     try:
         global validation_group
+        configure_sinks(params)
 
         ## Get the variables
         file_path: str = params.get("file_path")
@@ -825,6 +952,20 @@ def validate_concepto() -> str:
         return f"ERROR: {e}"
 
 
+def validate_rules(params: dict) -> str:
+    try:
+        ## The rules run against the sheet loaded once (see rules.rule_steps)
+        rules: list = build_rules(RULES, rule_steps(params))
+        results: list = validation_group.run_rules(rules)
+        ## The sheets of all the rules are written together
+        error = flush_inconsistencies()
+        if error is not None:
+            return f"ERROR: {error}"
+        return rule_set_result(rules, results)
+    except Exception as e:
+        return f"ERROR: {e}"
+
+
 if __name__ == "__main__":
     params = {
         "file_path": r"C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE PAGOS.xlsx",
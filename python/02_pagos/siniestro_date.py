@@ -1,8 +1,21 @@
 import pandas as pd  # type: ignore
 import traceback
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.exception_index import exception_index
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import coordinates
 
 def main(params: dict) -> str:
     try:
+        configure_sinks(params)
         # Set initial variables and values
         file_path = params.get("file_path")
         sheet_name = params.get("sheet_name")
@@ -14,16 +27,11 @@ def main(params: dict) -> str:
             return "ERROR: Required inputs are missing"
 
         ## Read the file into a DataFrame
-        data_frame: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
-        exception_df: pd.DataFrame = pd.read_excel(
-            exception_file, sheet_name="OTRAS EXCEPCIONES", engine="openpyxl"
-        )
+        data_frame: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
         ## List exception
-        list_exception: list[str] = (
-            exception_df.iloc[:, 6].dropna().astype(str).to_list()
+        list_exception: frozenset = exception_index(exception_file).values(
+            "OTRAS EXCEPCIONES", 6
         )
 
         ## Col indices
@@ -59,33 +67,19 @@ def main(params: dict) -> str:
         inconsistencies = inconsistencies[~inconsistencies["validate_exception"]].copy()
 
         if not inconsistencies.empty:
-            inconsistencies["COORDENADA_1"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(aviso_siniestro_index+1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADA_1"] = coordinates(
+                inconsistencies.index, aviso_siniestro_index + 1
             )
 
-            inconsistencies["COORDENADA_ 2"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(email_financiera_index+1)}{row.name + 2}",
-                axis=1,
+            inconsistencies["COORDENADA_ 2"] = coordinates(
+                inconsistencies.index, email_financiera_index + 1
             )
             new_sheet = "ValidacionAnioSiniestro"
-            with pd.ExcelFile(inconsistencies_file, engine="openpyxl") as xls:
-                if new_sheet in xls.sheet_names:
-                    exiting_df: pd.DataFrame = pd.read_excel(
-                        xls, engine="openpyxl", sheet_name=new_sheet
-                    )
-                    exiting_df = pd.concat(
-                        [exiting_df, inconsistencies], ignore_index=True
-                    )
-
-            with pd.ExcelWriter(
-                inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                inconsistencies.to_excel(writer, sheet_name=new_sheet, index=False)
-                return "SUCCESS: inconsistencias registradas correctamente"
+            inconsistency_sink(inconsistencies_file).add(new_sheet, inconsistencies)
+            error = flush_inconsistencies()
+            if error is not None:
+                return f"ERROR: {error}"
+            return "SUCCESS: inconsistencias registradas correctamente"
         else:
             return "INFO: validación realizada, no se encontraron inconsistencias"
 
@@ -94,15 +88,6 @@ def main(params: dict) -> str:
         return f"ERROR: {traceback.format_exc()}"
 
 
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name"""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
-
-
 if __name__ == "__main__":
     params = {
         "file_path": r"C:\ProgramData\AutomationAnywhere\Bots\Logs\AD_RCSN_SabanaPagosYBasesParaSinestralidad\TempFolder\BASE DE PAGOS.xlsx",
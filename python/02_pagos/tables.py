@@ -2,6 +2,12 @@ import pandas as pd  # type: ignore
 from datetime import datetime
 import traceback
 from typing import Optional
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.xlsx_patch import replace_sheet
 
 
 class Tables:
@@ -13,7 +19,7 @@ class Tables:
 
     def read_excel(self, file_path: str, sheet_name: str) -> pd.DataFrame:
         """Method for returning a data frame"""
-        return pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+        return load_excel(file_path, sheet_name=sheet_name)
 
     def create_pivot_table(
         self, df: pd.DataFrame, value_column: str, columna: str, aggfunc: str
@@ -57,11 +63,8 @@ class Tables:
         self, data_frame: pd.DataFrame, file_path: str, sheet_name: str
     ) -> None:
         """Function to save the DataFrame to an Excel file"""
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", mode="a", if_sheet_exists="replace"
-        ) as writer:
-            data_frame.to_excel(writer, sheet_name=sheet_name, index=True)
-            return "Tabla guardada correctamente"
+        replace_sheet(file_path, sheet_name, data_frame, index=True)
+        return "Tabla guardada correctamente"
 
     def get_month(self, date: str) -> str:
         months = {
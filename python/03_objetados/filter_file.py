@@ -1,4 +1,9 @@
 import pandas as pd  # type: ignore
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import DateRange, load_excel, save_excel
 
 
 def main(params: dict):
@@ -19,9 +24,12 @@ def main(params: dict):
         begin_date = pd.to_datetime(begin_date, format="%d/%m/%Y")
         cut_off_date = pd.to_datetime(cut_off_date, format="%d/%m/%Y")
 
-        ##Read the books and make a filter
-        objetados_df: pd.DataFrame = pd.read_excel(
-            path_file, sheet_name=sheet_name, engine="openpyxl"
+        ##Read the books and make a filter, only the rows between the dates are read
+        date_range = DateRange(
+            col_idx, begin_date, cut_off_date, date_format="%d/%m/%Y"
+        )
+        objetados_df: pd.DataFrame = load_excel(
+            path_file, sheet_name=sheet_name, date_range=date_range
         ).iloc[:, :111]
 
         ## Convert the column to date type
@@ -29,14 +37,8 @@ def main(params: dict):
             objetados_df.iloc[:, col_idx], format="%d/%m/%Y"
         )
 
-        ## Make a filter
-        objetados_df = objetados_df[
-            (objetados_df.iloc[:, col_idx] >= begin_date)
-            & (objetados_df.iloc[:, col_idx] <= cut_off_date)
-        ]
-
         ## Save changes into a temp folder
-        objetados_df.to_excel(temp_file, index=False, sheet_name=sheet_name)
+        save_excel(objetados_df, temp_file, sheet_name=sheet_name)
         return True, "Temp file created successfully"
 
     except Exception as e:
@@ -1,8 +1,21 @@
 import pandas as pd  # type: ignore
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import load_excel
+from utils.exception_index import exception_index
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.coordinates import add_coordinates
 
 
 def main(params: dict) -> str:
     try:
+        configure_sinks(params)
         # Set initial variables and values
         file_path = params.get("file_path")
         sheet_name = params.get("sheet_name")
@@ -14,16 +27,11 @@ def main(params: dict) -> str:
             raise Exception("Required inputs are missing")
 
         # Read the file into a DataFrame
-        data_frame: pd.DataFrame = pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl"
-        )
-        exception_df: pd.DataFrame = pd.read_excel(
-            exception_file, sheet_name="PRESCRIPCION", engine="openpyxl"
-        )
+        data_frame: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name)
 
         # Set the exception list
-        list_exception: list[str] = (
-            exception_df.iloc[:, 0].dropna().astype(str).to_list()
+        list_exception: frozenset = exception_index(exception_file).values(
+            "PRESCRIPCION", 0
         )
 
         # Get only "CONCEPTO" values that are equal to "PRESCRIPCIÓN"
@@ -56,13 +64,7 @@ def main(params: dict) -> str:
 
         if not inconsistencies.empty:
             # Write the coordinates
-            inconsistencies["COORDENADA_1"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(28)}{row.name + 2}",
-                axis=1,
-            )
-            inconsistencies["COORDENADA_2"] = inconsistencies.apply(
-                lambda row: f"{get_excel_column_name(46)}{row.name + 2}", axis=1
-            )
+            add_coordinates(inconsistencies, {"COORDENADA_1": 28, "COORDENADA_2": 46})
             # Append inconsistencies
             is_append_inconsistencies: bool = append_inconsistencias(
                 inconsistencies_file, "FechaPrescripción", inconsistencies
@@ -79,29 +81,11 @@ def main(params: dict) -> str:
 
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
-    try:
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=True)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=False, sheet_name=new_sheet)
-        return True
-    except Exception as e:
-        print(f"ERROR: {e}")
-        return False
-
-
-def get_excel_column_name(n):
-    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)."""
-    result = ""
-    while n > 0:
-        n, remainder = divmod(n - 1, 26)
-        result = chr(65 + remainder) + result
-    return result
+    inconsistency_sink(file_path).add(new_sheet, data_frame)
+    error = flush_inconsistencies()
+    if error is not None:
+        raise Exception(error)
+    return True
 
 
 if __name__ == "__main__":
@@ -3,10 +3,22 @@ from datetime import datetime
 import re
 import traceback
 import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import excel_loader
+from utils.excel_loader import DateRange
+from utils.inconsistency_sink import (
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.xlsx_patch import replace_sheet
 
 
 def main(params: dict):
     try:
+        configure_sinks(params)
         ##Set initial variables
         file_path: str = params.get("file_path")
         sheet_name: str = params.get("sheet_name")
@@ -25,13 +37,13 @@ def main(params: dict):
         date = f"01/01/{year}"
         initial_date = pd.to_datetime(date, format="%d/%m/%Y")
 
-        # Load data frames
+        # Load data frames, only the rows between the dates of the latest one
+        date_range = DateRange(col_idx, initial_date, cut_date, "neither")
         current_df = load_excel(file_path, sheet_name)
-        latest_df = load_excel(latest_file, sheet_name)
+        latest_filtered = load_excel(latest_file, sheet_name, date_range)
 
         # Filter data
         current_filtered = filter_data(current_df, col_idx, initial_date, cut_date)
-        latest_filtered = filter_data(latest_df, col_idx, initial_date, cut_date)
 
         # Set the months by name
         column_name = "MES_MOVIMIENTO"
@@ -106,9 +118,13 @@ def set_month_names(
     return data_frame
 
 
-def load_excel(file_path: str, sheet_name: str) -> pd.DataFrame:
-    """Load an Excel file into a DataFrame."""
-    return pd.read_excel(file_path, sheet_name=sheet_name, engine="openpyxl")
+def load_excel(
+    file_path: str, sheet_name: str, date_range: DateRange = None
+) -> pd.DataFrame:
+    """Load an Excel file into a DataFrame, only the rows in date_range if given."""
+    return excel_loader.load_excel(
+        file_path, sheet_name=sheet_name, date_range=date_range
+    )
 
 
 def filter_data(df: pd.DataFrame, col_idx: int, start_date, end_date) -> pd.DataFrame:
@@ -197,26 +213,18 @@ def clean_white_spaces(string: str):
 
 def save_to_file(data_frame: pd.DataFrame, file_path: str, sheet_name: str) -> None:
     """Function to save the DataFrame to an Excel file"""
-    with pd.ExcelWriter(
-        file_path, engine="openpyxl", mode="a", if_sheet_exists="replace"
-    ) as writer:
-        data_frame.to_excel(writer, sheet_name=sheet_name, index=True)
-        return "Tabla guardada correctamente"
+    replace_sheet(file_path, sheet_name, data_frame, index=True)
+    return "Tabla guardada correctamente"
 
 
 def append_inconsistencias(file_path: str, new_sheet: str, data_frame) -> None:
     """This function get the inconsistencies data frame and append it into the inconsistencies file"""
     if os.path.exists(file_path):
-        with pd.ExcelFile(file_path, engine="openpyxl") as xls:
-            if new_sheet in xls.sheet_names:
-                existing = pd.read_excel(xls, sheet_name=new_sheet, engine="openpyxl")
-                data_frame = pd.concat([existing, data_frame], ignore_index=False)
-
-        with pd.ExcelWriter(
-            file_path, engine="openpyxl", if_sheet_exists="replace", mode="a"
-        ) as writer:
-            data_frame.to_excel(writer, index=True, sheet_name=new_sheet)
-            return "Inconsistencias registradas correctamente"
+        inconsistency_sink(file_path).add(new_sheet, data_frame, index=True)
+        error = flush_inconsistencies()
+        if error is not None:
+            raise Exception(error)
+        return "Inconsistencias registradas correctamente"
 
 
 if __name__ == "__main__":
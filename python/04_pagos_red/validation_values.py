@@ -2,6 +2,20 @@ import pandas as pd  # type: ignore
 import numpy as np  # type: ignore
 from typing import Optional
 from datetime import datetime
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.excel_loader import concat_columns, load_excel, save_excel
+from utils.exception_index import ExceptionIndex, exception_index
+from utils.inconsistency_sink import (
+    cap_findings,
+    configure_sinks,
+    flush_inconsistencies,
+    inconsistency_sink,
+)
+from utils.rule_caps import cap_message
+from utils.coordinates import add_coordinates, coordinates
 
 
 class ValuesValidation:
@@ -25,58 +39,36 @@ class ValuesValidation:
 
     def read_excel(self, file_path: str, sheet_name: str) -> pd.DataFrame:
         """Method for returning a data frame"""
-        return pd.read_excel(
-            file_path, sheet_name=sheet_name, engine="openpyxl", dtype=str
-        )
+        return load_excel(file_path, sheet_name=sheet_name, dtype=str)
 
-    def save_inconsistencies_file(self, df: pd.DataFrame, new_sheet: str) -> bool:
+    def save_inconsistencies_file(
+        self, df: pd.DataFrame, new_sheet: str, total: Optional[int] = None
+    ) -> bool:
         """Method to save the inconsistencies data frame into the inconsistencies file"""
         try:
-            with pd.ExcelFile(self.inconsistencies_file, engine="openpyxl") as xls:
-                if new_sheet in xls.sheet_names:
-                    existing = pd.read_excel(
-                        xls, engine="openpyxl", sheet_name=new_sheet
-                    )
-                    df = pd.concat([existing, df], ignore_index=True)
-
-            with pd.ExcelWriter(
-                self.inconsistencies_file,
-                engine="openpyxl",
-                mode="a",
-                if_sheet_exists="replace",
-            ) as writer:
-                df.to_excel(writer, sheet_name=new_sheet, index=False)
-                return True
+            inconsistency_sink(self.inconsistencies_file).add(
+                new_sheet, df, total=total
+            )
+            return True
         except Exception as e:
             print(f"Error: {e}")
             return False
 
-    def excel_col_name(self, number) -> str:
-        """Method to convert (1-based) to Excel column name"""
-        result = ""
-        while number > 0:
-            number, reminder = divmod(number - 1, 26)
-            result = chr(65 + reminder) + result
-        return result
-
     def validate_inconsistencies(
         self, df: pd.DataFrame, col_idx, sheet_name: str
     ) -> str:
         """Method to validate the inconsistencies before append in a inconsistencies file"""
         if not df.empty:
-            df = df.copy()
+            ## The findings past the cap of the rule are only counted
+            total = len(df)
+            df = cap_findings(df, sheet_name).copy()
             if isinstance(col_idx, int):
-                df[f"COORDENADAS"] = df.apply(
-                    lambda row: f"{self.excel_col_name(col_idx + 1)}{row.name + 2}",
-                    axis=1,
-                )
+                df[f"COORDENADAS"] = coordinates(df.index, col_idx + 1)
             else:
-                for i in col_idx:
-                    df[f"COORDENADAS_{i + 2}"] = df.apply(
-                        lambda row: f"{self.excel_col_name(i+1)}{row.name + 2}",
-                        axis=1,
-                    )
-            self.save_inconsistencies_file(df, sheet_name)
+                add_coordinates(df, {f"COORDENADAS_{i + 2}": i + 1 for i in col_idx})
+            self.save_inconsistencies_file(df, sheet_name, total)
+            if total > len(df):
+                return cap_message(sheet_name, total, len(df))
             return "Success: Inconsistencies guardadas correctamente"
         else:
             return "Info: Validacion realizada, no se encontraron inconsistencias"
@@ -98,6 +90,11 @@ class ValuesValidation:
 # Instance the main class
 values_validation: Optional[ValuesValidation] = None
 
+# ACM report sheet, its header row (0-based, below the preamble) and the used columns
+ACM_SHEET = "FCT_RS_REPORTE_WS_AUDITORIA"
+ACM_HEADER_ROW = 4
+ACM_COLUMNS = ["id cuenta", "valor aprobado", "Valor Liquidado"]
+
 
 def extract_data_from_propuesta(data_frame: pd.DataFrame) -> pd.DataFrame:
     """Method to get the importan data from propuesta de pagos file and the return it into a data frame"""
@@ -117,23 +114,11 @@ def extract_data_from_propuesta(data_frame: pd.DataFrame) -> pd.DataFrame:
 
 
 def get_acm_report(acm_files: list[str]) -> pd.DataFrame:
-    # Create list of data frames
-    data_frames: list[pd.DataFrame] = []
-    for file in acm_files:
-        # Read the file
-        df: pd.DataFrame = values_validation.read_excel(
-            file, "FCT_RS_REPORTE_WS_AUDITORIA"
-        )
-        # Delete te no needed columns and rows
-        df = df.iloc[3:, 1:]
-        df.columns = df.iloc[0]
-        df = df.iloc[1:].reset_index(drop=True)
-        df = df[["id cuenta", "valor aprobado", "Valor Liquidado"]]
-        # Append data frame into the main data frame
-        data_frames.append(df)
-
-    # Contact all the data frames into a new data frame and return it
-    return pd.concat(data_frames, ignore_index=True)
+    # Read only the needed columns of every file, skipping the rows above the header;
+    # the files are read in parallel and concatenated into a single data frame
+    return concat_columns(
+        acm_files, ACM_SHEET, ACM_COLUMNS, header=ACM_HEADER_ROW, dtype=str
+    )
 
 
 def cross_file(propuesta_df: pd.DataFrame, acm_df: pd.DataFrame) -> pd.DataFrame:
@@ -239,11 +224,15 @@ def validate_values(acm_files: list[str]) -> None:
             [historical_df, filled_df], ignore_index=True
         )
         # Save the final file
-        final_df.to_excel(
+        save_excel(
+            final_df,
             values_validation.temp_file,
             sheet_name=values_validation.sheet_name,
-            index=False,
         )
+        # Write the inconsistencies before reporting the validation done
+        error = flush_inconsistencies()
+        if error is not None:
+            return False, f"Error: {error}"
         return True, "Validación de valores realizada correctamente"
 
     except Exception as e:
@@ -253,13 +242,12 @@ def validate_values(acm_files: list[str]) -> None:
 def report_inconsistencies(data_frame: pd.DataFrame) -> None:
     """Method to generate a report of inconsistencies and save it into tbe correct file"""
     try:
-        # 1. Valores validation
-        valores_exception_df: pd.DataFrame = values_validation.read_excel(
-            values_validation.exception_file, "VALIDACION VALORES"
-        )
-        valores_exception_list: list[str] = (
-            valores_exception_df.iloc[:, 0].dropna().astype(str).to_list()
+        # Exception lists, the exception file is read once for every validation
+        exceptions: ExceptionIndex = exception_index(
+            values_validation.exception_file, str
         )
+        # 1. Valores validation
+        valores_exception_list: frozenset = exceptions.values("VALIDACION VALORES", 0)
         valores_inconsistencies: pd.DataFrame = data_frame[~data_frame.iloc[:, 7]]
         valores_inconsistencies = valores_inconsistencies[
             ~valores_inconsistencies.iloc[:, 3].isin(valores_exception_list)
@@ -269,11 +257,8 @@ def report_inconsistencies(data_frame: pd.DataFrame) -> None:
             valores_inconsistencies, [3, 7], "ValidacionValores"
         )
         # 2. Radicados number duplicated
-        duplicados_exception_list: pd.DataFrame = values_validation.read_excel(
-            values_validation.exception_file, "VALIDACION DUPLICADOS"
-        )
-        radicados_exception_list: list[str] = (
-            duplicados_exception_list.iloc[:, 0].dropna().astype(str).to_list()
+        radicados_exception_list: frozenset = exceptions.values(
+            "VALIDACION DUPLICADOS", 0
         )
         radicados_inconsistencies: pd.DataFrame = data_frame[
             data_frame.iloc[:, 8].astype(str) == "2"
@@ -286,9 +271,7 @@ def report_inconsistencies(data_frame: pd.DataFrame) -> None:
             radicados_inconsistencies, [1, 8], "ValidacionRadicadosDuplicados"
         )
         # 3. Key duplicated
-        key_exception_list: list[str] = (
-            duplicados_exception_list.iloc[:, 1].dropna().astype(str).to_list()
-        )
+        key_exception_list: frozenset = exceptions.values("VALIDACION DUPLICADOS", 1)
         key_inconsistencies: pd.DataFrame = data_frame[
             data_frame.iloc[:, 9].astype(str) == "2"
         ]
@@ -300,11 +283,8 @@ def report_inconsistencies(data_frame: pd.DataFrame) -> None:
             key_inconsistencies, [3, 9], "ValidacionKeyDuplicados"
         )
         # 4. Radicado format
-        format_exception_df: pd.DataFrame = values_validation.read_excel(
-            values_validation.exception_file, "VALIDACION FORMATOS"
-        )
-        radicados_format_exception_list: list[str] = (
-            format_exception_df.iloc[:, 0].dropna().astype(str).to_list()
+        radicados_format_exception_list: frozenset = exceptions.values(
+            "VALIDACION FORMATOS", 0
         )
         radicados_format_inconsistencies: pd.DataFrame = data_frame[
             ~data_frame.iloc[:, 10].astype(bool)
@@ -319,8 +299,8 @@ def report_inconsistencies(data_frame: pd.DataFrame) -> None:
             radicados_format_inconsistencies, [3, 10], "ValidacionRadicadoFormato"
         )
         # 5. Valor 100% format
-        valor_100_format_exception_list: list[str] = (
-            format_exception_df.iloc[:, 1].dropna().astype(str).to_list()
+        valor_100_format_exception_list: frozenset = exceptions.values(
+            "VALIDACION FORMATOS", 1
         )
         valor_100_format_inconsistencies: pd.DataFrame = data_frame[
             ~data_frame.iloc[:, 11].astype(bool)
@@ -344,6 +324,7 @@ def report_inconsistencies(data_frame: pd.DataFrame) -> None:
 def main(params: dict) -> bool:
     try:
         global values_validation
+        configure_sinks(params)
         if values_validation is None:
             values_validation = ValuesValidation(
                 file_path=params.get("file_path"),
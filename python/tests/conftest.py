@@ -0,0 +1,30 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PYTHON_DIR)
+
+
+def load_script(relative_path: str, name: str):
+    """Return a script of the repo as a module, the process folders not being packages"""
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(PYTHON_DIR, relative_path)
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def pagos():
+    return load_script("02_pagos/first_validation_group.py", "pagos_first_validation")
+
+
+@pytest.fixture(scope="session")
+def objetados():
+    return load_script(
+        "03_objetados/first_validation_group.py", "objetados_first_validation"
+    )
@@ -0,0 +1,24 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+from utils.excel_loader import load_excel, parse_excel
+
+
+@pytest.fixture
+def workbook(tmp_path) -> str:
+    file_path = str(tmp_path / "base.xlsx")
+    pd.DataFrame(
+        {"RADICADO": ["2024 01 001 000001", np.nan, "3"], "VALOR": [1.5, 2, np.nan]}
+    ).to_excel(file_path, sheet_name="BASE", index=False)
+    return file_path
+
+
+@pytest.mark.parametrize("read", [parse_excel, load_excel])
+@pytest.mark.parametrize("options", [{}, {"dtype": str}, {"nrows": 2}])
+def test_a_sheet_without_header_reads_as_with_read_excel(workbook, read, options):
+    expected = pd.read_excel(workbook, sheet_name="BASE", header=None, **options)
+
+    for _ in range(2):
+        data_frame = read(workbook, "BASE", header=None, **options)
+        pd.testing.assert_frame_equal(data_frame, expected)
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pandas as pd  # type: ignore
+import pytest
+from openpyxl import Workbook  # type: ignore
+
+from utils.findings_archive import findings_archive, pa
+from utils.inconsistency_journal import InconsistencyJournal
+from utils.inconsistency_sink import InconsistencySink
+
+
+def findings_frame(first: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "RADICADO": [
+                f"2024 01 001 {number:06d}" for number in range(first, first + 3)
+            ],
+            "COORDENADAS": ["B2", "B3", "B4"],
+        }
+    )
+
+
+def stored_rows(journal: InconsistencyJournal) -> tuple:
+    connection = sqlite3.connect(journal.path)
+    try:
+        return tuple(
+            connection.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            for table in ("batches", "findings")
+        )
+    finally:
+        connection.close()
+
+
+def test_discard_deletes_only_the_exported_batches_up_to_the_id(tmp_path):
+    journal = InconsistencyJournal(str(tmp_path / "inc.xlsx"))
+    first = journal.append("Rule", findings_frame(0))
+    journal.append("Rule", findings_frame(3))
+    with journal.claim() as (batches, runs):
+        assert len(batches) == 2 and runs == {}
+    journal.append("Rule", findings_frame(6))
+
+    assert journal.discard(first) == 1
+    assert stored_rows(journal) == (2, 6)
+    assert journal.discard(None) == 1
+    assert stored_rows(journal) == (1, 3)
+    assert journal.pending()
+
+
+@pytest.mark.skipif(pa is None, reason="the findings are only archived with pyarrow")
+def test_flush_leaves_no_archived_batch_in_the_journal(tmp_path):
+    file_path = tmp_path / "inc.xlsx"
+    workbook = Workbook()
+    workbook.active.title = "Hoja1"
+    workbook.save(file_path)
+    sink = InconsistencySink(str(file_path))
+
+    for run in range(3):
+        sink.add("Rule", findings_frame(run * 3))
+        assert sink.flush()
+
+    assert stored_rows(sink.journal) == (0, 0)
+    archive = findings_archive(str(tmp_path / "__findings__"))
+    assert len(archive.lookup("2024 01 001 000007")) == 1
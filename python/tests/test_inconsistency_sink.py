@@ -0,0 +1,130 @@
+import logging
+import os
+
+import pandas as pd  # type: ignore
+import pytest
+from openpyxl import Workbook  # type: ignore
+
+from conftest import load_script
+from utils import inconsistency_journal as journals
+from utils import inconsistency_sink as sinks
+
+
+def empty_workbook(file_path) -> str:
+    workbook = Workbook()
+    workbook.active.title = "Hoja1"
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def test_a_failed_flush_is_returned_and_not_printed(tmp_path, monkeypatch, capsys):
+    file_path = empty_workbook(tmp_path / "inc.xlsx")
+    write_sheets = sinks.write_sheets
+
+    def locked_workbook(path, *args):
+        if path == file_path:
+            raise PermissionError("the workbook is open")
+        write_sheets(path, *args)
+
+    monkeypatch.setattr(sinks, "write_sheets", locked_workbook)
+    monkeypatch.setattr(sinks, "_sinks", {})
+    sinks.inconsistency_sink(file_path).add("Rule", pd.DataFrame({"A": [1, 2]}))
+
+    error = sinks.flush_inconsistencies()
+
+    assert "the workbook is open" in error
+    assert "inc_pendientes.xlsx" in error
+    assert os.path.exists(tmp_path / "inc_pendientes.xlsx")
+    assert capsys.readouterr().out == ""
+
+
+def test_a_flush_that_reaches_the_workbook_returns_none(tmp_path, monkeypatch):
+    file_path = empty_workbook(tmp_path / "inc.xlsx")
+    monkeypatch.setattr(sinks, "_sinks", {})
+    sinks.inconsistency_sink(file_path).add("Rule", pd.DataFrame({"A": [1, 2]}))
+
+    assert sinks.flush_inconsistencies() is None
+    assert pd.read_excel(file_path, sheet_name="Rule")["A"].tolist() == [1, 2]
+
+
+def test_a_script_reports_the_failed_flush_instead_of_success(tmp_path, monkeypatch):
+    file_path = empty_workbook(tmp_path / "inc.xlsx")
+    base_path = str(tmp_path / "base.xlsx")
+    pd.DataFrame({"NUMERO": ["12", "abc", "7"]}).to_excel(
+        base_path, sheet_name="CASOS", index=False
+    )
+    write_sheets = sinks.write_sheets
+
+    def locked_workbook(path, *args):
+        if path == file_path:
+            raise PermissionError("the workbook is open")
+        write_sheets(path, *args)
+
+    monkeypatch.setattr(sinks, "write_sheets", locked_workbook)
+    monkeypatch.setattr(sinks, "_sinks", {})
+    number_types = load_script("01_reparto/validate_number_types.py", "number_types")
+
+    message = number_types.main(
+        {
+            "file_path": base_path,
+            "col_idx": "0",
+            "inconsistencias_file": file_path,
+            "sheet_name": "CASOS",
+            "is_null": False,
+        }
+    )
+
+    assert message.startswith("Error: ")
+    assert "the workbook is open" in message
+
+
+@pytest.mark.parametrize("module", ["pagos", "objetados"])
+def test_a_single_validator_reports_the_failed_flush(
+    request, tmp_path, monkeypatch, module
+):
+    file_path = empty_workbook(tmp_path / "inc.xlsx")
+    base_path = str(tmp_path / "base.xlsx")
+    pd.DataFrame({"RADICADO": ["2024 01 001 000001", None]}).to_excel(
+        base_path, sheet_name="BASE", index=False
+    )
+    write_sheets = sinks.write_sheets
+
+    def locked_workbook(path, *args):
+        if path == file_path:
+            raise PermissionError("the workbook is open")
+        write_sheets(path, *args)
+
+    monkeypatch.setattr(sinks, "write_sheets", locked_workbook)
+    monkeypatch.setattr(sinks, "_sinks", {})
+    group = request.getfixturevalue(module).FirstValidationGroup(
+        base_path, "BASE", file_path, "exceptions.xlsx"
+    )
+
+    message = group.validate_empty_col(0, True)
+
+    assert message.startswith("ERROR: ")
+    assert "the workbook is open" in message
+    monkeypatch.setattr(sinks, "write_sheets", write_sheets)
+    assert group.validate_empty_col(0, True).startswith("SUCCESS")
+    sheets = pd.read_excel(file_path, sheet_name=None)
+    assert [len(sheet) for name, sheet in sheets.items() if name != "Hoja1"] == [1]
+
+
+def test_a_flush_logs_the_batches_left_by_other_runs(tmp_path, monkeypatch, caplog):
+    file_path = empty_workbook(tmp_path / "inc.xlsx")
+    monkeypatch.setattr(sinks, "_sinks", {})
+    sink = sinks.inconsistency_sink(file_path)
+    run_id = journals.RUN_ID
+    monkeypatch.setattr(journals, "RUN_ID", "20240101000000-1")
+    sink.add("Rule", pd.DataFrame({"A": [1]}))
+    sink.add("Rule", pd.DataFrame({"A": [2]}))
+    monkeypatch.setattr(journals, "RUN_ID", run_id)
+    sink.add("Rule", pd.DataFrame({"A": [3]}))
+
+    with caplog.at_level(logging.WARNING, logger=sinks.__name__):
+        assert sinks.flush_inconsistencies() is None
+
+    assert pd.read_excel(file_path, sheet_name="Rule")["A"].tolist() == [1, 2, 3]
+    [record] = caplog.records
+    assert "2 pending batches of 1 other runs" in record.getMessage()
+    assert "20240101000000-1 (2 since" in record.getMessage()
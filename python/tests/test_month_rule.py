@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+MONTHS = {
+    1: "ENERO",
+    2: "FEBRERO",
+    3: "MARZO",
+    4: "ABRIL",
+    5: "MAYO",
+    6: "JUNIO",
+    7: "JULIO",
+    8: "AGOSTO",
+    9: "SEPTIEMBRE",
+    10: "OCTUBRE",
+    11: "NOVIEMBRE",
+    12: "DICIEMBRE",
+}
+
+
+def baseline_flags(
+    data_frame: pd.DataFrame, exception_df: pd.DataFrame, date_idx, month_idx, idx
+):
+    """The row-wise month_depends_on_date of the baseline.
+
+    Its list was astype(str).dropna() of the column, which under pandas 2 keeps
+    the "nan" of the empty cells; map(str) gives that list on any pandas.
+    """
+    exception_list = exception_df.iloc[:, idx].map(str).dropna().to_list()
+
+    def validate_consistency(date, month, radicado) -> bool:
+        date_parse = pd.to_datetime(date, format="%Y-%m-%d", errors="coerce")
+        standard_month = MONTHS.get(date_parse.month)
+        return (month == standard_month) or (radicado in exception_list)
+
+    return data_frame.apply(
+        lambda row: validate_consistency(
+            row.iloc[date_idx], str(row.iloc[month_idx]), str(row.iloc[2])
+        ),
+        axis=1,
+    ).astype(bool)
+
+
+@pytest.fixture
+def data_frame():
+    return pd.DataFrame(
+        {
+            0: [
+                "2024-01-15",
+                "2024-02-01",
+                np.nan,
+                "2024-03-10",
+                "not a date",
+                "2024-12-31",
+                "2024-05-05",
+                "",
+            ],
+            1: ["ENERO", "ENERO", "MAYO", np.nan, "MAYO", "DICIEMBRE", 5, ""],
+            2: [
+                "2024 01 001 000001",
+                np.nan,
+                "2024 01 001 000002",
+                np.nan,
+                "",
+                1234,
+                "2024 01 001 000001",
+                np.nan,
+            ],
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "radicados",
+    [
+        ["2024 01 001 000001", np.nan, "2024 01 001 000002"],
+        ["2024 01 001 000001", "2024 01 001 000002"],
+        [np.nan, "", 1234.0],
+        [1234, "nan"],
+    ],
+)
+@pytest.mark.parametrize("module", ["pagos", "objetados"])
+def test_month_rule_flags_the_baseline_rows(request, module, data_frame, radicados):
+    rule = request.getfixturevalue(module).month_rule(0, 1, "EXCEPCIONES", 0)
+    exception_df = pd.DataFrame({"RADICADO": radicados, "OTRA": 0})
+
+    flags = rule.check(data_frame, exception_df).astype(bool)
+
+    expected = baseline_flags(data_frame, exception_df, 0, 1, 0)
+    pd.testing.assert_series_equal(flags, expected, check_names=False)
+
+
+def test_month_rule_exempts_blank_radicados_when_the_list_has_blanks(pagos):
+    rule = pagos.month_rule(0, 1, "EXCEPCIONES", 0)
+    data_frame = pd.DataFrame({0: ["2024-02-01"], 1: ["ENERO"], 2: [np.nan]})
+
+    with_blanks = pd.DataFrame({"RADICADO": ["2024 01 001 000001", np.nan]})
+    without_blanks = pd.DataFrame({"RADICADO": ["2024 01 001 000001"]})
+
+    assert rule.check(data_frame, with_blanks).astype(bool).tolist() == [True]
+    assert rule.check(data_frame, without_blanks).astype(bool).tolist() == [False]
@@ -0,0 +1,217 @@
+"""The rules declared with row_cases against the row-wise checks they replaced.
+
+Each check below is the apply(axis=1) predicate of the baseline scripts; the
+rule and the predicate judge the same frame and must flag the same rows.
+"""
+
+import re
+from datetime import datetime
+
+import numpy as np
+import pandas as pd  # type: ignore
+import pytest
+
+from conftest import load_script
+
+ROWS = 240
+
+## Cells of every kind a sheet gives: empty, blank, texts, numbers and dates
+POOLS = {
+    2: ["2024 01 001 000001", "2024 01 001 000002", np.nan, "", 123, 4.5],
+    6: ["3400004306", 3400004306, 3400003706.0, "3400003704", "34", np.nan, ""],
+    12: ["DESEMPLEO", "VIDA GRUPO DEUDORES", "OTROS GASTOS", "AUTOS", np.nan, "", 7],
+    15: ["FONDO NACIONAL DEL AHORRO", "OTRO TOMADOR", np.nan, "", 0],
+    35: ["HONORARIOS", "PERITAJE", "OTRO", np.nan, "", 1.0],
+    48: [1, 1.0, "1", "1.0", 0.5, "0.25", 0, np.nan],
+    51: ["1.234,56", "1;2", "12", "abc", np.nan, "", 15, 2.5],
+    75: ["ID1", " ID2", "ID3 ", "ID  4", "ID 5", np.nan, "", 99],
+    85: ["SI", "NO", "X", np.nan, "", 1],
+    86: ["X", "SI", "NO", np.nan, "", 0],
+    89: ["X", "Y", np.nan, ""],
+    90: ["SI", "NO", "X", np.nan, "", 1.5],
+    97: [
+        "01/02/2024;123",
+        "1/2/2024;1",
+        "01/02/2024;",
+        np.nan,
+        "",
+        datetime(2024, 2, 1),
+    ],
+    103: ["SI", "NO", "NA", "X", np.nan, ""],
+}
+
+EXCEPTIONS = {
+    "identification_rule": ["2024 01 001 000002", "123", "4.5"],
+    "fecha_vencimiento_rule": ["AUTOS", "7"],
+}
+
+
+def fixture_frame(seed: int, dtype) -> pd.DataFrame:
+    """Return a sheet whose columns of the rules have every cell drawn from their pool"""
+    generator = np.random.default_rng(seed)
+    columns = {
+        position: [pool[index] for index in generator.integers(len(pool), size=ROWS)]
+        for position, pool in POOLS.items()
+    }
+    data_frame = pd.DataFrame(columns, dtype=object).reindex(
+        columns=range(max(POOLS) + 1)
+    )
+    return data_frame if dtype is None else data_frame.astype(dtype)
+
+
+@pytest.fixture(
+    params=[(0, None), (1, None), (2, "str")], ids=["object", "mixed", "str"]
+)
+def data_frame(request):
+    return fixture_frame(*request.param)
+
+
+def identification(row, exception_list: list) -> bool:
+    identificador_pagos, radicado = str(row.iloc[75]), str(row.iloc[2])
+    if bool(re.search(r"(^\s+|\s+$|\s{2,})", identificador_pagos)):
+        return False
+    else:
+        return (identificador_pagos != "nan") or (radicado in exception_list)
+
+
+def fecha_vencimiento(row, exception_list: list) -> bool:
+    ramo, expiration_date = str(row.iloc[12]), str(row.iloc[97])
+    if ramo == "DESEMPLEO":
+        return bool(re.search(r"^\d{2}/\d{2}/\d{4};\d{1,12}$", expiration_date))
+    else:
+        return (expiration_date == "nan") or ramo in exception_list
+
+
+def pagos_desempleo(row) -> bool:
+    desempleo, character = str(row.iloc[12]), str(row.iloc[90])
+    ramos: list[str] = ["DESEMPLEO"]
+    maybe: list[str] = ["VIDA GRUPO DEUDORES"]
+    is_desempleo = desempleo in ramos
+    is_valid_character = character == "SI" or character == "NO"
+    first_validation = is_desempleo and is_valid_character
+    second_validation = not is_desempleo and character == "nan"
+    third_validation = (desempleo in maybe and is_valid_character) or (
+        desempleo in maybe and character == "nan"
+    )
+    return first_validation or second_validation or third_validation
+
+
+def objetados_desempleo(row) -> bool:
+    desempleo, character = str(row.iloc[15]), str(row.iloc[90])
+    tomadores_allowed: list[str] = ["FONDO NACIONAL DEL AHORRO"]
+    is_desempleo = desempleo in tomadores_allowed
+    is_valid_character = character == "SI" or character == "NO"
+    first_validation = is_desempleo and is_valid_character
+    second_validation = not is_desempleo and character == "nan"
+    return first_validation or second_validation
+
+
+def pagos_sarlaf(row) -> bool:
+    sarlaf, bien_diligenciado = str(row.iloc[85]), str(row.iloc[86])
+    if sarlaf == "SI":
+        return bien_diligenciado == "X"
+    else:
+        return bien_diligenciado == "nan"
+
+
+def objetados_sarlaf(row) -> bool:
+    sarlaf, bien_diligenciado = str(row.iloc[85]), str(row.iloc[86])
+    exento = str(row.iloc[89])
+    if sarlaf == "SI":
+        return bien_diligenciado == "X"
+    elif sarlaf == "NO":
+        return bien_diligenciado == "nan" and exento == "X"
+    else:
+        return False
+
+
+def otros_documentos(polizas: list):
+    def validate_cell_format(row) -> bool:
+        poliza, value = str(row.iloc[6]), str(row.iloc[103])
+        if poliza in polizas:
+            return value in ["SI", "NO", "NA"]
+        else:
+            return value == "nan"
+
+    return validate_cell_format
+
+
+def valor_coaseguradora(row) -> bool:
+    porcentaje_positiva, valor = str(row.iloc[48]), str(row.iloc[51])
+    if float(porcentaje_positiva) == 1.0:
+        return valor == "nan"
+    else:
+        return valor.replace(";", "").replace(",", "").replace(".", "").isdigit()
+
+
+PAGOS_POLIZAS = [
+    "3400004306",
+    "3400003706",
+    "3400004407",
+    "3400003704",
+]
+OBJETADOS_POLIZAS = ["3400004306", "3400003706", "3400003704", "3400004407"]
+
+CHECKS = [
+    ("pagos", "identification_rule", (), identification),
+    ("pagos", "fecha_vencimiento_rule", (), fecha_vencimiento),
+    ("pagos", "desempleo_rule", ("Desem", 90), pagos_desempleo),
+    ("pagos", "sarlaf_rule", (), pagos_sarlaf),
+    ("pagos", "otros_documentos_rule", (), otros_documentos(PAGOS_POLIZAS)),
+    ("objetados", "identification_rule", (), identification),
+    ("objetados", "fecha_vencimiento_rule", (), fecha_vencimiento),
+    ("objetados", "desempleo_rule", ("Desem", 90), objetados_desempleo),
+    ("objetados", "sarlaf_rule", (), objetados_sarlaf),
+    ("objetados", "otros_documentos_rule", (), otros_documentos(OBJETADOS_POLIZAS)),
+    ("objetados", "valor_coaseguradora_rule", (), valor_coaseguradora),
+]
+
+
+def row_flags(data_frame: pd.DataFrame, check, *sources) -> pd.Series:
+    """Return the flags the row-wise check gives to every row"""
+    return data_frame.apply(lambda row: check(row, *sources), axis=1).astype(bool)
+
+
+@pytest.mark.parametrize(
+    "module, factory, args, check",
+    CHECKS,
+    ids=[f"{module}-{factory}" for module, factory, _, _ in CHECKS],
+)
+def test_cases_flag_the_rows_of_the_row_check(
+    request, data_frame, module, factory, args, check
+):
+    rule = getattr(request.getfixturevalue(module), factory)(*args)
+    exception_lists = [EXCEPTIONS[factory]] if factory in EXCEPTIONS else []
+
+    flags = rule.check(data_frame, *map(frozenset, exception_lists)).astype(bool)
+
+    expected = row_flags(data_frame, check, *exception_lists)
+    pd.testing.assert_series_equal(flags, expected, check_names=False)
+
+
+def test_concepto_cases_flag_the_rows_of_the_row_check(data_frame):
+    concepto = load_script("01_reparto/validate_concepto_column.py", "concepto_column")
+    lista = ["HONORARIOS", "PERITAJE", "1.0"]
+    book = data_frame
+
+    def is_valid(ramo: str, concepto: str) -> bool:
+        if ramo == "OTROS GASTOS":
+            return concepto in lista
+        return concepto == "nan"
+
+    expected = book.apply(
+        lambda row: is_valid(str(row.iloc[12]), str(row.iloc[35])), axis=1
+    ).astype(bool)
+    flags = concepto.is_valid(book, lista).astype(bool)
+    pd.testing.assert_series_equal(flags, expected, check_names=False)
+
+
+def test_valor_coaseguradora_raises_on_a_text_porcentaje(objetados):
+    data_frame = pd.DataFrame(
+        {48: [1, "abc"], 51: [np.nan, "12"]}, dtype=object
+    ).reindex(columns=range(52))
+
+    with pytest.raises(ValueError):
+        row_flags(data_frame, valor_coaseguradora)
+    with pytest.raises(ValueError):
+        objetados.valor_coaseguradora_rule().check(data_frame)
@@ -0,0 +1,107 @@
+import pandas as pd  # type: ignore
+import pytest
+from openpyxl import Workbook, load_workbook  # type: ignore
+from openpyxl.styles import Font, PatternFill  # type: ignore
+
+from conftest import load_script
+from utils.xlsx_patch import patch_cells
+
+SHEET = "CONSECUTIVO SAP"
+
+
+def exception_workbook(file_path) -> str:
+    """Save a CONSECUTIVO SAP sheet with formulas, styles and a blank header next to another sheet"""
+    workbook = Workbook()
+    other = workbook.active
+    other.title = "EXCEPCIONES"
+    other.append(["RADICADO", "FECHA"])
+    other.append(["2024 01 001 000001", "2024-01-05"])
+
+    sheet = workbook.create_sheet(SHEET)
+    sheet.append(["PENDIENTES", "INICIAL", "FINAL", None, "NOTA"])
+    sheet.append([501, 1000, 1010, None, "0012"])
+    sheet.append([502, "=B2+1", None, None, "2024-01-05"])
+    sheet.append([503, None, None, None, "=SUM(A2:A4)"])
+    sheet.append([504])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+    sheet["A3"].fill = PatternFill("solid", fgColor="FFFF00")
+    sheet["B2"].number_format = "#,##0"
+    workbook.save(file_path)
+    return str(file_path)
+
+
+def baseline_update(file_path: str, inicial: int, final: int, pendientes: list) -> None:
+    """The openpyxl edit of Consecutivo.update_data in the baseline"""
+    book = load_workbook(file_path)
+    sheet = book[SHEET]
+    for row in range(2, sheet.max_row + 1):
+        sheet.cell(row=row, column=1).value = None
+    sheet.cell(row=2, column=2).value = inicial
+    sheet.cell(row=2, column=3).value = final
+    row = 1
+    for consecutivo in pendientes:
+        row += 1
+        sheet.cell(row=row, column=1).value = consecutivo
+    book.save(file_path)
+
+
+def cells(file_path: str) -> dict:
+    """Return the value, type and style of every cell of every sheet"""
+    book = load_workbook(file_path)
+    return {
+        (sheet.title, cell.coordinate): (
+            cell.value,
+            cell.data_type,
+            cell.font.b,
+            cell.fill.fgColor.rgb,
+            cell.number_format,
+        )
+        for sheet in book.worksheets
+        for row in sheet.iter_rows()
+        for cell in row
+        if cell.value is not None or cell.has_style
+    }
+
+
+@pytest.mark.parametrize(
+    "pendientes", [[], [502, 504], [502, 504, 1011, 1012, 1013, 1014, 1015]]
+)
+def test_update_data_edits_the_cells_the_baseline_edits(tmp_path, pendientes):
+    consecutivo_sap = load_script("02_pagos/consecutivo_sap.py", "consecutivo_sap")
+    patched = exception_workbook(tmp_path / "patched.xlsx")
+    expected = exception_workbook(tmp_path / "expected.xlsx")
+    consecutivo = consecutivo_sap.Consecutivo(
+        "pagos.xlsx", "PAGOS", "inc.xlsx", patched, "consecutivo.xlsx"
+    )
+
+    assert consecutivo.update_data(1011, 1020, pendientes)
+
+    baseline_update(expected, 1011, 1020, pendientes)
+    assert cells(patched) == cells(expected)
+    for sheet_name in ("EXCEPCIONES", SHEET):
+        pd.testing.assert_frame_equal(
+            pd.read_excel(patched, sheet_name=sheet_name),
+            pd.read_excel(expected, sheet_name=sheet_name),
+        )
+
+
+def test_patch_cells_keeps_the_other_rows_byte_for_byte(tmp_path):
+    file_path = exception_workbook(tmp_path / "book.xlsx")
+    before = cells(file_path)
+
+    patch_cells(file_path, SHEET, {"C2": 2000, "F9": "NUEVA"})
+
+    after = cells(file_path)
+    assert after.pop((SHEET, "C2"))[0] == 2000
+    assert after.pop((SHEET, "F9"))[0] == "NUEVA"
+    before.pop((SHEET, "C2"))
+    assert after == before
+    assert load_workbook(file_path)[SHEET].dimensions == "A1:F9"
+
+
+def test_patch_cells_refuses_an_unknown_sheet(tmp_path):
+    file_path = exception_workbook(tmp_path / "book.xlsx")
+
+    with pytest.raises(ValueError):
+        patch_cells(file_path, "OTRA", {"A1": 1})
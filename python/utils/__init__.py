@@ -0,0 +1 @@
+"""Shared helpers for the validation bots (loading, caching and reporting)"""
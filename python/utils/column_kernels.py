@@ -0,0 +1,118 @@
+import pandas as pd  # type: ignore
+from typing import Callable
+
+## Spaces int() strips around the digits, the non ASCII ones are left to int() itself
+INT_SPACES = r"[\t\n\x0b\x0c\r ]*"
+
+## Texts int() parses: optional sign and digits with single "_" between them
+INT_PATTERN = rf"{INT_SPACES}[+-]?[0-9]+(?:_[0-9]+)*{INT_SPACES}"
+
+## Longer texts are left to int() itself, it refuses numbers with too many digits
+INT_MAX_TEXT = 4300
+
+## Types of the object columns compared at once as numbers (see pd.api.types.infer_dtype)
+NUMBER_TYPES = {
+    "integer",
+    "floating",
+    "mixed-integer-float",
+    "decimal",
+    "boolean",
+    "empty",
+}
+
+
+def cell_text(values: pd.Series) -> pd.Series:
+    """Return str(value) of every cell as a string column, "nan" for the empty cells.
+
+    The validations compare the text of the cells as str() gives it, so the
+    columns of text are only filled, the ones of numbers converted at once
+    and the rest converted cell by cell.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.StringDtype) and dtype.na_value is not pd.NA:
+        return values.fillna("nan")
+    if dtype.kind in "biuf":
+        texts = values.to_numpy().astype(str)
+    else:
+        texts = list(map(str, values.to_numpy(dtype=object)))
+    return pd.Series(texts, index=values.index, dtype="str")
+
+
+def non_ascii(texts: pd.Series) -> pd.Series:
+    """Return which texts have characters out of ASCII"""
+    return texts.str.contains(r"[^\x00-\x7f]", regex=True)
+
+
+def python_check(
+    valid: pd.Series, texts: pd.Series, unchecked: pd.Series, check: Callable
+) -> pd.Series:
+    """Return the flags of the texts, the unchecked ones given by check on each text"""
+    valid = valid.astype(bool)
+    if unchecked.any():
+        valid[unchecked] = [check(text) for text in texts[unchecked]]
+    return valid
+
+
+def without(texts: pd.Series, characters: str) -> pd.Series:
+    """Return the texts with each of the characters removed"""
+    for character in characters:
+        texts = texts.str.replace(character, "", regex=False)
+    return texts
+
+
+def digit_text(texts: pd.Series, separators: str = "") -> pd.Series:
+    """Return text.isdigit() of every text after removing each of the separators"""
+    texts = without(texts, separators)
+    valid = texts.str.fullmatch(r"[0-9]+")
+    ## Other scripts have digits too (e.g. "²"), str.isdigit decides
+    return python_check(valid, texts, non_ascii(texts), str.isdigit)
+
+
+def parses_as_int(text: str) -> bool:
+    """Return whether int() takes the text"""
+    try:
+        int(text)
+        return True
+    except ValueError:
+        return False
+
+
+def int_text(texts: pd.Series) -> pd.Series:
+    """Return whether int() takes every text"""
+    valid = texts.str.fullmatch(INT_PATTERN)
+    unchecked = non_ascii(texts) | (texts.str.len() > INT_MAX_TEXT)
+    return python_check(valid, texts, unchecked, parses_as_int)
+
+
+def exact_length(texts: pd.Series, length: int) -> pd.Series:
+    """Return len(text) == length of every text"""
+    return texts.str.len() == length
+
+
+def in_range(values: pd.Series, low, high) -> pd.Series:
+    """Return low <= value <= high of every cell, False for the empty ones.
+
+    Columns of numbers are compared at once. The rest are compared cell by
+    cell, so a text raises the TypeError the comparison raises.
+    """
+    if values.dtype.kind in "biuf":
+        return (values >= low) & (values <= high)
+    objects = values.to_numpy(dtype=object)
+    if pd.api.types.infer_dtype(objects, skipna=False) in NUMBER_TYPES:
+        numbers = objects.astype(float)
+        return pd.Series((numbers >= low) & (numbers <= high), index=values.index)
+    return pd.Series(
+        [low <= value <= high for value in objects], index=values.index, dtype=bool
+    )
+
+
+def allowed_values(values: pd.Series, allowed) -> pd.Series:
+    """Return (value in allowed) or pd.isna(value) of every cell"""
+    if isinstance(allowed, str):
+        ## A text instead of a list, "in" looks for the value inside it
+        return pd.Series(
+            [(value in allowed) or pd.isna(value) for value in values.to_numpy(object)],
+            index=values.index,
+            dtype=bool,
+        )
+    return values.isin(list(allowed)) | values.isna()
@@ -0,0 +1,46 @@
+import pandas as pd  # type: ignore
+import numpy as np  # type: ignore
+from string import ascii_uppercase
+
+## Last column of an Excel sheet (XFD)
+MAX_COLUMNS = 16384
+
+
+def letter_table() -> np.ndarray:
+    """Return the letters of every Excel column, position 0 being column A"""
+    letters = list(ascii_uppercase)
+    two = [first + second for first in letters for second in letters]
+    three = [first + second for first in letters for second in two]
+    return np.array((letters + two + three)[:MAX_COLUMNS])
+
+
+COLUMN_LETTERS = letter_table()
+
+
+def column_letter(number: int) -> str:
+    """Convert a column number (1-based) to Excel column name (e.g., 1 -> A, 28 -> AB)"""
+    if not 1 <= number <= MAX_COLUMNS:
+        raise ValueError(f"Column number out of range: {number}")
+    return str(COLUMN_LETTERS[number - 1])
+
+
+def row_numbers(index: pd.Index) -> np.ndarray:
+    """Return the Excel rows of the index of a base read with its header in the first row"""
+    return (np.asarray(index) + 2).astype(str)
+
+
+def coordinates(index: pd.Index, number: int) -> np.ndarray:
+    """Return the cell of column number (1-based) in every row of the index (e.g., AB12).
+
+    Same values as f"{get_excel_column_name(number)}{row.name + 2}" applied
+    row by row, built with one NumPy concatenation.
+    """
+    return np.char.add(column_letter(number), row_numbers(index))
+
+
+def add_coordinates(data_frame: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    """Add a coordinates column for every {label: column number (1-based)}, converting the rows once"""
+    rows = row_numbers(data_frame.index)
+    for label, number in columns.items():
+        data_frame[label] = np.char.add(column_letter(number), rows)
+    return data_frame
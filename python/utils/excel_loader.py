@@ -0,0 +1,550 @@
+import pandas as pd  # type: ignore
+from pandas.api.types import is_integer  # type: ignore
+import numpy as np  # type: ignore
+from datetime import datetime, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
+import json
+import os
+import zipfile
+
+from utils.xlsx_reader import (
+    DateRange,
+    XlsxWorkbook,
+    default_workers,
+    is_xlsx,
+    read_xlsx,
+    read_xlsx_sheets,
+    written_frame,
+)
+from utils.xlsx_writer import write_xlsx
+
+try:
+    import pyarrow as pa  # type: ignore
+except ImportError:  # pragma: no cover - the loader falls back to openpyxl
+    pa = None
+
+
+## Folder created next to each workbook to store its columnar copies
+CACHE_DIR = "__sheetcache__"
+METADATA_KEY = b"scriptvault"
+
+## Tags used to store object columns (mixed Python values) in Arrow
+MISSING, TEXT, INTEGER, FLOAT, BOOLEAN, DATETIME, TIME, BIG_INTEGER = range(8)
+
+## Layout of the Arrow copies, change it when the stored values change
+SIDECAR_VERSION = 2
+
+_hashes: dict = {}
+
+
+def file_hash(file_path: str) -> str:
+    """Return the content hash of a file, memoized while the file does not change"""
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+    if key not in _hashes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def sidecar_path(file_path: str, sheet_name, options: dict) -> str:
+    """Return the path of the Arrow copy of a sheet for the current workbook content"""
+    folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR)
+    stem = json.dumps(
+        [os.path.basename(file_path), str(sheet_name), sorted(options.items())],
+        default=str,
+    )
+    stem_digest = hashlib.blake2b(stem.encode(), digest_size=8).hexdigest()
+    name = f"{stem_digest}-{file_hash(file_path)[:16]}-v{SIDECAR_VERSION}.arrow"
+    return os.path.join(folder, name)
+
+
+def load_excel(
+    file_path: str,
+    sheet_name,
+    usecols: list = None,
+    rows: list = None,
+    date_range: DateRange = None,
+    **kwargs,
+) -> pd.DataFrame:
+    """Read a sheet, reusing the memory-mapped Arrow copy written the first time it was parsed.
+
+    The Arrow file lives in a __sheetcache__ folder next to the workbook and is
+    keyed by the workbook content, so any change in the workbook makes the
+    next read parse it again. Without pyarrow the sheet is parsed on every call.
+
+    usecols (column positions) and rows (row positions) restrict the result to
+    a part of the sheet; from the Arrow copy only that part is decoded. Column
+    labels and the row index are the ones of the whole sheet.
+
+    date_range keeps only the rows whose date column falls in the range, with
+    their row index in the whole sheet; it cannot be combined with rows. From
+    the Arrow copy only the date column is decoded to find them. Without a
+    copy the rows out of the range are dropped while the workbook is streamed
+    and never built, and no copy is written, as the whole sheet is not read.
+    """
+    if usecols is not None:
+        usecols = sorted(set(usecols))
+    if date_range is not None and rows is not None:
+        raise ValueError("rows and date_range cannot be used together")
+
+    if pa is None or not isinstance(sheet_name, (str, int)):
+        data_frame = parse_excel(file_path, sheet_name, usecols, date_range, **kwargs)
+        return data_frame if rows is None else data_frame.iloc[rows]
+
+    sidecar = sidecar_path(file_path, sheet_name, kwargs)
+    if os.path.exists(sidecar):
+        try:
+            if date_range is not None:
+                rows = sidecar_rows(sidecar, date_range)
+            return read_sidecar(sidecar, usecols, rows)
+        except (OSError, ValueError, KeyError, IndexError, pa.ArrowException):
+            pass  # Unreadable copy, parse the workbook again and overwrite it
+
+    if date_range is not None:
+        return parse_excel(file_path, sheet_name, usecols, date_range, **kwargs)
+    data_frame = parse_excel(file_path, sheet_name, **kwargs)
+    write_sidecar(data_frame, sidecar)
+    if usecols is not None:
+        data_frame = data_frame.iloc[:, usecols]
+    return data_frame if rows is None else data_frame.iloc[rows]
+
+
+def parse_excel(
+    file_path: str,
+    sheet_name,
+    usecols: list = None,
+    date_range: DateRange = None,
+    **kwargs,
+):
+    """Parse a sheet with the streaming xlsx reader, or with openpyxl for what it does not cover.
+
+    The reader needs the header to be one sheet row, so the reads without
+    header (header=None) or with several header rows go to openpyxl.
+    """
+    header = kwargs.get("header", 0)
+    if (
+        isinstance(sheet_name, (str, int))
+        and set(kwargs) <= {"dtype", "nrows", "header"}
+        and is_integer(header)
+        and header >= 0
+        and is_xlsx(file_path)
+    ):
+        return read_xlsx(
+            file_path, sheet_name, usecols=usecols, date_range=date_range, **kwargs
+        )
+    if date_range is not None:
+        data_frame = pd.read_excel(
+            file_path, sheet_name=sheet_name, engine="openpyxl", **kwargs
+        )
+        data_frame = filter_frame(data_frame, date_range)
+        return data_frame if usecols is None else data_frame.iloc[:, usecols]
+    return pd.read_excel(
+        file_path, sheet_name=sheet_name, engine="openpyxl", usecols=usecols, **kwargs
+    )
+
+
+def load_columns(file_path: str, sheet_name, columns: list, **kwargs) -> pd.DataFrame:
+    """Read only the columns of a sheet with the given labels, in that order.
+
+    The workbook is parsed with usecols set to the labels, so the other
+    columns are never decoded, and the Arrow copy written for the next reads
+    holds only these columns (it is keyed by them, apart from the copy of
+    the whole sheet load_excel writes).
+    """
+    columns = list(columns)
+    if pa is None or not isinstance(sheet_name, (str, int)):
+        return parse_excel(file_path, sheet_name, columns, **kwargs)[columns]
+
+    sidecar = sidecar_path(file_path, sheet_name, {**kwargs, "columns": columns})
+    if os.path.exists(sidecar):
+        try:
+            return read_sidecar(sidecar)
+        except (OSError, ValueError, KeyError, IndexError, pa.ArrowException):
+            pass  # Unreadable copy, parse the workbook again and overwrite it
+    data_frame = parse_excel(file_path, sheet_name, columns, **kwargs)[columns]
+    write_sidecar(data_frame, sidecar)
+    return data_frame
+
+
+def concat_columns(
+    file_paths: list, sheet_name, columns: list, workers: int = None, **kwargs
+) -> pd.DataFrame:
+    """Read the same columns of a sheet from several workbooks and concatenate them.
+
+    Every workbook is read with load_columns. The ones without an Arrow copy
+    are parsed at the same time by up to workers processes (one per CPU by
+    default, 1 to disable it), the others are read in-process. The frames
+    are concatenated in the order of file_paths, with a new index.
+    """
+    if workers is None:
+        workers = default_workers()
+    read = partial(load_columns, sheet_name=sheet_name, columns=columns, **kwargs)
+    frames: dict = {}
+    pending = list(file_paths)
+    if pa is not None and isinstance(sheet_name, (str, int)):
+        options = {**kwargs, "columns": list(columns)}
+        pending = [
+            file_path
+            for file_path in file_paths
+            if not os.path.exists(sidecar_path(file_path, sheet_name, options))
+        ]
+
+    if workers > 1 and len(pending) > 1:
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(workers, len(pending))
+            ) as executor:
+                frames = dict(zip(pending, executor.map(read, pending)))
+        except (OSError, RuntimeError):
+            frames = {}  # No worker processes here (e.g. a broken pool)
+
+    return pd.concat(
+        [
+            frames[file_path] if file_path in frames else read(file_path)
+            for file_path in file_paths
+        ],
+        ignore_index=True,
+    )
+
+
+def filter_frame(data_frame: pd.DataFrame, date_range: DateRange) -> pd.DataFrame:
+    """Keep the rows of a frame whose date column falls in the range"""
+    return data_frame[date_range.mask(data_frame.iloc[:, date_range.column])]
+
+
+def sidecar_rows(sidecar: str, date_range: DateRange) -> np.ndarray:
+    """Return the positions of the rows of an Arrow copy whose date column falls in the range"""
+    dates = read_sidecar(sidecar, [date_range.column]).iloc[:, 0]
+    return np.flatnonzero(date_range.mask(dates))
+
+
+def save_excel(data_frame: pd.DataFrame, file_path: str, sheet_name="Sheet1") -> None:
+    """Write a frame as the only sheet of a workbook, handing its Arrow copy to the next readers.
+
+    The workbook has the cells of to_excel(index=False), streamed by the
+    write-only writer when it is an .xlsx (see xlsx_writer.SheetWriter). Next
+    to it the Arrow copy load_excel looks for is written from the frame the
+    sheet will read back as (see xlsx_reader.written_frame), so the
+    validators that read the file afterwards never parse it.
+    """
+    if str(file_path).lower().endswith(".xlsx") and not isinstance(
+        data_frame.columns, pd.MultiIndex
+    ):
+        write_xlsx(data_frame, file_path, sheet_name=sheet_name)
+    else:
+        data_frame.to_excel(file_path, index=False, sheet_name=sheet_name)
+    if pa is not None and is_xlsx(file_path):
+        write_sidecar(
+            written_frame(data_frame), sidecar_path(file_path, sheet_name, {})
+        )
+
+
+def load_sheets(
+    file_path: str,
+    sheet_names: list,
+    align: bool = False,
+    date_range: DateRange = None,
+    **kwargs,
+) -> dict:
+    """Read several sheets of a workbook at once, returning {sheet_name: frame}.
+
+    Sheets with an Arrow copy are read from it like in load_excel; the rest
+    are parsed together, opening the workbook and decoding its shared strings
+    only once. With align every frame is reindexed to the union of the column
+    labels of all of them, in order of appearance, as pd.concat would do.
+    date_range filters every sheet as in load_excel.
+    """
+    frames: dict = {}
+    sidecars: dict = {}
+    if pa is not None:
+        for sheet_name in sheet_names:
+            sidecars[sheet_name] = sidecar_path(file_path, sheet_name, kwargs)
+            if os.path.exists(sidecars[sheet_name]):
+                try:
+                    rows = None
+                    if date_range is not None:
+                        rows = sidecar_rows(sidecars[sheet_name], date_range)
+                    frames[sheet_name] = read_sidecar(sidecars[sheet_name], rows=rows)
+                except (OSError, ValueError, KeyError, IndexError, pa.ArrowException):
+                    pass  # Unreadable copy, parse the sheet again and overwrite it
+
+    missing = [sheet_name for sheet_name in sheet_names if sheet_name not in frames]
+    if missing:
+        parsed = parse_sheets(file_path, missing, date_range, **kwargs)
+        for sheet_name in missing:
+            frames[sheet_name] = parsed[sheet_name]
+            if sheet_name in sidecars and date_range is None:
+                write_sidecar(parsed[sheet_name], sidecars[sheet_name])
+
+    frames = {sheet_name: frames[sheet_name] for sheet_name in sheet_names}
+    return align_frames(frames) if align else frames
+
+
+def align_frames(frames: dict) -> dict:
+    """Give every frame the union of the column labels, in order of appearance.
+
+    A missing column is added as empty values of the dtype the column has in
+    the first frame that holds it (float for integers, object for booleans),
+    so concatenating the aligned frames gives the same dtypes as pd.concat.
+    """
+    dtypes: dict = {}
+    for data_frame in frames.values():
+        for label, dtype in data_frame.dtypes.items():
+            dtypes.setdefault(label, dtype)
+
+    aligned: dict = {}
+    for sheet_name, data_frame in frames.items():
+        columns = {}
+        for label, dtype in dtypes.items():
+            if label in data_frame.columns:
+                columns[label] = data_frame[label]
+                continue
+            if dtype.kind in "iu":
+                dtype = np.dtype("float64")
+            elif dtype.kind == "b":
+                dtype = np.dtype(object)
+            columns[label] = pd.Series(np.nan, index=data_frame.index, dtype=dtype)
+        aligned[sheet_name] = pd.DataFrame(columns, index=data_frame.index)
+    return aligned
+
+
+def parse_sheets(
+    file_path: str, sheet_names: list, date_range: DateRange = None, **kwargs
+) -> dict:
+    """Parse several sheets in one pass over the workbook"""
+    if (
+        all(isinstance(sheet_name, (str, int)) for sheet_name in sheet_names)
+        and set(kwargs) <= {"dtype", "nrows"}
+        and is_xlsx(file_path)
+    ):
+        return read_xlsx_sheets(file_path, sheet_names, date_range=date_range, **kwargs)
+    frames = pd.read_excel(
+        file_path, sheet_name=list(sheet_names), engine="openpyxl", **kwargs
+    )
+    if date_range is not None:
+        frames = {
+            sheet_name: filter_frame(data_frame, date_range)
+            for sheet_name, data_frame in frames.items()
+        }
+    return frames
+
+
+def sheet_names(file_path: str) -> list:
+    """Return the names of the sheets of a workbook, in order"""
+    if is_xlsx(file_path):
+        with zipfile.ZipFile(file_path) as archive:
+            return list(XlsxWorkbook(archive).sheets)
+    with pd.ExcelFile(file_path, engine="openpyxl") as xls:
+        return xls.sheet_names
+
+
+def write_sidecar(data_frame: pd.DataFrame, sidecar: str) -> bool:
+    """Write the frame as an Arrow IPC file, replacing older copies of the same sheet"""
+    temp_file = f"{sidecar}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+        table = frame_to_table(data_frame)
+        with pa.OSFile(temp_file, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(temp_file, sidecar)
+    except (OSError, ValueError, TypeError, OverflowError, pa.ArrowException):
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
+
+    ## Drop the copies written for previous versions of the workbook
+    folder, name = os.path.split(sidecar)
+    prefix = name.split("-")[0] + "-"
+    for old_name in os.listdir(folder):
+        if old_name.startswith(prefix) and old_name != name:
+            try:
+                os.remove(os.path.join(folder, old_name))
+            except OSError:
+                pass  # Still mapped by another bot, it will be removed next time
+    return True
+
+
+def read_sidecar(sidecar: str, usecols: list = None, rows: list = None) -> pd.DataFrame:
+    """Memory-map an Arrow copy and rebuild the original frame (or a part of it) from it"""
+    source = pa.memory_map(sidecar, "r")
+    table = pa.ipc.open_file(source).read_all()
+    return table_to_frame(table, usecols, rows)
+
+
+def encode_label(label) -> list:
+    """Return a JSON friendly representation of a column label"""
+    if isinstance(label, (bool, np.bool_)):
+        return ["bool", bool(label)]
+    if isinstance(label, (int, np.integer)):
+        return ["int", int(label)]
+    if isinstance(label, (float, np.floating)):
+        return ["float", float(label)]
+    if isinstance(label, datetime):
+        return ["datetime", label.isoformat()]
+    return ["str", str(label)]
+
+
+def decode_label(label: list):
+    """Return the column label stored by encode_label"""
+    kind, value = label
+    if kind == "datetime":
+        return pd.Timestamp(value)
+    return value
+
+
+def encode_objects(values: pd.Series) -> "pa.StructArray":
+    """Store an object column keeping the Python type of every cell"""
+    size = len(values)
+    tags = np.zeros(size, dtype=np.int8)
+    integers = np.zeros(size, dtype=np.int64)
+    floats = np.zeros(size, dtype=np.float64)
+    booleans = np.zeros(size, dtype=bool)
+    stamps = np.zeros(size, dtype="datetime64[us]")
+    texts = np.full(size, None, dtype=object)
+
+    if pd.api.types.infer_dtype(values, skipna=True) in ("string", "empty"):
+        missing = values.isna().to_numpy()
+        tags[~missing] = TEXT
+        texts[~missing] = values.to_numpy()[~missing]
+    else:
+        for position, value in enumerate(values.to_numpy()):
+            if value is None or value is pd.NaT:
+                continue
+            if isinstance(value, (bool, np.bool_)):
+                tags[position], booleans[position] = BOOLEAN, value
+            elif isinstance(value, (int, np.integer)) and -(2**63) <= value < 2**63:
+                tags[position], integers[position] = INTEGER, value
+            elif isinstance(value, (float, np.floating)):
+                if value == value:  # NaN stays as missing
+                    tags[position], floats[position] = FLOAT, value
+            elif isinstance(value, datetime):
+                tags[position], stamps[position] = DATETIME, np.datetime64(value, "us")
+            elif isinstance(value, time):
+                tags[position], texts[position] = TIME, value.isoformat()
+            elif isinstance(value, (int, np.integer)):
+                ## Out of the int64 range, kept as its digits
+                tags[position], texts[position] = BIG_INTEGER, str(int(value))
+            else:
+                tags[position], texts[position] = TEXT, str(value)
+
+    return pa.StructArray.from_arrays(
+        [
+            pa.array(tags),
+            pa.array(integers),
+            pa.array(floats),
+            pa.array(booleans),
+            pa.array(stamps),
+            pa.array(texts, type=pa.string()),
+        ],
+        names=["tag", "integer", "float", "boolean", "datetime", "text"],
+    )
+
+
+def decode_objects(column: "pa.ChunkedArray") -> np.ndarray:
+    """Rebuild the object column stored by encode_objects"""
+    struct = column.combine_chunks()
+    tags = struct.field("tag").to_numpy()
+    values = np.full(len(tags), np.nan, dtype=object)
+    for tag in np.unique(tags):
+        positions = np.flatnonzero(tags == tag)
+        if tag == TEXT:
+            texts = struct.field("text").to_numpy(zero_copy_only=False)
+            values[positions] = texts[positions]
+        elif tag == INTEGER:
+            values[positions] = (
+                struct.field("integer").to_numpy()[positions].astype(object)
+            )
+        elif tag == FLOAT:
+            values[positions] = (
+                struct.field("float").to_numpy()[positions].astype(object)
+            )
+        elif tag == BOOLEAN:
+            booleans = struct.field("boolean").to_numpy(zero_copy_only=False)
+            values[positions] = booleans[positions].astype(object)
+        elif tag == DATETIME:
+            stamps = struct.field("datetime").to_numpy()
+            values[positions] = stamps[positions].astype(object)
+        elif tag == TIME:
+            texts = struct.field("text").to_numpy(zero_copy_only=False)
+            values[positions] = [time.fromisoformat(text) for text in texts[positions]]
+        elif tag == BIG_INTEGER:
+            texts = struct.field("text").to_numpy(zero_copy_only=False)
+            values[positions] = [int(text) for text in texts[positions]]
+    return values
+
+
+def frame_to_table(data_frame: pd.DataFrame) -> "pa.Table":
+    """Convert a frame to an Arrow table that can be turned back into the same frame"""
+    arrays, names, columns = [], [], []
+    for position in range(data_frame.shape[1]):
+        values: pd.Series = data_frame.iloc[:, position]
+        is_object = values.dtype == object
+        arrays.append(
+            encode_objects(values) if is_object else pa.array(values, from_pandas=True)
+        )
+        names.append(f"c{position}")
+        columns.append(
+            {
+                "label": encode_label(data_frame.columns[position]),
+                "dtype": str(values.dtype),
+                "objects": bool(is_object),
+            }
+        )
+
+    index = data_frame.index
+    keep_index = not index.equals(pd.RangeIndex(len(data_frame)))
+    if keep_index:
+        arrays.append(pa.array(index.to_numpy(dtype=np.int64)))
+        names.append("__index__")
+
+    metadata = {"columns": columns, "index": keep_index}
+    table = pa.Table.from_arrays(arrays, names=names)
+    return table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata)})
+
+
+def table_to_frame(
+    table: "pa.Table", usecols: list = None, rows: list = None
+) -> pd.DataFrame:
+    """Convert an Arrow table written by frame_to_table back to a frame.
+
+    Only the columns in usecols and the rows in rows (positions) are decoded.
+    """
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    if usecols is None:
+        usecols = range(len(metadata["columns"]))
+    if rows is not None:
+        rows = pa.array(np.asarray(rows, dtype=np.int64))
+
+    columns: dict = {}
+    for position in usecols:
+        column = metadata["columns"][position]
+        values = table.column(f"c{position}")
+        if rows is not None:
+            values = values.take(rows)
+        if column["objects"]:
+            columns[position] = decode_objects(values)
+        else:
+            series = values.to_pandas()
+            if str(series.dtype) != column["dtype"]:
+                series = series.astype(column["dtype"])
+            columns[position] = series.array
+
+    if metadata["index"]:
+        index = table.column("__index__")
+        index = pd.Index((index if rows is None else index.take(rows)).to_numpy())
+    elif rows is None:
+        index = pd.RangeIndex(table.num_rows)
+    else:
+        index = pd.RangeIndex(table.num_rows).take(rows.to_numpy())
+    data_frame = pd.DataFrame(columns, index=index, copy=False)
+    data_frame.columns = [
+        decode_label(metadata["columns"][position]["label"]) for position in usecols
+    ]
+    return data_frame
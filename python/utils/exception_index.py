@@ -0,0 +1,133 @@
+import pandas as pd  # type: ignore
+from typing import Optional
+import os
+import pickle
+
+from utils.excel_loader import CACHE_DIR, load_excel
+
+## Layout of the pickled index, change it when the stored fields change
+INDEX_VERSION = 1
+
+_indexes: dict = {}
+
+
+def normalize(value) -> str:
+    """Return the text used by the normalized lookups: trimmed, upper case and without ".0" on integers"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip().upper()
+    if text.endswith(".0") and text[:-2].lstrip("-").isdigit():
+        text = text[:-2]
+    return text
+
+
+class ExceptionIndex:
+    """Every sheet of an exception workbook, read once, with the values of each column as a set.
+
+    The index is pickled in the __sheetcache__ folder next to the workbook
+    and read from there while the workbook keeps the same mtime and size,
+    so the workbook is only parsed again after it changes.
+    """
+
+    def __init__(self, file_path: str, dtype: Optional[type] = None):
+        self.file_path = os.path.abspath(file_path)
+        self.dtype = dtype
+        self.stat: tuple = ()
+        self.sheets: dict = {}
+        self.sets: dict = {}
+        self.normalized_sets: dict = {}
+
+    def file_stat(self) -> tuple:
+        """Method to return the (mtime, size) of the workbook"""
+        stat = os.stat(self.file_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def index_path(self) -> str:
+        """Method to return the path of the pickled index"""
+        folder = os.path.join(os.path.dirname(self.file_path), CACHE_DIR)
+        dtype = "" if self.dtype is None else f".{self.dtype.__name__}"
+        name = f"{os.path.basename(self.file_path)}{dtype}.exceptions.pickle"
+        return os.path.join(folder, name)
+
+    def is_stale(self) -> bool:
+        """Method to know if the workbook changed since the index was loaded"""
+        return self.stat != self.file_stat()
+
+    def load(self) -> "ExceptionIndex":
+        """Method to fill the index from its pickled copy, or from the workbook if the copy is stale"""
+        stat = self.file_stat()
+        try:
+            with open(self.index_path(), "rb") as file:
+                version, stored_stat, sheets, sets = pickle.load(file)
+            if version == INDEX_VERSION and stored_stat == stat:
+                self.stat, self.sheets, self.sets = stat, sheets, sets
+                self.normalized_sets = {}
+                return self
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+            pass  # No usable copy, read the workbook
+
+        sheets: dict = load_excel(self.file_path, None, dtype=self.dtype)
+        self.stat, self.sheets, self.normalized_sets = stat, sheets, {}
+        self.sets = {
+            (sheet_name, position): frozenset(
+                data_frame.iloc[:, position].dropna().astype(str)
+            )
+            for sheet_name, data_frame in sheets.items()
+            for position in range(data_frame.shape[1])
+        }
+        self.save()
+        return self
+
+    def save(self) -> bool:
+        """Method to pickle the index next to the workbook"""
+        index_path = self.index_path()
+        temp_file = f"{index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(temp_file, "wb") as file:
+                pickle.dump(
+                    (INDEX_VERSION, self.stat, self.sheets, self.sets),
+                    file,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(temp_file, index_path)
+            return True
+        except (OSError, pickle.PicklingError):
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            return False
+
+    def frame(self, sheet_name: str) -> pd.DataFrame:
+        """Method to return a sheet of the workbook"""
+        if sheet_name not in self.sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self.sheets[sheet_name].copy(deep=False)
+
+    def position(self, sheet_name: str, column) -> int:
+        """Method to return the position of a column given by position (int) or header label"""
+        columns = self.frame(sheet_name).columns
+        return column if isinstance(column, int) else columns.get_loc(column)
+
+    def values(self, sheet_name: str, column) -> frozenset:
+        """Method to return the non empty values of a column, as text, in a set"""
+        return self.sets[(sheet_name, self.position(sheet_name, column))]
+
+    def normalized(self, sheet_name: str, column) -> frozenset:
+        """Method to return the normalized values of a column in a set"""
+        key = (sheet_name, self.position(sheet_name, column))
+        if key not in self.normalized_sets:
+            self.normalized_sets[key] = frozenset(map(normalize, self.sets[key]))
+        return self.normalized_sets[key]
+
+    def contains(self, sheet_name: str, column, value) -> bool:
+        """Method to know if a value is in a column, comparing normalized values"""
+        return normalize(value) in self.normalized(sheet_name, column)
+
+
+def exception_index(file_path: str, dtype: Optional[type] = None) -> ExceptionIndex:
+    """Return the index of an exception workbook, loaded once per process and again when it changes"""
+    key = (os.path.abspath(file_path), dtype)
+    index = _indexes.get(key)
+    if index is None or index.is_stale():
+        index = _indexes[key] = ExceptionIndex(file_path, dtype).load()
+    return index
@@ -0,0 +1,70 @@
+import os
+import time
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # pragma: no cover - Windows locks a byte of the file instead
+    fcntl = None
+    import msvcrt  # type: ignore
+
+## Seconds between the attempts to take a lock held by another process (Windows)
+POLL_INTERVAL = 0.2
+
+
+class FileLock:
+    """Exclusive lock on a file, held by a single process at a time.
+
+    The lock is taken with the locking calls of the system (flock, or
+    msvcrt.locking on Windows), so it is released by the system when the
+    process holding it dies, and a stale lock file never blocks anyone.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.release()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """Method to take the lock, waiting for it when blocking, True when it is held"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        handle = open(self.path, "a+b")
+        try:
+            while True:
+                try:
+                    if fcntl is not None:
+                        flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+                        fcntl.flock(handle.fileno(), flags)
+                    else:
+                        handle.seek(0)
+                        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if not blocking:
+                        handle.close()
+                        return False
+                    time.sleep(POLL_INTERVAL)
+        except BaseException:
+            handle.close()
+            raise
+        self.handle = handle
+        return True
+
+    def release(self) -> None:
+        """Method to let another process take the lock"""
+        if self.handle is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.handle.fileno(), fcntl.LOCK_UN)
+            else:
+                self.handle.seek(0)
+                msvcrt.locking(self.handle.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.handle.close()
+            self.handle = None
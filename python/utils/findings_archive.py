@@ -0,0 +1,344 @@
+import pandas as pd  # type: ignore
+from datetime import datetime
+from typing import Optional
+import hashlib
+import json
+import os
+import sqlite3
+
+from utils.exception_index import normalize
+from utils.fingerprints import fingerprint_text
+from utils.inconsistency_journal import BUSY_TIMEOUT, InconsistencyJournal, finding_rows
+from utils.slim_records import ID_COLUMNS, plain_name, record_columns
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover - the findings are not archived
+    pa = None
+
+## Folder created next to the inconsistencies workbooks to archive their findings
+ARCHIVE_DIR = "__findings__"
+
+## The key index, its name starts with "_" so the Parquet readers skip it
+INDEX_NAME = "_index.sqlite"
+
+## Layout of the index tables, change it when the stored fields change
+ARCHIVE_VERSION = 1
+
+## Rows of a row group of the Parquet files, a lookup reads only the groups of its rows
+ROW_GROUP_ROWS = 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    journal TEXT PRIMARY KEY,
+    last_batch INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS keys (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    process TEXT NOT NULL,
+    month TEXT NOT NULL,
+    rule TEXT NOT NULL,
+    found TEXT NOT NULL,
+    part TEXT NOT NULL,
+    position INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS keys_by_key ON keys (key, kind);
+CREATE INDEX IF NOT EXISTS keys_by_rule ON keys (kind, rule, month);
+"""
+
+_archives: dict = {}
+
+
+def archive_root(file_path: str) -> str:
+    """Return the default archive of the findings of an inconsistencies workbook, shared by its folder"""
+    folder = os.path.dirname(os.path.abspath(file_path))
+    return os.path.join(folder, ARCHIVE_DIR)
+
+
+def key_columns(data_frame: pd.DataFrame, id_columns: tuple = ID_COLUMNS) -> dict:
+    """Return the {name: position} of the first column whose header contains each of id_columns"""
+    positions: dict = {}
+    for position, label in enumerate(data_frame.columns):
+        header = plain_name(label)
+        for name in id_columns:
+            if name in header and name not in positions:
+                positions[name] = position
+    return positions
+
+
+def finding_records(
+    data_frame: pd.DataFrame, rule: str, id_columns: tuple = ID_COLUMNS
+) -> Optional[pd.DataFrame]:
+    """Return the archived records of the findings of a frame, None when its rows are not findings.
+
+    Every record has the rule, the Excel row and coordinates (see
+    inconsistency_journal.finding_rows), the value of each of id_columns and
+    the identifying and offending values as JSON.
+    """
+    coordinates, identifying, values = record_columns(data_frame, id_columns)
+    if not coordinates:
+        return None
+    rows = finding_rows(data_frame)
+    records = pd.DataFrame(
+        {
+            "rule": [rule] * len(rows),
+            "row_number": pd.array([row[0] for row in rows], dtype="Int64"),
+            "coordinates": [row[1] for row in rows],
+        }
+    )
+    keys = key_columns(data_frame, id_columns)
+    for name in id_columns:
+        column = [None] * len(rows)
+        if name in keys:
+            texts = map(fingerprint_text, data_frame.iloc[:, keys[name]].tolist())
+            column = [text or None for text in texts]
+        records[name.lower()] = column
+    labels = [str(data_frame.columns[position]) for position in identifying + values]
+    columns = [
+        data_frame.iloc[:, position].tolist() for position in identifying + values
+    ]
+    records["record"] = [
+        json.dumps(
+            {label: fingerprint_text(value) for label, value in zip(labels, row)},
+            ensure_ascii=False,
+        )
+        for row in zip(*columns)
+    ] or [None] * len(rows)
+    return records
+
+
+class FindingsArchive:
+    """History of the findings of every run, in Parquet files partitioned by process and month.
+
+    The inconsistencies workbooks only keep the current sheets. The archive
+    keeps every finding exported from their journals (see collect) in
+    process=<workbook>/month=<YYYY-MM> folders, with a SQLite index of the
+    radicado, siniestro and poliza of each one. A lookup by one of them
+    reads the index and only the rows it points to, and the exception lists
+    are built from the index alone.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.index_path = os.path.join(self.root, INDEX_NAME)
+
+    def connect(self) -> sqlite3.Connection:
+        """Method to open the index, creating its tables the first time"""
+        os.makedirs(self.root, exist_ok=True)
+        connection = sqlite3.connect(
+            self.index_path, timeout=BUSY_TIMEOUT, isolation_level=None
+        )
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != ARCHIVE_VERSION:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {ARCHIVE_VERSION}")
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    def collect(self, journal: InconsistencyJournal, process: str) -> int:
+        """Method to archive the findings exported from a journal since the last collect, returning how many.
+
+        Only the holder of the writer lock of the journal collects its
+        batches. The Parquet files are named after the batches they hold, so
+        a collect that failed before updating the index is repeated over the
+        same files.
+        """
+        if pa is None:
+            return 0
+        connection = self.connect()
+        try:
+            row = connection.execute(
+                "SELECT last_batch FROM sources WHERE journal = ?", (journal.path,)
+            ).fetchone()
+            batches = journal.exported_batches(0 if row is None else row[0])
+            if not batches:
+                return 0
+
+            months: dict = {}
+            for batch_id, run_id, sheet, created, data_frame in batches:
+                records = finding_records(data_frame, sheet)
+                if records is None or records.empty:
+                    continue
+                found = datetime.fromisoformat(created)
+                records.insert(0, "found", pd.Timestamp(found))
+                records.insert(0, "batch_id", batch_id)
+                records.insert(0, "run_id", run_id)
+                months.setdefault(f"{found:%Y-%m}", []).append(records)
+
+            source = hashlib.blake2b(journal.path.encode(), digest_size=8).hexdigest()
+            file_name = f"{source}-{batches[0][0]}-{batches[-1][0]}.parquet"
+            keys = []
+            for month, frames in months.items():
+                records = pd.concat(frames, ignore_index=True)
+                part = os.path.join(f"process={process}", f"month={month}", file_name)
+                self.write_part(part, records)
+                for name_column in ID_COLUMNS:
+                    column = name_column.lower()
+                    for position, (value, rule, found) in enumerate(
+                        zip(records[column], records["rule"], records["found"])
+                    ):
+                        if not pd.isna(value):
+                            keys.append(
+                                (
+                                    name_column,
+                                    normalize(value),
+                                    value,
+                                    process,
+                                    month,
+                                    rule,
+                                    found.isoformat(),
+                                    part,
+                                    position,
+                                )
+                            )
+
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "INSERT INTO keys (kind, key, value, process, month, rule, found,"
+                    " part, position) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    keys,
+                )
+                connection.execute(
+                    "INSERT OR REPLACE INTO sources (journal, last_batch) VALUES (?, ?)",
+                    (journal.path, batches[-1][0]),
+                )
+        finally:
+            connection.close()
+        return sum(len(frame) for frames in months.values() for frame in frames)
+
+    def collected(self, journal: InconsistencyJournal) -> Optional[int]:
+        """Method to return the id of the last batch of a journal the archive holds, None when there is no archive.
+
+        Without pyarrow nothing is archived, so the journal does not keep its
+        exported batches for the archive.
+        """
+        if pa is None:
+            return None
+        connection = self.connect()
+        try:
+            row = connection.execute(
+                "SELECT last_batch FROM sources WHERE journal = ?", (journal.path,)
+            ).fetchone()
+        finally:
+            connection.close()
+        return 0 if row is None else row[0]
+
+    def write_part(self, part: str, records: pd.DataFrame) -> None:
+        """Method to write the records of a partition file, replacing it only once complete"""
+        path = os.path.join(self.root, part)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        ## Named with "_" so the Parquet readers skip it if it is left behind
+        folder, name = os.path.split(path)
+        temp_file = os.path.join(folder, f"_{name}.{os.getpid()}.tmp")
+        try:
+            pq.write_table(
+                pa.Table.from_pandas(records, preserve_index=False),
+                temp_file,
+                row_group_size=ROW_GROUP_ROWS,
+            )
+            os.replace(temp_file, path)
+        finally:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+
+    def lookup(self, value, kind: Optional[str] = None) -> pd.DataFrame:
+        """Method to return every archived finding of a radicado, siniestro or poliza (kind), oldest first"""
+        if pa is None or not os.path.exists(self.index_path):
+            return pd.DataFrame()
+        query = "SELECT part, position, process, month FROM keys WHERE key = ?"
+        parameters: tuple = (normalize(value),)
+        if kind is not None:
+            query, parameters = f"{query} AND kind = ?", (*parameters, plain_name(kind))
+        connection = self.connect()
+        try:
+            rows = connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+
+        parts: dict = {}
+        for part, position, process, month in rows:
+            parts.setdefault((part, process, month), set()).add(position)
+        tables = []
+        for (part, process, month), positions in parts.items():
+            positions = sorted(positions)
+            groups = sorted({position // ROW_GROUP_ROWS for position in positions})
+            parquet = pq.ParquetFile(os.path.join(self.root, part))
+            table = parquet.read_row_groups(groups)
+            offsets = {group: number for number, group in enumerate(groups)}
+            rows = [
+                offsets[position // ROW_GROUP_ROWS] * ROW_GROUP_ROWS
+                + position % ROW_GROUP_ROWS
+                for position in positions
+            ]
+            table = table.take(rows)
+            table = table.add_column(0, "month", pa.array([month] * len(rows)))
+            table = table.add_column(0, "process", pa.array([process] * len(rows)))
+            tables.append(table)
+        if not tables:
+            return pd.DataFrame()
+        records = pa.concat_tables(tables, promote_options="permissive").to_pandas()
+        return records.sort_values("found", kind="stable", ignore_index=True)
+
+    def exception_list(
+        self,
+        kind: str = "RADICADO",
+        rules: Optional[list] = None,
+        since: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Method to return the radicados (or siniestros, polizas) flagged before, one row each.
+
+        The rows have the value, the rules that flagged it, when it was flagged
+        first and last and how many times, ready to review and paste into an
+        exception sheet. rules and since (a "YYYY-MM" month) narrow the
+        findings taken into account.
+        """
+        query = (
+            "SELECT MIN(value), GROUP_CONCAT(DISTINCT rule), MIN(found), MAX(found),"
+            " COUNT(*) FROM keys WHERE kind = ?"
+        )
+        parameters: list = [plain_name(kind)]
+        if rules:
+            query += f" AND rule IN ({', '.join('?' * len(rules))})"
+            parameters += list(rules)
+        if since is not None:
+            query += " AND month >= ?"
+            parameters.append(since)
+        query += " GROUP BY key ORDER BY MIN(found)"
+        connection = self.connect()
+        try:
+            rows = connection.execute(query, parameters).fetchall()
+        finally:
+            connection.close()
+        return pd.DataFrame(
+            rows,
+            columns=[plain_name(kind), "REGLAS", "PRIMERA_VEZ", "ULTIMA_VEZ", "VECES"],
+        )
+
+    def history(
+        self, process: Optional[str] = None, since: Optional[str] = None
+    ) -> pd.DataFrame:
+        """Method to read the archived findings, of a process and from a "YYYY-MM" month on if given"""
+        if pa is None or not os.path.isdir(self.root):
+            return pd.DataFrame()
+        filters = []
+        if process is not None:
+            filters.append(("process", "=", process))
+        if since is not None:
+            filters.append(("month", ">=", since))
+        table = pq.read_table(self.root, partitioning="hive", filters=filters or None)
+        return table.to_pandas()
+
+
+def findings_archive(root: str) -> FindingsArchive:
+    """Return the findings archive of a folder, shared by every sink of the process"""
+    key = os.path.abspath(root)
+    if key not in _archives:
+        _archives[key] = FindingsArchive(root)
+    return _archives[key]
@@ -0,0 +1,97 @@
+import pandas as pd  # type: ignore
+from pandas.api.types import is_scalar  # type: ignore
+from collections import Counter
+from datetime import date, datetime
+from typing import Optional
+import hashlib
+
+from utils.exception_index import normalize
+from utils.slim_records import ID_COLUMNS, record_columns
+
+
+def fingerprint_labels(
+    data_frame: pd.DataFrame, id_columns: tuple = ID_COLUMNS
+) -> Optional[list]:
+    """Return the labels of the columns a finding is fingerprinted by, None when the rows are not findings.
+
+    They are the identifying and offending columns of the rows (see
+    slim_records.record_columns). Rows without identifying columns are
+    told apart by their coordinates, that is by their row in the base.
+    """
+    coordinates, identifying, values = record_columns(data_frame, id_columns)
+    if not coordinates:
+        return None
+    return [
+        data_frame.columns[position]
+        for position in (identifying or coordinates) + values
+    ]
+
+
+def fingerprint_text(value) -> str:
+    """Return the text a value is fingerprinted by, the same before writing it and once read back"""
+    if is_scalar(value) and pd.isna(value):
+        return ""
+    if isinstance(value, (datetime, date)):
+        return pd.Timestamp(value).isoformat()
+    return normalize(value)
+
+
+def fingerprints(data_frame: pd.DataFrame, rule: str, labels: list) -> list:
+    """Return the stable hash of the rule and the values of labels of every row (missing columns count as empty)"""
+    positions: dict = {}
+    for position, label in enumerate(data_frame.columns):
+        positions.setdefault(label, position)
+    empty = [""] * len(data_frame)
+    columns = [
+        (data_frame.iloc[:, positions[label]].tolist() if label in positions else empty)
+        for label in labels
+    ]
+    hashes = []
+    for values in zip(*columns) if columns else [()] * len(data_frame):
+        text = "\x1f".join([str(rule)] + [fingerprint_text(value) for value in values])
+        hashes.append(hashlib.blake2b(text.encode(), digest_size=16).hexdigest())
+    return hashes
+
+
+def drop_known(
+    existing: Optional[pd.DataFrame],
+    frames: list,
+    rule: str,
+    id_columns: tuple = ID_COLUMNS,
+) -> list:
+    """Return the frames of a sheet without the findings it already has.
+
+    The fingerprints of the rows already in the sheet are counted once, and
+    a row of a frame is dropped while the sheet has as many rows with its
+    fingerprint as the frame had before it. So a validation run again only
+    adds what is new, and repeated rows found by a single run (e.g. the
+    duplicated registers) are all kept. Frames that are not findings (see
+    fingerprint_labels) are kept whole.
+    """
+    totals: dict = {}
+    kept: list = []
+    result = []
+    for data_frame in frames:
+        labels = fingerprint_labels(data_frame, id_columns)
+        if labels is None:
+            result.append(data_frame)
+            continue
+        key = tuple(map(str, labels))
+        if key not in totals:
+            totals[key] = Counter()
+            for known in ([] if existing is None else [existing]) + kept:
+                totals[key].update(fingerprints(known, rule, labels))
+
+        seen: Counter = Counter()
+        keep = []
+        for fingerprint in fingerprints(data_frame, rule, labels):
+            seen[fingerprint] += 1
+            keep.append(seen[fingerprint] > totals[key][fingerprint])
+        for fingerprint, count in seen.items():
+            totals[key][fingerprint] = max(totals[key][fingerprint], count)
+
+        if not all(keep):
+            data_frame = data_frame.loc[keep]
+        kept.append(data_frame)
+        result.append(data_frame)
+    return result
@@ -0,0 +1,93 @@
+import pandas as pd  # type: ignore
+from collections import OrderedDict
+from typing import Callable, Optional
+import os
+
+
+class FrameCache:
+    """In-memory LRU cache of parsed sheets, bounded by the size of the cached frames.
+
+    Entries are keyed by (path, sheet, mtime, size, columns), so a workbook
+    that is rewritten on disk is parsed again on the next read and its old
+    frames are dropped from the cache.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024**3):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._frames: OrderedDict = OrderedDict()
+
+    def file_key(self, file_path: str, sheet_name, columns=None) -> tuple:
+        """Method to build the cache key from the current state of the file"""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        return (path, sheet_name, stat.st_mtime_ns, stat.st_size, columns)
+
+    def frame_size(self, data_frame: pd.DataFrame) -> int:
+        """Method to estimate the memory used by a frame without scanning every object cell"""
+        sample_rows = 1000
+        if len(data_frame) <= sample_rows:
+            return int(data_frame.memory_usage(deep=True, index=True).sum())
+        sample_size = data_frame.head(sample_rows).memory_usage(deep=True).sum()
+        return int(sample_size * len(data_frame) / sample_rows)
+
+    def get(
+        self,
+        file_path: str,
+        sheet_name,
+        loader: Callable[[], pd.DataFrame],
+        columns: Optional[tuple] = None,
+    ) -> pd.DataFrame:
+        """Method to return a view of the cached frame, calling the loader on a miss.
+
+        With columns (positions) only that projection is cached and returned,
+        taken from the whole sheet when it is already in the cache.
+        """
+        key = self.file_key(file_path, sheet_name, columns)
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            data_frame, _ = self._frames[key]
+            return data_frame.copy(deep=False)
+
+        whole_sheet = key[:4] + (None,)
+        if columns is not None and whole_sheet in self._frames:
+            self._frames.move_to_end(whole_sheet)
+            data_frame, _ = self._frames[whole_sheet]
+            return data_frame.iloc[:, list(columns)]
+
+        ## The file changed on disk: forget the frames read from older versions of it
+        for cached in list(self._frames):
+            if cached[:2] == key[:2] and cached[2:4] != key[2:4]:
+                _, size = self._frames.pop(cached)
+                self.total_bytes -= size
+
+        data_frame = loader()
+        size = self.frame_size(data_frame)
+        self._frames[key] = (data_frame, size)
+        self.total_bytes += size
+        self.evict()
+        return data_frame.copy(deep=False)
+
+    def peek(self, file_path: str, sheet_name) -> Optional[pd.DataFrame]:
+        """Method to return the cached whole sheet, or None when it is not in the cache"""
+        cached = self._frames.get(self.file_key(file_path, sheet_name))
+        return None if cached is None else cached[0].copy(deep=False)
+
+    def evict(self) -> None:
+        """Method to drop the least recently used frames until the cache fits in max_bytes"""
+        while self.total_bytes > self.max_bytes and len(self._frames) > 1:
+            _, (_, size) = self._frames.popitem(last=False)
+            self.total_bytes -= size
+
+    def invalidate(self, file_path: str, sheet_name=None) -> None:
+        """Method to drop every cached frame of a file (or of a single sheet)"""
+        path = os.path.abspath(file_path)
+        for key in list(self._frames):
+            if key[0] == path and (sheet_name is None or key[1] == sheet_name):
+                _, size = self._frames.pop(key)
+                self.total_bytes -= size
+
+    def clear(self) -> None:
+        """Method to empty the cache"""
+        self._frames.clear()
+        self.total_bytes = 0
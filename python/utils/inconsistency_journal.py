@@ -0,0 +1,286 @@
+import pandas as pd  # type: ignore
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+import os
+import pickle
+import sqlite3
+
+from utils.excel_loader import CACHE_DIR
+from utils.file_lock import FileLock
+from utils.slim_records import ROW_COLUMN, RULE_COLUMN
+
+## Layout of the journal tables, change it when the stored fields change
+JOURNAL_VERSION = 1
+
+## Seconds a writer waits for the journal while another process holds it
+BUSY_TIMEOUT = 300
+
+## The journal is vacuumed when this share of its pages is free, and at least
+## VACUUM_MIN_PAGES of them, so deleting batches gives the space back
+VACUUM_FREE_SHARE = 0.5
+VACUUM_MIN_PAGES = 256
+
+## Identifies the findings recorded by this process
+RUN_ID = f"{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    with_index INTEGER NOT NULL,
+    drop_empty_columns INTEGER NOT NULL,
+    frame BLOB NOT NULL,
+    created TEXT NOT NULL,
+    exported TEXT
+);
+CREATE TABLE IF NOT EXISTS findings (
+    batch_id INTEGER NOT NULL REFERENCES batches (id),
+    run_id TEXT NOT NULL,
+    sheet TEXT NOT NULL,
+    row_number INTEGER,
+    coordinates TEXT,
+    record_key TEXT
+);
+CREATE INDEX IF NOT EXISTS pending_batches ON batches (exported, id);
+CREATE INDEX IF NOT EXISTS findings_by_sheet ON findings (run_id, sheet);
+"""
+
+
+def journal_path(file_path: str) -> str:
+    """Return the path of the journal of an inconsistencies workbook"""
+    file_path = os.path.abspath(file_path)
+    folder = os.path.join(os.path.dirname(file_path), CACHE_DIR)
+    return os.path.join(folder, f"{os.path.basename(file_path)}.journal.sqlite")
+
+
+def finding_rows(data_frame: pd.DataFrame) -> list:
+    """Return the (row_number, coordinates, record_key) of every row of a frame.
+
+    The row number is the Excel row of the base (index + 2) when the index is
+    the position of the row, the coordinates are the COORDENADAS columns
+    joined and the key is the value of the first column (after the rule and
+    row of the slim records).
+    """
+    labels = data_frame.index
+    numbers = (
+        [int(label) + 2 for label in labels]
+        if pd.api.types.is_integer_dtype(labels)
+        else [None] * len(labels)
+    )
+    positions = [
+        position
+        for position, label in enumerate(data_frame.columns)
+        if str(label).upper().startswith("COORDENADAS")
+    ]
+    coordinates = [None] * len(labels)
+    if positions:
+        values = data_frame.iloc[:, positions].astype(str).to_numpy()
+        coordinates = [", ".join(row) for row in values]
+    keys = [None] * len(labels)
+    first = next(
+        (
+            position
+            for position, label in enumerate(data_frame.columns)
+            if label not in (RULE_COLUMN, ROW_COLUMN)
+        ),
+        None,
+    )
+    if first is not None:
+        keys = [
+            None if pd.isna(value) else str(value)
+            for value in data_frame.iloc[:, first]
+        ]
+    return list(zip(numbers, coordinates, keys))
+
+
+class InconsistencyJournal:
+    """SQLite journal of the inconsistencies found for a workbook.
+
+    Every add is a single insert of the frame (pickled, so the exported
+    sheet keeps its columns and dtypes) with one finding row per record:
+    run id, sheet, row number, coordinates and key. SQLite serializes the
+    writers, so several processes can record findings at the same time.
+    The workbook is only written by the process holding the writer lock
+    (see writer_lock), which takes the pending batches with claim() and
+    marks them exported when it succeeds. The journal is never locked
+    while the workbook is written, so recording a finding does not wait
+    for an export. The exported batches and their finding rows are
+    deleted once the findings archive collected them (see discard), the
+    archive keeping their history.
+
+    The journal lives in the __sheetcache__ folder next to the workbook.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = os.path.abspath(file_path)
+        self.path = journal_path(file_path)
+
+    def writer_lock(self) -> FileLock:
+        """Method to return the lock held by the single process that exports the batches to the workbook"""
+        return FileLock(f"{self.path}.lock")
+
+    def connect(self) -> sqlite3.Connection:
+        """Method to open the journal, creating its tables the first time"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT, isolation_level=None
+        )
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != JOURNAL_VERSION:
+                connection.executescript(SCHEMA)
+                connection.execute(f"PRAGMA user_version = {JOURNAL_VERSION}")
+        except sqlite3.Error:
+            connection.close()
+            raise
+        return connection
+
+    def append(
+        self,
+        sheet_name: str,
+        data_frame: pd.DataFrame,
+        index: bool = False,
+        drop_empty_columns: bool = False,
+    ) -> int:
+        """Method to record the rows of a sheet, returning the id of the batch"""
+        frame = pickle.dumps(data_frame, protocol=pickle.HIGHEST_PROTOCOL)
+        findings = finding_rows(data_frame)
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                batch_id = connection.execute(
+                    "INSERT INTO batches (run_id, sheet, with_index,"
+                    " drop_empty_columns, frame, created) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        RUN_ID,
+                        sheet_name,
+                        int(index),
+                        int(drop_empty_columns),
+                        frame,
+                        datetime.now().isoformat(timespec="seconds"),
+                    ),
+                ).lastrowid
+                connection.executemany(
+                    "INSERT INTO findings (batch_id, run_id, sheet, row_number,"
+                    " coordinates, record_key) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(batch_id, RUN_ID, sheet_name, *row) for row in findings],
+                )
+        finally:
+            connection.close()
+        return batch_id
+
+    @contextmanager
+    def claim(self):
+        """Method to hand the pending batches to the exporter as (sheet, frame, index, drop_empty_columns).
+
+        Only the holder of the writer lock claims batches. They are the ones
+        pending when the block starts, in the order they were recorded, and
+        they are marked exported only when the block ends without error.
+        The block gets (batches, runs), runs being the {run id: (batches,
+        first created)} of the batches other runs recorded: running bots, or
+        runs that died before exporting theirs.
+        """
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT id, sheet, frame, with_index, drop_empty_columns, run_id,"
+                " created FROM batches WHERE exported IS NULL ORDER BY id"
+            ).fetchall()
+            batches = [
+                (sheet, pickle.loads(frame), bool(index), bool(drop))
+                for _, sheet, frame, index, drop, _, _ in rows
+            ]
+            runs: dict = {}
+            for *_, run_id, created in rows:
+                if run_id != RUN_ID:
+                    count, first = runs.get(run_id, (0, created))
+                    runs[run_id] = (count + 1, min(first, created))
+            yield batches, runs
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.executemany(
+                    "UPDATE batches SET exported = ? WHERE id = ?",
+                    [
+                        (datetime.now().isoformat(timespec="seconds"), row[0])
+                        for row in rows
+                    ],
+                )
+        finally:
+            connection.close()
+
+    def exported_batches(self, after: int = 0) -> list:
+        """Method to return the (id, run_id, sheet, created, frame) of the exported batches recorded after a batch id"""
+        connection = self.connect()
+        try:
+            rows = connection.execute(
+                "SELECT id, run_id, sheet, created, frame FROM batches"
+                " WHERE id > ? AND exported IS NOT NULL ORDER BY id",
+                (after,),
+            ).fetchall()
+        finally:
+            connection.close()
+        return [
+            (batch_id, run_id, sheet, created, pickle.loads(frame))
+            for batch_id, run_id, sheet, created, frame in rows
+        ]
+
+    def discard(self, through: Optional[int]) -> int:
+        """Method to delete the exported batches up to a batch id, all of them when None, returning how many.
+
+        Only the holder of the writer lock discards batches. The file is
+        vacuumed when most of its pages are left free.
+        """
+        condition = "exported IS NOT NULL"
+        parameters: tuple = ()
+        if through is not None:
+            condition, parameters = f"{condition} AND id <= ?", (through,)
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute("BEGIN IMMEDIATE")
+                connection.execute(
+                    "DELETE FROM findings WHERE batch_id IN"
+                    f" (SELECT id FROM batches WHERE {condition})",
+                    parameters,
+                )
+                deleted = connection.execute(
+                    f"DELETE FROM batches WHERE {condition}", parameters
+                ).rowcount
+            if deleted:
+                free = connection.execute("PRAGMA freelist_count").fetchone()[0]
+                pages = connection.execute("PRAGMA page_count").fetchone()[0]
+                if free >= VACUUM_MIN_PAGES and free >= pages * VACUUM_FREE_SHARE:
+                    connection.execute("VACUUM")
+        finally:
+            connection.close()
+        return deleted
+
+    def pending(self) -> bool:
+        """Method to return True when some batch is waiting to be exported"""
+        connection = self.connect()
+        try:
+            return (
+                connection.execute(
+                    "SELECT EXISTS (SELECT 1 FROM batches WHERE exported IS NULL)"
+                ).fetchone()[0]
+                == 1
+            )
+        finally:
+            connection.close()
+
+    def findings(self, run_id: str = None) -> pd.DataFrame:
+        """Method to return the findings recorded and not yet archived, of every run or of one"""
+        query = "SELECT * FROM findings"
+        parameters: tuple = ()
+        if run_id is not None:
+            query, parameters = f"{query} WHERE run_id = ?", (run_id,)
+        connection = self.connect()
+        try:
+            return pd.read_sql_query(
+                f"{query} ORDER BY rowid", connection, params=parameters
+            )
+        finally:
+            connection.close()
@@ -0,0 +1,306 @@
+import pandas as pd  # type: ignore
+import atexit
+import errno
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+from typing import Optional
+
+from utils.excel_loader import parse_sheets, sheet_names
+from utils.inconsistency_journal import InconsistencyJournal
+from utils.findings_archive import archive_root, findings_archive
+from utils.fingerprints import drop_known
+from utils.rule_caps import CAP_SHEET, cap_mode, count_row, rule_cap
+from utils.slim_records import ID_COLUMNS, slim_frame, slim_mode
+from utils.xlsx_patch import replace_sheets
+
+_sinks: dict = {}
+
+## The failures the sinks recover from are logged, the bot reads the output of the scripts
+logger = logging.getLogger(__name__)
+
+## Identifying columns of the slim records, None to record the whole rows
+_slim_columns = None
+
+## Most findings recorded per rule (see rule_caps.cap_mode), None for all of them
+_rule_caps = None
+
+## Folder of the findings archive, None for the one next to each workbook
+_archive_folder = None
+
+
+class InconsistencySink:
+    """Inconsistencies found by the validations, journaled and written to the workbook at once.
+
+    Every validation used to open the inconsistencies workbook, read back the
+    sheet of its rule, append its rows and rewrite the whole file. The sink
+    records the frames of every sheet in the journal of the workbook instead
+    (see InconsistencyJournal), and flush() exports the pending ones: it
+    reads each touched sheet once, appends all of them in order and writes
+    the workbook a single time, replacing it only after the new copy is
+    complete. When the workbook cannot be written (e.g. it is open in Excel)
+    the rows are written to a fallback workbook next to it, so no
+    inconsistency is lost.
+
+    The findings stay in the journal until they are exported, so the ones of
+    a process that died before flushing are written by the next flush, which
+    logs the runs they come from (see report_runs). When the journal cannot
+    be written the frames are kept in memory. Several bots can add to the
+    same workbook at the same time: adding never waits for an export, and a
+    single process at a time writes the workbook.
+
+    The sinks are flushed when the process exits (see inconsistency_sink).
+    When a flush does not reach the workbook, error tells why.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = os.path.abspath(file_path)
+        self.journal = InconsistencyJournal(file_path)
+        self.batches: list = []
+        self.error: Optional[str] = None
+
+    def add(
+        self,
+        sheet_name: str,
+        data_frame: pd.DataFrame,
+        index: bool = False,
+        drop_empty_columns: bool = False,
+        total: Optional[int] = None,
+    ) -> None:
+        """Method to record rows to append to a sheet.
+
+        With index the rows are written with their index as first column, and
+        with drop_empty_columns the columns left empty by the rows already in
+        the sheet are dropped before appending to them. In slim mode (see
+        configure_sinks) only the slim records of the rows are kept.
+
+        When the rule of the sheet is capped only its first findings are
+        recorded (see cap_findings), and the count of all of them, total when
+        the rows are already a capped sample, goes to the cap sheet.
+        """
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(
+                errno.ENOENT, os.strerror(errno.ENOENT), self.file_path
+            )
+        total = len(data_frame) if total is None else total
+        data_frame = cap_findings(data_frame, sheet_name)
+        if _slim_columns is not None:
+            data_frame = slim_frame(data_frame, sheet_name, _slim_columns)
+        self.record(sheet_name, data_frame, index, drop_empty_columns)
+        if total > len(data_frame):
+            self.record(CAP_SHEET, count_row(sheet_name, total, len(data_frame)))
+
+    def record(
+        self,
+        sheet_name: str,
+        data_frame: pd.DataFrame,
+        index: bool = False,
+        drop_empty_columns: bool = False,
+    ) -> None:
+        """Method to journal a batch, or keep it in memory when the journal cannot be written"""
+        try:
+            self.journal.append(sheet_name, data_frame, index, drop_empty_columns)
+        except (OSError, sqlite3.Error, pickle.PicklingError) as e:
+            ## Kept in memory until the flush
+            logger.warning("The journal of %s cannot be written: %s", self.file_path, e)
+            self.batches.append((sheet_name, data_frame, index, drop_empty_columns))
+
+    def fallback_path(self) -> str:
+        """Method to return the workbook used when the inconsistencies workbook cannot be written"""
+        root, extension = os.path.splitext(self.file_path)
+        return f"{root}_pendientes{extension}"
+
+    def flush(self) -> bool:
+        """Method to export the pending rows into the workbook, True when they end up in it.
+
+        The batches of every process are exported by the one holding the
+        writer lock of the journal. When another process holds it the flush
+        returns at once, as that process looks for pending batches again
+        after releasing the lock and exports these too. Batches kept in
+        memory are exported here, waiting for the lock. When it returns
+        False, error tells why.
+        """
+        self.error = None
+        try:
+            self.journal.connect().close()
+        except (OSError, sqlite3.Error) as e:
+            ## The journal cannot be read, export what is in memory
+            logger.warning("The journal of %s cannot be read: %s", self.file_path, e)
+            try:
+                return self.export(self.batches)
+            except Exception as e:
+                ## Kept in memory, the next flush tries again
+                self.pending_error(e)
+                return False
+        exported = True
+        lock = self.journal.writer_lock()
+        try:
+            while lock.acquire(blocking=bool(self.batches)):
+                try:
+                    with self.journal.claim() as (batches, runs):
+                        exported = self.export(batches + self.batches) and exported
+                    self.report_runs(runs)
+                    self.archive()
+                finally:
+                    lock.release()
+                ## Batches recorded meanwhile by processes that found the lock taken
+                if not self.journal.pending():
+                    break
+        except Exception as e:
+            ## Still pending, the next flush tries again
+            self.pending_error(e)
+            return False
+        return exported
+
+    def report_runs(self, runs: dict) -> None:
+        """Method to log the batches of other runs the flush exported, with their run and first date.
+
+        They may come from a run that died days earlier on another base, and
+        nothing in the sheets tells them apart from the findings of this run.
+        """
+        if not runs:
+            return
+        logger.warning(
+            "%s pending batches of %s other runs were exported to %s: %s",
+            sum(count for count, _ in runs.values()),
+            len(runs),
+            self.file_path,
+            ", ".join(
+                f"{run_id} ({count} since {created})"
+                for run_id, (count, created) in runs.items()
+            ),
+        )
+
+    def pending_error(self, error: Exception) -> None:
+        """Method to tell in error that the rows were not exported, after the failure that led to it"""
+        pending = f"the inconsistencies stay pending: {error}"
+        self.error = pending if self.error is None else f"{self.error}; {pending}"
+
+    def archive(self) -> None:
+        """Method to add the exported findings to the findings archive, without failing the export.
+
+        The journal keeps the exported batches only until they are archived.
+        """
+        root = _archive_folder or archive_root(self.file_path)
+        process = os.path.splitext(os.path.basename(self.file_path))[0]
+        try:
+            archive = findings_archive(root)
+            archive.collect(self.journal, process)
+            self.journal.discard(archive.collected(self.journal))
+        except Exception as e:
+            ## Archived by the next flush
+            logger.warning(
+                "The findings of %s were not archived: %s", self.file_path, e
+            )
+
+    def export(self, batches: list) -> bool:
+        """Method to write batches into the workbook, or into the fallback one if it cannot be written.
+
+        Raises when neither can be written, so the batches stay pending.
+        """
+        if not batches:
+            return True
+        sheets, options = group_batches(batches)
+        id_columns = ID_COLUMNS if _slim_columns is None else _slim_columns
+        try:
+            write_sheets(self.file_path, sheets, options, id_columns)
+            self.batches = []
+            return True
+        except Exception as e:
+            self.error = f"{self.file_path} cannot be written: {e}"
+
+        ## The workbook cannot be written, keep a copy of it with the rows next to it
+        fallback = self.fallback_path()
+        if not os.path.exists(fallback):
+            shutil.copyfile(self.file_path, fallback)
+        write_sheets(fallback, sheets, options, id_columns)
+        self.batches = []
+        self.error = f"{self.error}; the inconsistencies were written to {fallback}"
+        return False
+
+
+def group_batches(batches: list) -> tuple:
+    """Group (sheet, frame, index, drop_empty_columns) batches into the sheets and options of write_sheets"""
+    sheets: dict = {}
+    options: dict = {}
+    for sheet_name, data_frame, index, drop_empty_columns in batches:
+        sheets.setdefault(sheet_name, []).append(data_frame)
+        options.setdefault(sheet_name, (index, drop_empty_columns))
+    return sheets, options
+
+
+def write_sheets(
+    file_path: str, sheets: dict, options: dict, id_columns: tuple = ID_COLUMNS
+) -> None:
+    """Append the frames of every sheet to the sheet of the workbook, writing it once.
+
+    The existing rows of a sheet are read back as pd.read_excel does and the
+    frames are concatenated after them, with the (index, drop_empty_columns)
+    options the sheet was added with (see InconsistencySink.add). The
+    findings the sheet already has are not appended again (see
+    fingerprints.drop_known), so the sheets do not grow when a validation
+    runs again. Only the sheets written are rewritten, the rest of the
+    workbook is copied as it is (see xlsx_patch.replace_sheets).
+    """
+    existing = set(sheet_names(file_path))
+    frames: dict = {}
+    if existing & set(sheets):
+        frames = parse_sheets(file_path, [name for name in sheets if name in existing])
+
+    tables: dict = {}
+    for sheet_name, sheet_frames in sheets.items():
+        index, drop_empty_columns = options[sheet_name]
+        sheet_frames = drop_known(
+            frames.get(sheet_name), sheet_frames, sheet_name, id_columns
+        )
+        if sheet_name in frames:
+            existing = frames[sheet_name]
+            if drop_empty_columns:
+                existing = existing.dropna(how="all", axis=1)
+            sheet_frames = [existing] + sheet_frames
+        tables[sheet_name] = pd.concat(sheet_frames, ignore_index=not index)
+    indexed = tuple(name for name in sheets if options[name][0])
+    replace_sheets(file_path, tables, indexed)
+
+
+def inconsistency_sink(file_path: str) -> InconsistencySink:
+    """Return the sink of an inconsistencies workbook, shared by every validation of the process"""
+    key = os.path.abspath(file_path)
+    if key not in _sinks:
+        _sinks[key] = InconsistencySink(file_path)
+    return _sinks[key]
+
+
+def configure_sinks(params: dict) -> None:
+    """Set from the bot parameters whether the sinks keep whole rows or slim records and the caps of the rules.
+
+    See slim_records.slim_mode and rule_caps.cap_mode. The findings are
+    archived in the "findings_archive" folder, or next to each workbook.
+    """
+    global _slim_columns, _rule_caps, _archive_folder
+    _slim_columns = slim_mode(params)
+    _rule_caps = cap_mode(params)
+    _archive_folder = params.get("findings_archive") or None
+
+
+def cap_findings(data_frame: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Return the first findings of a rule up to its cap, all of them when it has none.
+
+    The validations call it before building the coordinates of the rows, so
+    a broken input that flags every row does not cost more than the cap.
+    """
+    cap = rule_cap(_rule_caps, rule)
+    if cap is None or len(data_frame) <= cap:
+        return data_frame
+    return data_frame.iloc[:cap]
+
+
+def flush_inconsistencies() -> Optional[str]:
+    """Export the rows of every sink, returning None when all of them reached their workbook or why they did not"""
+    errors = [sink.error for sink in list(_sinks.values()) if not sink.flush()]
+    return "; ".join(errors) if errors else None
+
+
+atexit.register(flush_inconsistencies)
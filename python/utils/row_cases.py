@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd  # type: ignore
+from typing import Callable, Optional
+
+from utils.column_kernels import cell_text, digit_text, without
+from utils.shared_columns import derived
+
+
+class Expression:
+    """A column derived from the frame of a rule, evaluated at once on the whole columns.
+
+    The rules used to check their rows one by one with apply(axis=1), which
+    builds a Series for every row. An expression declares the same test with
+    the columns, comparisons and boolean operators (&, |, ~) of the rule, and
+    cases combines them as the if/elif/else of the row checks did. Calling it
+    with the frame and the exception sources of the rule (see rules.Rule)
+    returns the value of every row, so an expression is itself a check.
+
+    The normalizations of the columns (text, number, date and the texts
+    without some characters) have a key. A rule set computes each of them
+    once for all its rules (see shared_columns.SharedColumns), and uses
+    tells the rule set which ones an expression reads.
+    """
+
+    def __init__(
+        self,
+        evaluate: Callable[..., pd.Series],
+        parts: tuple = (),
+        key: Optional[tuple] = None,
+    ):
+        self.evaluate = evaluate
+        self.parts = tuple(part for part in parts if isinstance(part, Expression))
+        self.key = key
+
+    def __call__(self, data_frame: pd.DataFrame, *sources) -> pd.Series:
+        if self.key is None:
+            return self.evaluate(data_frame, *sources)
+        return derived(
+            data_frame, self.key, lambda: self.evaluate(data_frame, *sources)
+        )
+
+    def uses(self) -> set:
+        """Method to return the keys of the normalizations the expression reads"""
+        keys = {self.key} if self.key is not None else set()
+        for part in self.parts:
+            keys |= part.uses()
+        return keys
+
+    def combine(self, other, operation: Callable) -> "Expression":
+        """Method to return the expression of an operation between this one and other, an expression or a constant"""
+        return Expression(
+            lambda data_frame, *sources: operation(
+                self(data_frame, *sources), evaluate(other, data_frame, sources)
+            ),
+            (self, other),
+        )
+
+    def pipe(self, function: Callable, *args) -> "Expression":
+        """Method to return the expression of function(values, *args), e.g. a column kernel"""
+        return Expression(
+            lambda data_frame, *sources: function(self(data_frame, *sources), *args),
+            (self,),
+        )
+
+    def __eq__(self, other) -> "Expression":  # type: ignore[override]
+        return self.combine(other, lambda left, right: left == right)
+
+    def __ne__(self, other) -> "Expression":  # type: ignore[override]
+        return self.combine(other, lambda left, right: left != right)
+
+    def __and__(self, other) -> "Expression":
+        return self.combine(other, lambda left, right: left & right)
+
+    def __or__(self, other) -> "Expression":
+        return self.combine(other, lambda left, right: left | right)
+
+    def __invert__(self) -> "Expression":
+        return self.pipe(lambda values: ~values)
+
+    def isin(self, values) -> "Expression":
+        """Method to return whether every value is one of values, a list or an expression (e.g. source)"""
+        return self.combine(values, lambda left, right: left.isin(right))
+
+    def notna(self) -> "Expression":
+        """Method to return whether every value is not empty (NaN, NaT)"""
+        return self.pipe(lambda values: values.notna())
+
+    def map(self, mapping: dict) -> "Expression":
+        """Method to return the value mapping gives to every value, NaN for the ones it lacks"""
+        return self.pipe(lambda values: values.map(mapping))
+
+    def matches(self, pattern) -> "Expression":
+        """Method to return whether every text matches a text_patterns.TextPattern"""
+        return self.pipe(pattern.search)
+
+    def without(self, characters: str) -> "Expression":
+        """Method to return the expression of the texts with each of the characters removed"""
+        key = None if self.key is None else ("without", self.key, characters)
+        return Expression(
+            lambda data_frame, *sources: without(
+                self(data_frame, *sources), characters
+            ),
+            (self,),
+            key,
+        )
+
+    def digits(self, separators: str = "") -> "Expression":
+        """Method to return whether every text is digits once the separators are removed"""
+        return self.without(separators).pipe(digit_text)
+
+
+def evaluate(operand, data_frame: pd.DataFrame, sources: tuple):
+    """Return the values of an operand, evaluated when it is an expression and as it is when constant"""
+    if isinstance(operand, Expression):
+        return operand(data_frame, *sources)
+    return operand
+
+
+def text(column) -> Expression:
+    """Return the expression of str(value) of every cell of a column, "nan" for the empty ones"""
+    return Expression(
+        lambda data_frame, *sources: cell_text(data_frame[column]),
+        key=("text", column),
+    )
+
+
+def number(column) -> Expression:
+    """Return the expression of float(str(value)) of every cell of a column.
+
+    Like float, a cell that is not a number raises ValueError.
+    """
+
+    def evaluate_number(data_frame: pd.DataFrame, *sources) -> pd.Series:
+        values = data_frame[column]
+        if isinstance(values.dtype, np.dtype) and values.dtype.kind in "iuf":
+            return values.astype(float)
+        numbers = [float(value) for value in cell_text(values)]
+        return pd.Series(numbers, index=values.index, dtype=float)
+
+    return Expression(evaluate_number, key=("number", column))
+
+
+def date(column, date_format: Optional[str] = None) -> Expression:
+    """Return the expression of the dates of a column, NaT for the cells that are not dates (in date_format when given)"""
+    return Expression(
+        lambda data_frame, *sources: pd.to_datetime(
+            data_frame[column], format=date_format, errors="coerce"
+        ),
+        key=("date", column, date_format),
+    )
+
+
+def month(column, date_format: str) -> Expression:
+    """Return the expression of the month number of the dates of a column, NaN for the cells that are not dates"""
+    return date(column, date_format).pipe(lambda dates: dates.dt.month)
+
+
+def source(position: int) -> Expression:
+    """Return the expression of an exception source of the rule, by its position"""
+    return Expression(lambda data_frame, *sources: sources[position])
+
+
+def when(condition: Expression, outcome) -> tuple:
+    """Return a branch of cases: the outcome of the rows where the condition holds"""
+    return (condition, outcome)
+
+
+def cases(*branches: tuple, default) -> Expression:
+    """Return the expression of the outcome of the first branch whose condition holds, default for the rest.
+
+    It is the if/elif/else of a row check: every condition and outcome is
+    evaluated once on the whole columns and np.select picks the outcome of
+    each row, so the outcomes must not raise on the rows of other branches.
+    """
+
+    def evaluate_cases(data_frame: pd.DataFrame, *sources) -> pd.Series:
+        conditions = [
+            np.asarray(condition(data_frame, *sources), dtype=bool)
+            for condition, _ in branches
+        ]
+        outcomes = [
+            np.asarray(evaluate(outcome, data_frame, sources))
+            for _, outcome in branches
+        ]
+        chosen = np.select(
+            conditions, outcomes, np.asarray(evaluate(default, data_frame, sources))
+        )
+        return pd.Series(chosen, index=data_frame.index)
+
+    parts = [part for branch in branches for part in branch]
+    return Expression(evaluate_cases, (*parts, default))
@@ -0,0 +1,56 @@
+import pandas as pd  # type: ignore
+from datetime import datetime
+from typing import Optional
+
+## Sheet with a count row for every rule whose findings were capped
+CAP_SHEET = "ResumenTopes"
+
+## Key of the cap of the rules without one of their own
+DEFAULT_CAP = "*"
+
+
+def cap_mode(params: dict) -> Optional[dict]:
+    """Return the {rule: cap} asked by the bot, None when the findings are not capped.
+
+    "max_inconsistencies" caps every rule and "rule_caps" sets the cap of
+    some of them, as a dict or as text ("FormatoNumeroRadicado=500,
+    DatoTipoNumero=1000"). A cap of 0 or less leaves the rule without cap.
+    """
+    caps: dict = {}
+    if params.get("max_inconsistencies") not in (None, ""):
+        caps[DEFAULT_CAP] = int(params["max_inconsistencies"])
+    rules = params.get("rule_caps") or {}
+    if isinstance(rules, str):
+        rules = dict(item.split("=", 1) for item in rules.split(",") if "=" in item)
+    for rule, cap in rules.items():
+        caps[str(rule).strip()] = int(cap)
+    return caps or None
+
+
+def rule_cap(caps: Optional[dict], rule: str) -> Optional[int]:
+    """Return the most findings of a rule to record, None when they are not capped"""
+    if caps is None:
+        return None
+    cap = caps.get(rule, caps.get(DEFAULT_CAP))
+    return cap if cap is not None and cap > 0 else None
+
+
+def count_row(rule: str, total: int, kept: int) -> pd.DataFrame:
+    """Return the row of the cap sheet telling how many findings a rule had and how many were kept"""
+    return pd.DataFrame(
+        {
+            "REGLA": [rule],
+            "TOTAL_INCONSISTENCIAS": [total],
+            "INCONSISTENCIAS_GUARDADAS": [kept],
+            "FECHA": [datetime.now().replace(microsecond=0)],
+        }
+    )
+
+
+def cap_message(rule: str, total: int, kept: int) -> str:
+    """Return the result of a validation whose findings passed the cap of its rule"""
+    return (
+        f"ERROR: La regla {rule} supero el tope de inconsistencias, "
+        f"se encontraron {total} y se guardaron las primeras {kept}. "
+        "Revise el archivo de entrada"
+    )
@@ -0,0 +1,188 @@
+import pandas as pd  # type: ignore
+from collections import Counter
+from typing import Callable, Optional
+import json
+
+from utils.row_cases import Expression
+from utils.shared_columns import SharedColumns, shared_columns, sharing
+
+
+class Rule:
+    """A validation of the main sheet, declared by what it reads, checks and reports.
+
+    columns are the positions of the sheet the rule reads (None for the
+    whole sheet, labeled by header), exceptions the (sheet, column) sources
+    of the exception workbook it compares against (column None for the whole
+    sheet) and check the vectorized predicate: it takes the frame and the
+    exception sources and returns the flag of every row. The rows whose flag
+    equals keep are the findings, reported in sheet with the coordinates of
+    the coordinates columns and the flag column the sheets always had.
+    prepare, when given, derives the frame the rule judges (e.g. a merge).
+    A check declared as a row_cases.Expression shares the normalizations of
+    its columns with the rest of the rule set.
+    """
+
+    def __init__(
+        self,
+        rule_id: str,
+        columns: Optional[tuple],
+        check: Callable[..., pd.Series],
+        sheet: str,
+        coordinates,
+        exceptions: tuple = (),
+        flag: str = "is_valid",
+        keep: bool = False,
+        prepare: Optional[Callable[..., pd.DataFrame]] = None,
+    ):
+        self.rule_id = rule_id
+        self.columns = None if columns is None else tuple(columns)
+        self.check = check
+        self.sheet = sheet
+        self.coordinates = coordinates
+        self.exceptions = tuple(exceptions)
+        self.flag = flag
+        self.keep = keep
+        self.prepare = prepare
+
+    def uses(self) -> set:
+        """Method to return the keys of the normalized columns the check reads, shared in a rule set"""
+        if self.prepare is None and isinstance(self.check, Expression):
+            return self.check.uses()
+        return set()
+
+
+class RuleEngine:
+    """Runs a set of rules against the main sheet of a validation group, loaded once.
+
+    The group gives the sheet (read_excel, read_columns), the exception
+    sources (exception_values, read_excel) and reports the findings
+    (validate_inconsistencies), so the engine adds no reading or writing of
+    its own: a rule set costs one load of the columns all its rules read,
+    one read of each exception source, one normalization of each column it
+    normalizes (see plan) and the predicates.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.sources: dict = {}
+
+    def exception_source(self, sheet_name: str, column):
+        """Method to return an exception source, the values of a column as text or the whole sheet"""
+        key = (sheet_name, column)
+        if key not in self.sources:
+            if column is None:
+                self.sources[key] = self.group.read_excel(
+                    self.group.exception_file, sheet_name
+                )
+            else:
+                self.sources[key] = self.group.exception_values(sheet_name, column)
+        return self.sources[key]
+
+    def load(self, rules: list) -> tuple:
+        """Method to return the (whole sheet, projection) the rules read, None the ones no rule needs"""
+        whole_sheet = None
+        if any(rule.columns is None for rule in rules):
+            whole_sheet = self.group.read_excel(
+                self.group.path_file, self.group.sheet_name
+            )
+        positions = sorted(
+            {
+                column
+                for rule in rules
+                if rule.columns is not None
+                for column in rule.columns
+            }
+        )
+        ## Taken from the whole sheet when it was loaded (see FrameCache.get)
+        projection = self.group.read_columns(*positions) if positions else None
+        return whole_sheet, projection
+
+    def plan(self, rules: list, whole_sheet, projection) -> list:
+        """Method to plan the normalized columns the rules share, counting the rules of each one by frame"""
+        plans = []
+        for data_frame, whole in ((whole_sheet, True), (projection, False)):
+            if data_frame is not None:
+                uses = Counter(
+                    key
+                    for rule in rules
+                    if (rule.columns is None) == whole
+                    for key in rule.uses()
+                )
+                plans.append(SharedColumns(data_frame, uses))
+        return plans
+
+    def run(self, rules: list) -> list:
+        """Method to run the rules in order, returning the result of each.
+
+        A rule that fails gives its "ERROR:" result and the next ones still run.
+        """
+        whole_sheet, projection = self.load(rules)
+        results = []
+        with sharing(*self.plan(rules, whole_sheet, projection)):
+            for rule in rules:
+                data_frame = whole_sheet if rule.columns is None else projection
+                try:
+                    results.append(self.run_rule(rule, data_frame))
+                except Exception as e:
+                    results.append(f"ERROR: {e}")
+                finally:
+                    shared = shared_columns(data_frame)
+                    if shared is not None:
+                        shared.release(rule.uses())
+        return results
+
+    def run_rule(self, rule: Rule, data_frame: pd.DataFrame) -> str:
+        """Method to check a rule against the frame and report its findings"""
+        sources = [
+            self.exception_source(sheet_name, column)
+            for sheet_name, column in rule.exceptions
+        ]
+        if rule.prepare is not None:
+            data_frame = rule.prepare(data_frame, *sources)
+        flags = rule.check(data_frame, *sources).astype(bool)
+        findings = data_frame[flags if rule.keep else ~flags]
+        findings = findings.assign(**{rule.flag: rule.keep})
+        return self.group.validate_inconsistencies(
+            findings, rule.coordinates, rule.sheet
+        )
+
+
+def rule_steps(params: dict) -> list:
+    """Return the steps of a rule set asked by the bot, each one a dict with the "rule" and its parameters.
+
+    "rules" is a list of steps, or the same list as JSON text.
+    """
+    steps = params.get("rules") or []
+    if isinstance(steps, str):
+        steps = json.loads(steps)
+    return [{"rule": step} if isinstance(step, str) else step for step in steps]
+
+
+def build_rules(registry: dict, steps: list) -> list:
+    """Return the rules of the steps, built by the factories of the registry.
+
+    The registry maps every rule id to its factory and the {parameter:
+    conversion} of the parameters of its bot step, in the order the factory
+    takes them, None to take them as given.
+    """
+    rules = []
+    for step in steps:
+        if step["rule"] not in registry:
+            raise ValueError(f"Regla desconocida: {step['rule']}")
+        factory, conversions = registry[step["rule"]]
+        arguments = [
+            step.get(name) if convert is None else convert(step.get(name))
+            for name, convert in conversions.items()
+        ]
+        rules.append(factory(*arguments))
+    return rules
+
+
+def rule_set_result(rules: list, results: list) -> str:
+    """Return the result of a rule set, "ERROR:" when a rule failed, with the result of every rule"""
+    lines = "\n".join(
+        f"{rule.rule_id}: {result}" for rule, result in zip(rules, results)
+    )
+    if any(result.startswith("ERROR") for result in results):
+        return f"ERROR: Fallaron reglas del conjunto\n{lines}"
+    return f"SUCCESS: Conjunto de reglas validado\n{lines}"
@@ -0,0 +1,68 @@
+import pandas as pd  # type: ignore
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+## Shared columns of the frames of the rule sets running, by id of the frame
+_shared: dict = {}
+
+
+class SharedColumns:
+    """Columns a rule set derives from a frame (cell texts, numbers, dates), computed once for all its rules.
+
+    Many rules of a set normalize the same columns: the radicado alone is
+    read as text by several of them. The engine plans the set before
+    running it (see RuleEngine.plan): uses counts the rules that derive
+    every column, the first of them computes it, the next ones take it from
+    here and it is dropped once the last of them ran. A column no rule
+    declared is kept until the set ends.
+
+    The columns are shared as they are, the rules never modify them
+    (pandas copies on write).
+    """
+
+    def __init__(self, data_frame: pd.DataFrame, uses: Counter):
+        self.data_frame = data_frame
+        self.uses = uses
+        self.columns: dict = {}
+
+    def get(self, key, compute: Callable[[], pd.Series]) -> pd.Series:
+        """Method to return a derived column, computing it the first time"""
+        if key not in self.columns:
+            self.columns[key] = compute()
+        return self.columns[key]
+
+    def release(self, keys) -> None:
+        """Method to count the derived columns of a rule that ran, dropping the ones no other rule needs"""
+        for key in keys:
+            self.uses[key] -= 1
+            if self.uses[key] <= 0:
+                self.columns.pop(key, None)
+
+
+def shared_columns(data_frame: pd.DataFrame) -> Optional[SharedColumns]:
+    """Return the shared columns of a frame of a rule set running, None for any other frame"""
+    shared = _shared.get(id(data_frame))
+    if shared is None or shared.data_frame is not data_frame:
+        return None
+    return shared
+
+
+@contextmanager
+def sharing(*plans: SharedColumns) -> Iterator[None]:
+    """Share the derived columns of the planned frames while a rule set runs"""
+    for plan in plans:
+        _shared[id(plan.data_frame)] = plan
+    try:
+        yield
+    finally:
+        for plan in plans:
+            _shared.pop(id(plan.data_frame), None)
+
+
+def derived(data_frame: pd.DataFrame, key, compute: Callable[[], pd.Series]):
+    """Return a column derived from a frame, shared with the other rules when a rule set planned it"""
+    shared = shared_columns(data_frame)
+    if shared is None:
+        return compute()
+    return shared.get(key, compute)
@@ -0,0 +1,107 @@
+import pandas as pd  # type: ignore
+from typing import Optional
+import re
+import unicodedata
+
+from utils.excel_loader import load_excel
+from utils.xlsx_reader import column_number
+
+## Names of the columns that identify a record, looked for in the headers
+ID_COLUMNS = ("SINIESTRO", "RADICADO", "POLIZA")
+
+## Columns every slim record starts with: the rule (sheet) and the Excel row of the base
+RULE_COLUMN = "REGLA"
+ROW_COLUMN = "FILA"
+
+TRUE_TEXTS = {"true", "1", "si", "sí", "yes"}
+
+
+def slim_mode(params: dict) -> Optional[tuple]:
+    """Return the identifying columns of the slim records asked by the bot, None for full rows.
+
+    The mode is turned on with the "slim_inconsistencies" parameter and the
+    identifying columns can be changed with "id_columns" (comma separated).
+    """
+    if str(params.get("slim_inconsistencies", "")).strip().lower() not in TRUE_TEXTS:
+        return None
+    names = params.get("id_columns")
+    if not names:
+        return ID_COLUMNS
+    if isinstance(names, str):
+        names = names.split(",")
+    return tuple(plain_name(name) for name in names if str(name).strip())
+
+
+def plain_name(label) -> str:
+    """Return a column label trimmed, in upper case and without accents"""
+    text = unicodedata.normalize("NFKD", str(label).strip().upper())
+    return "".join(letter for letter in text if not unicodedata.combining(letter))
+
+
+def record_columns(data_frame: pd.DataFrame, id_columns: tuple = ID_COLUMNS) -> tuple:
+    """Return the positions of the (coordinates, identifying, offending) columns of inconsistent rows.
+
+    The coordinates are the columns whose label starts with COORD, the
+    identifying ones those whose header contains one of id_columns and the
+    offending ones the columns named by the letters of the coordinates.
+    """
+    labels = list(data_frame.columns)
+    coordinates = [
+        position
+        for position, label in enumerate(labels)
+        if str(label).upper().startswith("COORD")
+    ]
+    if not coordinates:
+        return [], [], []
+
+    identifying = [
+        position
+        for position, label in enumerate(labels)
+        if position not in coordinates
+        and any(name in plain_name(label) for name in id_columns)
+    ]
+    offending = []
+    if len(data_frame):
+        for position in coordinates:
+            letters = re.match(r"[A-Z]+", str(data_frame.iloc[0, position]))
+            if letters is not None:
+                offending.append(column_number(letters.group()))
+    values = [
+        position
+        for position in dict.fromkeys(offending)
+        if position < len(labels) and position not in coordinates + identifying
+    ]
+    return coordinates, identifying, values
+
+
+def slim_frame(
+    data_frame: pd.DataFrame, rule: str, id_columns: tuple = ID_COLUMNS
+) -> pd.DataFrame:
+    """Return the slim records of the inconsistent rows of a base.
+
+    Every record keeps the rule, the Excel row (index + 2), the coordinates
+    columns, the identifying columns and the columns the coordinates point
+    to (see record_columns), instead of the whole row with the helper
+    columns of the validation. Frames without coordinates (e.g. the summary
+    tables) are returned as they are.
+    """
+    coordinates, identifying, values = record_columns(data_frame, id_columns)
+    if not coordinates:
+        return data_frame
+
+    slim = data_frame.iloc[:, coordinates + identifying + values].copy()
+    slim.insert(0, ROW_COLUMN, data_frame.index + 2)
+    slim.insert(0, RULE_COLUMN, rule)
+    return slim
+
+
+def expand_records(
+    records: pd.DataFrame, file_path: str, sheet_name=0, **kwargs
+) -> pd.DataFrame:
+    """Return the whole rows of the base behind slim records, read from the workbook the validation read"""
+    base: pd.DataFrame = load_excel(file_path, sheet_name=sheet_name, **kwargs)
+    positions = records[ROW_COLUMN].astype(int).to_numpy() - 2
+    rows = base.iloc[positions].copy()
+    rows.insert(0, ROW_COLUMN, positions + 2)
+    rows.insert(0, RULE_COLUMN, records[RULE_COLUMN].to_numpy())
+    return rows
@@ -0,0 +1,86 @@
+import pandas as pd  # type: ignore
+import re
+
+from utils.column_kernels import non_ascii, python_check
+
+## The characters \s matches in the Python patterns (str.isspace), written as
+## themselves since the regex engines do not share their escapes for them
+SPACE = (
+    "[\t\n\x0b\x0c\r\x1c-\x1f \x85\xa0\u1680\u2000-\u200a"
+    "\u2028\u2029\u202f\u205f\u3000]"
+)
+
+## The ASCII digits, the digits of other scripts \d matches are left to the Python pattern
+DIGIT = "[0-9]"
+
+
+class TextPattern:
+    """A regular expression of the validations, compiled once and checked on whole columns.
+
+    pattern is the expression as the validations give it to re.search and
+    column the same test written as a full match for the pandas string
+    methods, with explicit classes instead of \\d and \\s so the regex
+    engine of pyarrow agrees with re. When column only knows the ASCII
+    digits (unicode False) the texts with other characters are checked with
+    the compiled pattern, one by one.
+    """
+
+    def __init__(self, pattern: str, column: str, unicode: bool = True):
+        self.pattern = pattern
+        self.compiled = re.compile(pattern)
+        self.column = column
+        self.unicode = unicode
+
+    def search(self, texts: pd.Series) -> pd.Series:
+        """Method to return bool(re.search(pattern, text)) of every text"""
+        found = texts.str.fullmatch(self.column)
+        if self.unicode:
+            return found.astype(bool)
+        return python_check(
+            found,
+            texts,
+            non_ascii(texts),
+            lambda text: bool(self.compiled.search(text)),
+        )
+
+
+## Numero de radicado: "2024 01 123 000001"
+RADICADO = TextPattern(
+    r"^\d{4}\s\d{2}\s\d{3}\s\d{6}$",
+    rf"{DIGIT}{{4}}{SPACE}{DIGIT}{{2}}{SPACE}{DIGIT}{{3}}{SPACE}{DIGIT}{{6}}\n?",
+    unicode=False,
+)
+
+## Any character besides the ASCII letters and digits
+SPECIAL_CHARACTER = TextPattern(r"[^a-zA-Z0-9]", r"(?s:.*[^a-zA-Z0-9].*)")
+
+## Two or more spaces together
+DOUBLE_SPACE = TextPattern(r"\s\s+", rf"(?s:.*{SPACE}{SPACE}.*)")
+
+## Spaces at the start, at the end or two or more together
+BAD_SPACING = TextPattern(
+    r"(^\s+|\s+$|\s{2,})", rf"(?s:{SPACE}.*|.*{SPACE}|.*{SPACE}{SPACE}.*)"
+)
+
+## The two formats of a percentage ("12.5", "50%;50%"), checked in a single pass
+PERCENTAGE_PATTERN = r"^\d+\.\d{1,2}$|^\d{2}%;\d{2}%$"
+PERCENTAGE_COLUMN = rf"(?:{DIGIT}+\.{DIGIT}{{1,2}}|{DIGIT}{{2}}%;{DIGIT}{{2}}%)\n?"
+
+## A percentage or "1" (the whole)
+PERCENTAGE = TextPattern(
+    rf"{PERCENTAGE_PATTERN}|\A1\Z", rf"{PERCENTAGE_COLUMN}|1", unicode=False
+)
+
+## A percentage or an empty cell ("nan" in any case)
+NULLABLE_PERCENTAGE = TextPattern(
+    rf"{PERCENTAGE_PATTERN}|\A[nN][aA][nN]\Z",
+    rf"{PERCENTAGE_COLUMN}|[nN][aA][nN]",
+    unicode=False,
+)
+
+## Fecha de vencimiento of the desempleo claims: "dd/mm/yyyy;number"
+FECHA_VENCIMIENTO = TextPattern(
+    r"^\d{2}/\d{2}/\d{4};\d{1,12}$",
+    rf"{DIGIT}{{2}}/{DIGIT}{{2}}/{DIGIT}{{4}};{DIGIT}{{1,12}}\n?",
+    unicode=False,
+)
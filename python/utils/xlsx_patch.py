@@ -0,0 +1,637 @@
+import pandas as pd  # type: ignore
+from openpyxl.styles.numbers import BUILTIN_FORMATS_REVERSE  # type: ignore
+from openpyxl.workbook.child import INVALID_TITLE_REGEX  # type: ignore
+from datetime import date, datetime, timedelta
+from typing import Optional
+from xml.sax.saxutils import quoteattr
+import xml.etree.ElementTree as ET
+import posixpath
+import shutil
+import zipfile
+import os
+import re
+
+from utils.coordinates import COLUMN_LETTERS
+from utils.xlsx_reader import MAIN_NS, REL_NS, column_number, sheet_shape
+from utils.xlsx_writer import (
+    SHEET_END,
+    STYLE_IDS,
+    STYLES,
+    frame_xml,
+    row_xml,
+    sheet_start,
+    value_body,
+)
+
+RELATIONSHIPS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+CONTENT_TYPES_PART = "[Content_Types].xml"
+WORKBOOK_PART = "xl/workbook.xml"
+WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+
+WORKSHEET_TYPE = f"{RELATIONSHIPS}/worksheet"
+STYLES_TYPE = f"{RELATIONSHIPS}/styles"
+CALC_CHAIN_TYPE = f"{RELATIONSHIPS}/calcChain"
+WORKSHEET_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+)
+STYLES_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"
+)
+
+## Number formats pandas gives the (datetime, date, duration) cells
+FORMAT_CODES = ("YYYY-MM-DD HH:MM:SS", "YYYY-MM-DD", "0")
+
+## First id of the number formats a workbook defines, the lower ones are built in
+FIRST_CUSTOM_FORMAT = 164
+
+COPY_BUFFER = 1024 * 1024
+
+
+def part_path(target: str) -> str:
+    """Return the archive path of a workbook relationship target"""
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join("xl", target))
+
+
+def sheet_rels_path(part: str) -> str:
+    """Return the archive path of the relationships of a sheet part"""
+    folder, name = posixpath.split(part)
+    return posixpath.join(folder, "_rels", f"{name}.rels")
+
+
+def insert_children(xml: str, tag: str, children: str, added: int) -> Optional[str]:
+    """Return the XML with children added at the end of its tag element and its count raised by added.
+
+    The rest of the XML is kept as it is. Returns None when there is no such
+    element.
+    """
+    match = re.search(rf"<((?:\w+:)?){tag}\b([^>]*?)(/?)>", xml)
+    if match is None:
+        return None
+    prefix, attributes, empty = match.groups()
+    count = re.search(r'\bcount="(\d+)"', attributes)
+    if count is not None:
+        number = int(count.group(1)) + added
+        attributes = attributes.replace(count.group(0), f'count="{number}"')
+    if empty:
+        return (
+            f"{xml[: match.start()]}<{prefix}{tag}{attributes}>{children}"
+            f"</{prefix}{tag}>{xml[match.end():]}"
+        )
+    closing = xml.index(f"</{prefix}{tag}>", match.end())
+    return (
+        f"{xml[: match.start()]}<{prefix}{tag}{attributes}>"
+        f"{xml[match.end():closing]}{children}{xml[closing:]}"
+    )
+
+
+def remove_elements(xml: str, tag: str, attribute: str, value: str) -> str:
+    """Return the XML without the empty tag elements whose attribute has the value"""
+    pattern = rf'<(?:\w+:)?{tag}\b[^>]*\b{attribute}="{re.escape(value)}"[^>]*/>'
+    return re.sub(pattern, "", xml)
+
+
+def cell_styles(styles: str) -> tuple:
+    """Return the styles XML with the cell styles of the (datetime, date, duration) cells, and their ids.
+
+    Styles with the number formats pandas writes and the default font, fill
+    and border are reused. The missing ones are added at the end of the
+    cell styles, so the ids of the styles in use do not change.
+    """
+    root = ET.fromstring(styles)
+    formats = {
+        int(number_format.get("numFmtId")): number_format.get("formatCode", "")
+        for number_format in root.iter(f"{MAIN_NS}numFmt")
+    }
+    cells = root.find(f"{MAIN_NS}cellXfs")
+    if cells is None:
+        raise ValueError("The workbook has no cell styles")
+    xfs = list(cells.iterfind(f"{MAIN_NS}xf"))
+
+    codes: dict = {}
+    for style_id, style in enumerate(xfs):
+        if any(style.get(key, "0") != "0" for key in ("fontId", "fillId", "borderId")):
+            continue
+        format_id = int(style.get("numFmtId", 0))
+        code = formats.get(format_id)
+        if code is None:
+            code = next(
+                (
+                    text
+                    for text, number in BUILTIN_FORMATS_REVERSE.items()
+                    if number == format_id
+                ),
+                "",
+            )
+        codes.setdefault(code.upper(), style_id)
+
+    ids = []
+    new_formats = []
+    new_styles = []
+    next_format = max([FIRST_CUSTOM_FORMAT - 1] + list(formats)) + 1
+    for code in FORMAT_CODES:
+        if code.upper() in codes:
+            ids.append(codes[code.upper()])
+            continue
+        format_id = BUILTIN_FORMATS_REVERSE.get(code)
+        if format_id is None:
+            format_id = next_format
+            next_format += 1
+            new_formats.append(
+                f'<numFmt numFmtId="{format_id}" formatCode={quoteattr(code)}/>'
+            )
+        ids.append(len(xfs) + len(new_styles))
+        new_styles.append(
+            f'<xf numFmtId="{format_id}" fontId="0" fillId="0" borderId="0"'
+            ' xfId="0" applyNumberFormat="1"/>'
+        )
+
+    if new_formats:
+        updated = insert_children(
+            styles, "numFmts", "".join(new_formats), len(new_formats)
+        )
+        if updated is None:
+            ## The number formats go first in the style sheet
+            start = re.search(r"<(?:\w+:)?styleSheet\b[^>]*>", styles).end()
+            updated = (
+                f'{styles[:start]}<numFmts count="{len(new_formats)}">'
+                f'{"".join(new_formats)}</numFmts>{styles[start:]}'
+            )
+        styles = updated
+    if new_styles:
+        styles = insert_children(
+            styles, "cellXfs", "".join(new_styles), len(new_styles)
+        )
+    return styles, tuple(ids)
+
+
+def sheet_table(data_frame: pd.DataFrame, index: bool) -> tuple:
+    """Return the header and the rows to_excel(merge_cells=False) writes for a frame"""
+    columns = data_frame.columns
+    if isinstance(columns, pd.MultiIndex):
+        header = [".".join(map(str, label)) for label in columns]
+    else:
+        header = list(columns)
+    if not index:
+        return header, data_frame
+    levels = data_frame.index.to_frame(index=False)
+    rows = pd.concat([levels, data_frame.reset_index(drop=True)], axis=1)
+    return list(data_frame.index.names) + header, rows
+
+
+def write_sheet(
+    archive: zipfile.ZipFile,
+    part: str,
+    data_frame: pd.DataFrame,
+    index: bool,
+    styles: tuple,
+) -> None:
+    """Stream the XML of the sheet of a frame into a part of the archive"""
+    header, rows = sheet_table(data_frame, index)
+    info = zipfile.ZipInfo(part, datetime.now().timetuple()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    with archive.open(info, "w", force_zip64=True) as sheet:
+        sheet.write(sheet_start((len(rows) + 1, len(header))).encode())
+        bodies = tuple(value_body(label, styles) for label in header)
+        sheet.write(row_xml(1, COLUMN_LETTERS, bodies).encode())
+        for xml in frame_xml(rows, 2, styles):
+            sheet.write(xml.encode())
+        sheet.write(SHEET_END.encode())
+
+
+def part_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    """Return a new entry with the name, date and compression of an entry of another archive"""
+    copy = zipfile.ZipInfo(info.filename, info.date_time)
+    copy.compress_type = info.compress_type
+    copy.external_attr = info.external_attr
+    copy.file_size = info.file_size
+    return copy
+
+
+def copy_part(
+    source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo
+) -> None:
+    """Copy a part between archives, its content byte for byte"""
+    with source.open(info) as reader, target.open(part_info(info), "w") as writer:
+        shutil.copyfileobj(reader, writer, COPY_BUFFER)
+
+
+def replace_sheets(file_path: str, sheets: dict, indexed: tuple = ()) -> None:
+    """Write every {sheet name: frame} into a workbook, replacing the sheets it already has.
+
+    ExcelWriter(mode="a") loads every sheet of the workbook with openpyxl and
+    serializes all of them again to change one. Here only the parts of the
+    sheets written are new: the existing ones are replaced in place and the
+    missing ones added at the end, registered in the workbook, its
+    relationships and the content types. Every other part is copied with its
+    content byte for byte, and the styles only get the date styles they miss.
+    The cells are the ones of to_excel(merge_cells=False), with the index of
+    the sheets in indexed. The calculation chain, if any, is left out for
+    Excel to rebuild it.
+
+    The workbook is written to a copy first, which then replaces it, so a
+    failure never leaves it half written.
+    """
+    for sheet_name in sheets:
+        if INVALID_TITLE_REGEX.search(str(sheet_name)):
+            raise ValueError(f"Invalid character found in sheet title: {sheet_name}")
+
+    root, extension = os.path.splitext(file_path)
+    temp_file = f"{root}.{os.getpid()}.tmp{extension}"
+    try:
+        with zipfile.ZipFile(file_path) as source:
+            names = set(source.namelist())
+            content_types = source.read(CONTENT_TYPES_PART).decode("utf-8")
+            workbook = source.read(WORKBOOK_PART).decode("utf-8")
+            relations = source.read(WORKBOOK_RELS_PART).decode("utf-8")
+
+            targets: dict = {}
+            styles_part = None
+            calc_chain = None
+            for relation in ET.fromstring(relations):
+                target = part_path(relation.get("Target", ""))
+                targets[relation.get("Id")] = target
+                if relation.get("Type") == STYLES_TYPE:
+                    styles_part = target
+                elif relation.get("Type") == CALC_CHAIN_TYPE:
+                    calc_chain = relation.get("Target")
+            parts: dict = {}
+            sheet_ids = [0]
+            for sheet in ET.fromstring(workbook).iter(f"{MAIN_NS}sheet"):
+                parts[sheet.get("name")] = targets.get(sheet.get(f"{REL_NS}id"))
+                sheet_ids.append(int(sheet.get("sheetId", 0)))
+
+            ## Sheets the workbook does not have yet
+            new_parts: dict = {}
+            relation_prefix = re.search(rf'xmlns:(\w+)="{RELATIONSHIPS}"', workbook)
+            for sheet_name in sheets:
+                if sheet_name in parts:
+                    continue
+                number = 1
+                while f"xl/worksheets/sheet{number}.xml" in names | set(
+                    new_parts.values()
+                ):
+                    number += 1
+                part = f"xl/worksheets/sheet{number}.xml"
+                relation_id = 1
+                while f"rId{relation_id}" in targets:
+                    relation_id += 1
+                targets[f"rId{relation_id}"] = part
+                sheet_ids.append(max(sheet_ids) + 1)
+                new_parts[sheet_name] = part
+
+                if relation_prefix is not None:
+                    reference = f'{relation_prefix.group(1)}:id="rId{relation_id}"'
+                else:
+                    reference = f'xmlns:r="{RELATIONSHIPS}" r:id="rId{relation_id}"'
+                workbook = insert_children(
+                    workbook,
+                    "sheets",
+                    f"<sheet name={quoteattr(str(sheet_name))}"
+                    f' sheetId="{sheet_ids[-1]}" {reference}/>',
+                    1,
+                )
+                relations = insert_children(
+                    relations,
+                    "Relationships",
+                    f'<Relationship Id="rId{relation_id}" Type="{WORKSHEET_TYPE}"'
+                    f' Target="{part[3:]}"/>',
+                    1,
+                )
+                content_types = insert_children(
+                    remove_elements(content_types, "Override", "PartName", f"/{part}"),
+                    "Types",
+                    f'<Override PartName="/{part}" ContentType="{WORKSHEET_CONTENT_TYPE}"/>',
+                    1,
+                )
+
+            ## The replaced sheets lose their drawings, comments and tables as with openpyxl
+            replaced = {parts[name]: name for name in sheets if name in parts}
+            skipped = {sheet_rels_path(part) for part in replaced}
+            if calc_chain is not None and replaced:
+                skipped.add(part_path(calc_chain))
+                relations = remove_elements(
+                    relations, "Relationship", "Target", calc_chain
+                )
+                content_types = remove_elements(
+                    content_types, "Override", "PartName", f"/{part_path(calc_chain)}"
+                )
+
+            rewritten = {
+                CONTENT_TYPES_PART: content_types,
+                WORKBOOK_PART: workbook,
+                WORKBOOK_RELS_PART: relations,
+            }
+            if styles_part is not None and styles_part in names:
+                styles, styles_ids = cell_styles(
+                    source.read(styles_part).decode("utf-8")
+                )
+                if styles.encode("utf-8") != source.read(styles_part):
+                    rewritten[styles_part] = styles
+            else:
+                ## Without styles the dates get the ones of the write-only writer
+                styles_part, styles_ids = "xl/styles.xml", STYLE_IDS
+                relation_id = 1
+                while f"rId{relation_id}" in targets:
+                    relation_id += 1
+                rewritten[styles_part] = STYLES
+                rewritten[WORKBOOK_RELS_PART] = insert_children(
+                    relations,
+                    "Relationships",
+                    f'<Relationship Id="rId{relation_id}" Type="{STYLES_TYPE}"'
+                    f' Target="styles.xml"/>',
+                    1,
+                )
+                rewritten[CONTENT_TYPES_PART] = insert_children(
+                    remove_elements(
+                        content_types, "Override", "PartName", f"/{styles_part}"
+                    ),
+                    "Types",
+                    f'<Override PartName="/{styles_part}" ContentType="{STYLES_CONTENT_TYPE}"/>',
+                    1,
+                )
+
+            with zipfile.ZipFile(temp_file, "w", zipfile.ZIP_DEFLATED) as target:
+                for info in source.infolist():
+                    if info.filename in skipped:
+                        continue
+                    if info.filename in replaced:
+                        sheet_name = replaced[info.filename]
+                        write_sheet(
+                            target,
+                            info.filename,
+                            sheets[sheet_name],
+                            sheet_name in indexed,
+                            styles_ids,
+                        )
+                    elif info.filename in rewritten:
+                        target.writestr(
+                            part_info(info),
+                            rewritten.pop(info.filename).encode("utf-8"),
+                        )
+                    else:
+                        copy_part(source, target, info)
+                for part, xml in rewritten.items():
+                    target.writestr(part, xml.encode("utf-8"))
+                for sheet_name, part in new_parts.items():
+                    write_sheet(
+                        target,
+                        part,
+                        sheets[sheet_name],
+                        sheet_name in indexed,
+                        styles_ids,
+                    )
+        os.replace(temp_file, file_path)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+
+
+def replace_sheet(
+    file_path: str, sheet_name: str, data_frame: pd.DataFrame, index: bool = False
+) -> None:
+    """Write a frame into a sheet of a workbook, replacing it if it exists, without rewriting the other sheets"""
+    replace_sheets(file_path, {sheet_name: data_frame}, (sheet_name,) if index else ())
+
+
+## Elements of the sheet data, with the prefix of the main namespace if any
+ROW_RE = re.compile(r"<((?:\w+:)?)row\b([^>]*?)(?:/>|>(.*?)</\1row>)", re.S)
+CELL_RE = re.compile(r"<((?:\w+:)?)c\b([^>]*?)(?:/>|>(.*?)</\1c>)", re.S)
+REFERENCE_RE = re.compile(r"^([A-Z]+)(\d+)$")
+
+
+def cell_position(reference: str) -> tuple:
+    """Return the (row, 0-based column) of a cell reference (e.g., B2 -> (2, 1))"""
+    match = REFERENCE_RE.match(reference)
+    if match is None:
+        raise ValueError(f"Invalid cell reference: {reference}")
+    return int(match.group(2)), column_number(match.group(1))
+
+
+def attribute(attributes: str, name: str) -> Optional[str]:
+    """Return the value of an attribute of a tag, None when it does not have it"""
+    match = re.search(rf'(?<![\w:]){name}="([^"]*)"', attributes)
+    return None if match is None else match.group(1)
+
+
+def patched_cell(
+    prefix: str, reference: str, style: Optional[str], value, styles: tuple
+) -> str:
+    """Return the XML of a cell holding a value with its style, empty for a cell without value or style.
+
+    The dates take the (datetime, date, duration) styles instead of the
+    style of the cell.
+    """
+    body = value_body(value, styles)
+    if not body:
+        return f'<{prefix}c r="{reference}" s="{style}"/>' if style else ""
+    style_attribute = f' s="{style}"' if style and not body.startswith(" s=") else ""
+    xml = f'<c r="{reference}"{style_attribute}{body}'
+    if prefix:
+        xml = re.sub(r"<(/?)(\w)", rf"<\1{prefix}\2", xml)
+    return xml
+
+
+def patched_row(
+    prefix: str,
+    number: int,
+    row: Optional[re.Match],
+    changes: dict,
+    cleared: dict,
+    styles: tuple,
+) -> str:
+    """Return the XML of a row with its changed {column: value} cells and the cleared columns emptied"""
+    patched = []
+    pending = sorted(changes.items())
+    column = -1
+    cells = row.group(3) if row is not None else None
+    for cell in CELL_RE.finditer(cells or ""):
+        reference = attribute(cell.group(2), "r")
+        column = cell_position(reference)[1] if reference else column + 1
+        while pending and pending[0][0] < column:
+            new_column, value = pending.pop(0)
+            new_reference = f"{COLUMN_LETTERS[new_column]}{number}"
+            patched.append(patched_cell(prefix, new_reference, None, value, styles))
+        if pending and pending[0][0] == column:
+            value = pending.pop(0)[1]
+        elif cleared.get(column, number + 1) <= number:
+            value = None
+        elif reference is None:
+            ## Written with its reference, the new cells before it would move it
+            tag = len(cell.group(1)) + 2
+            reference = f"{COLUMN_LETTERS[column]}{number}"
+            patched.append(
+                f'{cell.group(0)[:tag]} r="{reference}"{cell.group(0)[tag:]}'
+            )
+            continue
+        else:
+            patched.append(cell.group(0))
+            continue
+        formula = re.search(rf"<{prefix}f\b[^>]*>", cell.group(3) or "")
+        reference = f"{COLUMN_LETTERS[column]}{number}"
+        if formula is not None and attribute(formula.group(0), "ref") is not None:
+            raise ValueError(
+                f"The cell {reference} holds a shared or array formula of other cells"
+            )
+        style = attribute(cell.group(2), "s")
+        patched.append(patched_cell(prefix, reference, style, value, styles))
+    for new_column, value in pending:
+        new_reference = f"{COLUMN_LETTERS[new_column]}{number}"
+        patched.append(patched_cell(prefix, new_reference, None, value, styles))
+
+    ## The spans are only a hint and would not cover the new cells
+    attributes = row.group(2) if row is not None else ""
+    attributes = re.sub(r'\s(?:r|spans)="[^"]*"', "", attributes)
+    return f'<{prefix}row r="{number}"{attributes}>{"".join(patched)}</{prefix}row>'
+
+
+def patched_sheet(xml: str, values: dict, cleared: dict, styles: tuple) -> str:
+    """Return the XML of a sheet with the {(row, column): value} cells set and the cleared columns emptied.
+
+    cleared maps columns to the first row they are emptied from. Only the rows
+    with a changed cell are written again, the rest of the XML is kept as it
+    is.
+    """
+    data = re.search(
+        r"<((?:\w+:)?)sheetData\b([^>]*?)(?:/>|>(.*?)</\1sheetData>)", xml, re.S
+    )
+    if data is None:
+        raise ValueError("The sheet has no sheetData element")
+    prefix = data.group(1)
+    changes: dict = {}
+    for (row_number, column), value in values.items():
+        changes.setdefault(row_number, {})[column] = value
+    first_cleared = min(cleared.values(), default=None)
+
+    rows = []
+    number = 0
+    for row in ROW_RE.finditer(data.group(3) or ""):
+        reference = attribute(row.group(2), "r")
+        number = int(reference) if reference else number + 1
+        for new_row in sorted(key for key in changes if key < number):
+            rows.append(
+                patched_row(prefix, new_row, None, changes.pop(new_row), {}, styles)
+            )
+        row_changes = changes.pop(number, {})
+        if row_changes or (first_cleared is not None and first_cleared <= number):
+            rows.append(patched_row(prefix, number, row, row_changes, cleared, styles))
+        elif reference is None:
+            tag = len(prefix) + 4
+            rows.append(f'{row.group(0)[:tag]} r="{number}"{row.group(0)[tag:]}')
+        else:
+            rows.append(row.group(0))
+    for new_row in sorted(changes):
+        rows.append(patched_row(prefix, new_row, None, changes[new_row], {}, styles))
+
+    sheet_data = (
+        f'<{prefix}sheetData{data.group(2)}>{"".join(rows)}</{prefix}sheetData>'
+    )
+    xml = f"{xml[: data.start()]}{sheet_data}{xml[data.end():]}"
+
+    ## The dimension covers the cells set
+    dimension = re.search(rf'<{prefix}dimension\b[^>]*\bref="([^"]*)"', xml)
+    if dimension is not None and values:
+        rows_count, columns_count = sheet_shape(dimension.group(1))
+        last_row = max([rows_count] + [row_number for row_number, _ in values])
+        last_column = max([columns_count - 1] + [column for _, column in values])
+        xml = (
+            f"{xml[: dimension.start(1)]}A1:{COLUMN_LETTERS[last_column]}{last_row}"
+            f"{xml[dimension.end(1):]}"
+        )
+    return xml
+
+
+def patch_cells(
+    file_path: str, sheet_name: str, values: dict, cleared: tuple = ()
+) -> None:
+    """Set the values of some cells of a sheet, leaving the rest of the workbook as it is.
+
+    values maps cell references (e.g., B2) to their new value, None emptying
+    the cell. Every cell of the column of a cleared reference, from its row
+    down, is emptied too unless values sets it. The cells keep their style
+    and are written as to_excel writes their values. Only the rows with a
+    changed cell are written again: the formulas, styles, headers and other
+    cells of the sheet stay byte for byte, as do the other parts of the
+    workbook. The calculation chain, if any, is left out for Excel to
+    rebuild it.
+
+    The workbook is written to a copy first, which then replaces it, so a
+    failure never leaves it half written.
+    """
+    positions = {cell_position(reference): value for reference, value in values.items()}
+    cleared_columns: dict = {}
+    for reference in cleared:
+        row_number, column = cell_position(reference)
+        cleared_columns[column] = min(
+            row_number, cleared_columns.get(column, row_number)
+        )
+
+    root, extension = os.path.splitext(file_path)
+    temp_file = f"{root}.{os.getpid()}.tmp{extension}"
+    try:
+        with zipfile.ZipFile(file_path) as source:
+            content_types = source.read(CONTENT_TYPES_PART).decode("utf-8")
+            workbook = source.read(WORKBOOK_PART).decode("utf-8")
+            relations = source.read(WORKBOOK_RELS_PART).decode("utf-8")
+
+            targets: dict = {}
+            styles_part = None
+            calc_chain = None
+            for relation in ET.fromstring(relations):
+                targets[relation.get("Id")] = part_path(relation.get("Target", ""))
+                if relation.get("Type") == STYLES_TYPE:
+                    styles_part = part_path(relation.get("Target", ""))
+                elif relation.get("Type") == CALC_CHAIN_TYPE:
+                    calc_chain = relation.get("Target")
+            part = next(
+                (
+                    targets.get(sheet.get(f"{REL_NS}id"))
+                    for sheet in ET.fromstring(workbook).iter(f"{MAIN_NS}sheet")
+                    if sheet.get("name") == sheet_name
+                ),
+                None,
+            )
+            if part is None:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+
+            rewritten: dict = {}
+            styles_ids = STYLE_IDS
+            if any(isinstance(value, (date, timedelta)) for value in values.values()):
+                if styles_part is None:
+                    raise ValueError("The workbook has no cell styles")
+                styles = source.read(styles_part).decode("utf-8")
+                updated, styles_ids = cell_styles(styles)
+                if updated != styles:
+                    rewritten[styles_part] = updated
+            rewritten[part] = patched_sheet(
+                source.read(part).decode("utf-8"),
+                positions,
+                cleared_columns,
+                styles_ids,
+            )
+            skipped = set()
+            if calc_chain is not None:
+                skipped.add(part_path(calc_chain))
+                rewritten[WORKBOOK_RELS_PART] = remove_elements(
+                    relations, "Relationship", "Target", calc_chain
+                )
+                rewritten[CONTENT_TYPES_PART] = remove_elements(
+                    content_types, "Override", "PartName", f"/{part_path(calc_chain)}"
+                )
+
+            with zipfile.ZipFile(temp_file, "w", zipfile.ZIP_DEFLATED) as target:
+                for info in source.infolist():
+                    if info.filename in skipped:
+                        continue
+                    if info.filename in rewritten:
+                        target.writestr(
+                            part_info(info), rewritten[info.filename].encode("utf-8")
+                        )
+                    else:
+                        copy_part(source, target, info)
+        os.replace(temp_file, file_path)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
@@ -0,0 +1,1253 @@
+import pandas as pd  # type: ignore
+import numpy as np  # type: ignore
+from openpyxl.styles.numbers import (  # type: ignore
+    BUILTIN_FORMATS,
+    is_date_format,
+    is_timedelta_format,
+)
+from openpyxl.cell.cell import ERROR_CODES  # type: ignore
+from openpyxl.utils.datetime import (  # type: ignore
+    CALENDAR_MAC_1904,
+    WINDOWS_EPOCH,
+    from_excel,
+    from_ISO8601,
+    to_excel,
+)
+from pandas.api.extensions import ExtensionDtype  # type: ignore
+from pandas.api.types import (  # type: ignore
+    is_bool,
+    is_float,
+    is_integer,
+    is_scalar,
+    is_string_dtype,
+    pandas_dtype,
+)
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import current_process
+from typing import Optional
+import xml.etree.ElementTree as ET
+import posixpath
+import zipfile
+import os
+import re
+
+MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+ROW_TAG = f"{MAIN_NS}row"
+CELL_TAG = f"{MAIN_NS}c"
+VALUE_TAG = f"{MAIN_NS}v"
+TEXT_TAG = f"{MAIN_NS}t"
+STRING_TAG = f"{MAIN_NS}si"
+DIMENSION_TAG = f"{MAIN_NS}dimension"
+PHONETIC_TAG = f"{MAIN_NS}rPh"
+
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+
+## Sheets whose XML is larger than this are parsed by several processes
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+PARALLEL_MAX_WORKERS = 8
+
+## Text cells the pandas parser reads as empty, its default NA values
+NA_TEXTS = frozenset(
+    {
+        "",
+        "#N/A",
+        "#N/A N/A",
+        "#NA",
+        "-1.#IND",
+        "-1.#QNAN",
+        "-NaN",
+        "-nan",
+        "1.#IND",
+        "1.#QNAN",
+        "<NA>",
+        "N/A",
+        "NA",
+        "NULL",
+        "NaN",
+        "None",
+        "n/a",
+        "nan",
+        "null",
+    }
+)
+
+## Text cells the pandas parser turns into booleans
+TRUE_TEXTS = {"True", "TRUE", "true"}
+FALSE_TEXTS = {"False", "FALSE", "false"}
+BOOLEAN_TEXTS = TRUE_TEXTS | FALSE_TEXTS
+
+## Byte order mark the pandas parser strips from the first cell
+BOM = "\ufeff"
+
+_column_numbers: dict = {}
+_text_kinds: dict = {}
+
+## Workbook opened once by every worker process of a parallel read
+_worker_workbook = None
+
+
+def is_xlsx(file_path) -> bool:
+    """Return True when the file is an Office Open XML workbook the streaming reader can parse"""
+    return (
+        isinstance(file_path, (str, os.PathLike))
+        and str(file_path).lower().endswith(XLSX_EXTENSIONS)
+        and zipfile.is_zipfile(file_path)
+    )
+
+
+def parse_number(text: str):
+    """Return the int or float stored in the text of a numeric cell, like openpyxl reads it"""
+    return float(text) if "." in text or "e" in text.lower() else int(text)
+
+
+def column_number(letters: str) -> int:
+    """Return the 0-based position of an Excel column name (A -> 0, AA -> 26)"""
+    if letters not in _column_numbers:
+        number = 0
+        for letter in letters:
+            number = number * 26 + ord(letter) - 64
+        _column_numbers[letters] = number - 1
+    return _column_numbers[letters]
+
+
+class DateRange:
+    """Row filter keeping the rows whose date column falls between start and end.
+
+    inclusive works as in Series.between ("both", "neither", "left" or
+    "right"). Text cells are parsed with date_format, as pd.to_datetime does
+    before the comparison; without it comparing them with a date raises the
+    TypeError pandas raises. Empty and NA cells never match.
+    """
+
+    def __init__(
+        self,
+        column: int,
+        start,
+        end,
+        inclusive: str = "both",
+        date_format: Optional[str] = None,
+    ):
+        self.column = column
+        self.start = pd.Timestamp(start)
+        self.end = pd.Timestamp(end)
+        self.inclusive = inclusive
+        self.date_format = date_format
+
+    def contains(self, value) -> bool:
+        """Method to know if a cell value falls in the range"""
+        if isinstance(value, str):
+            if value in NA_TEXTS:
+                return False
+            if self.date_format is not None:
+                value = datetime.strptime(value, self.date_format)
+        elif value is None or pd.isna(value):
+            return False
+        if self.inclusive in ("both", "left"):
+            after = value >= self.start
+        else:
+            after = value > self.start
+        if self.inclusive in ("both", "right"):
+            before = value <= self.end
+        else:
+            before = value < self.end
+        return bool(after and before)
+
+    def mask(self, values: pd.Series) -> np.ndarray:
+        """Method to return which values of a typed column fall in the range"""
+        if values.dtype.kind == "M":
+            return values.between(
+                self.start, self.end, inclusive=self.inclusive
+            ).to_numpy()
+        return np.array([self.contains(value) for value in values], dtype=bool)
+
+
+def sample_kind(value) -> str:
+    """Return the kind of a cell value that decides the dtype the pandas parser gives its column"""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "nan" if value != value else "float"
+    if not isinstance(value, str):
+        return type(value).__name__
+    if value not in _text_kinds:
+        _text_kinds[value] = text_kind(value)
+    return _text_kinds[value]
+
+
+def text_kind(text: str) -> str:
+    """Return the kind of a text cell: NA, boolean, integer, float or plain text"""
+    if text in NA_TEXTS:
+        return "na text"
+    if text in BOOLEAN_TEXTS:
+        return "bool text"
+    try:
+        int(text)
+        return "int text"
+    except ValueError:
+        pass
+    try:
+        float(text)
+        return "float text"
+    except ValueError:
+        return "text"
+
+
+def add_sample(samples: dict, value) -> None:
+    """Keep a value in the samples of a column: one per kind, the lowest and highest integers"""
+    kind = sample_kind(value)
+    if kind != "int" and kind != "int text":
+        if kind not in samples:
+            samples[kind] = value
+        return
+    low, high = (kind, "min"), (kind, "max")
+    if low not in samples or int(value) < int(samples[low]):
+        samples[low] = value
+    if high not in samples or int(value) > int(samples[high]):
+        samples[high] = value
+
+
+class XlsxWorkbook:
+    """Workbook parts needed to stream a sheet: sheet paths, shared strings and date styles"""
+
+    def __init__(self, archive: zipfile.ZipFile):
+        self.archive = archive
+        self.epoch = WINDOWS_EPOCH
+        self.sheets: dict = {}
+        self.shared_strings: list = []
+        self.date_styles: set = set()
+        self.timedelta_styles: set = set()
+
+        relations = self.read_relations("xl/_rels/workbook.xml.rels")
+        workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+        properties = workbook.find(f"{MAIN_NS}workbookPr")
+        if properties is not None and properties.get("date1904") in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+        for sheet in workbook.iter(f"{MAIN_NS}sheet"):
+            target = relations.get(sheet.get(f"{REL_NS}id"))
+            self.sheets[sheet.get("name")] = target
+
+        for target in relations.values():
+            if target.endswith("sharedStrings.xml") and target in archive.namelist():
+                self.shared_strings = self.read_shared_strings(target)
+            elif target.endswith("styles.xml") and target in archive.namelist():
+                self.read_styles(target)
+
+    def read_relations(self, path: str) -> dict:
+        """Method to map the relationship ids of the workbook to archive paths"""
+        relations: dict = {}
+        if path not in self.archive.namelist():
+            return relations
+        for relation in ET.fromstring(self.archive.read(path)):
+            target = relation.get("Target", "")
+            if target.startswith("/"):
+                target = target[1:]
+            else:
+                target = posixpath.normpath(posixpath.join("xl", target))
+            relations[relation.get("Id")] = target
+        return relations
+
+    def read_shared_strings(self, path: str) -> list:
+        """Method to read the shared strings table"""
+        handler = SharedStringsHandler()
+        with self.archive.open(path) as source:
+            feed(source, handler)
+        return handler.strings
+
+    def read_styles(self, path: str) -> None:
+        """Method to index the cell styles whose number format is a date or a duration"""
+        styles = ET.fromstring(self.archive.read(path))
+        custom_formats = {
+            int(number_format.get("numFmtId")): number_format.get("formatCode")
+            for number_format in styles.iter(f"{MAIN_NS}numFmt")
+        }
+        cell_styles = styles.find(f"{MAIN_NS}cellXfs")
+        if cell_styles is None:
+            return
+        for style_id, style in enumerate(cell_styles.iterfind(f"{MAIN_NS}xf")):
+            format_id = int(style.get("numFmtId", 0))
+            code = custom_formats.get(format_id, BUILTIN_FORMATS.get(format_id))
+            if is_date_format(code):
+                self.date_styles.add(style_id)
+            if is_timedelta_format(code):
+                self.timedelta_styles.add(style_id)
+
+    def sheet_path(self, sheet_name) -> str:
+        """Method to return the archive path of a sheet given by name or position"""
+        if isinstance(sheet_name, int):
+            names = list(self.sheets)
+            if not 0 <= sheet_name < len(names):
+                raise ValueError(
+                    f"Worksheet index {sheet_name} is invalid, {len(names)} worksheets found"
+                )
+            sheet_name = names[sheet_name]
+        if sheet_name not in self.sheets:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return self.sheets[sheet_name]
+
+    def cell_value(self, data_type: str, style_id: int, value: Optional[str]):
+        """Method to convert a cell to the value pd.read_excel gets from openpyxl"""
+        if data_type == "inlineStr":
+            return value or ""
+        if not value:
+            return ""
+        if data_type == "n":
+            number = parse_number(value)
+            if style_id in self.date_styles:
+                try:
+                    return from_excel(
+                        number, self.epoch, timedelta=style_id in self.timedelta_styles
+                    )
+                except (OverflowError, ValueError):
+                    return np.nan
+            ## Integral floats are returned as int, like pandas does with openpyxl
+            return int(number) if int(number) == number else number
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "str":
+            return value
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "e":
+            return np.nan
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value
+
+    def is_empty(self, data_type: str, value: Optional[str]) -> bool:
+        """Method to know if a cell would be read as an empty value, without converting it"""
+        if not value:
+            return True
+        return data_type == "s" and self.shared_strings[int(value)] == ""
+
+
+class SharedStringsHandler:
+    """XMLParser target collecting the shared strings, phonetic runs excluded"""
+
+    def __init__(self):
+        self.strings: list = []
+        self.parts: list = []
+        self.in_text = False
+        self.in_phonetic = False
+
+    def start(self, tag: str, attrib: dict) -> None:
+        if tag == TEXT_TAG:
+            self.in_text = not self.in_phonetic
+        elif tag == STRING_TAG:
+            self.parts = []
+        elif tag == PHONETIC_TAG:
+            self.in_phonetic = True
+
+    def data(self, text: str) -> None:
+        if self.in_text:
+            self.parts.append(text)
+
+    def end(self, tag: str) -> None:
+        if tag == TEXT_TAG:
+            self.in_text = False
+        elif tag == STRING_TAG:
+            self.strings.append("".join(self.parts).replace("x005F_", ""))
+        elif tag == PHONETIC_TAG:
+            self.in_phonetic = False
+
+    def close(self) -> None:
+        pass
+
+
+class SheetHandler:
+    """XMLParser target decoding the cells of a sheet into preallocated column buffers.
+
+    Only the usecols positions are decoded and stored ("" for empty cells,
+    like openpyxl cells read by pandas); the other cells are only checked
+    for content, to know the sheet width and its last row with data.
+    The buffers start at the row numbered offset (0-based, 1 is the first
+    row after the header), so a row range of a sheet can be parsed alone.
+    Rows are numbered from the header_row of the sheet (0-based), the ones
+    above it only counting for the width, as with pd.read_excel(header=...).
+
+    With a date_range only the rows in the range stay in the buffers, one
+    after the other, and their row numbers are kept as the frame index. Of
+    the dropped rows only a sample of every kind of value of each column is
+    kept (see add_sample), enough to type the columns as the whole sheet,
+    and the first row, whose values the pandas parser looks at on its own.
+    """
+
+    def __init__(
+        self,
+        workbook: XlsxWorkbook,
+        usecols: Optional[list],
+        nrows: Optional[int],
+        offset: int = 1,
+        date_range: Optional[DateRange] = None,
+        header_row: int = 0,
+    ):
+        self.workbook = workbook
+        self.nrows = nrows
+        self.header_row = header_row
+        self.offset = offset
+        self.date_range = date_range
+        self.targets: Optional[dict] = None
+        if usecols is not None:
+            self.targets = {p: i for i, p in enumerate(sorted(set(usecols)))}
+        self.columns: list = []
+        self.header: list = []
+        self.width = 0
+        self.size = 0
+        self.done = False
+
+        ## Rows kept by the date range and what is left of the dropped ones
+        self.index: list = []
+        self.samples: list = []
+        self.empty_from: list = []
+        self.dropped: Optional[int] = None
+        self.head: Optional[list] = None
+        self.date_value = ""
+        self.last_row = offset - 1
+        self.add_columns(len(self.targets or ()), 0)
+
+        self.row_number = -1 - header_row
+        self.column = -1
+        self.data_type = "n"
+        self.style_id = 0
+        self.parts: list = []
+        self.in_value = False
+        self.in_phonetic = False
+
+    def new_column(self, length: int) -> np.ndarray:
+        """Method to create an empty column buffer"""
+        return np.full(length, "", dtype=object)
+
+    def add_columns(self, count: int, rows: int) -> None:
+        """Method to add empty column buffers, empty as well in the rows dropped so far"""
+        self.columns += [self.new_column(rows) for _ in range(count)]
+        self.samples += [{} for _ in range(count)]
+        self.empty_from += [self.dropped] * count
+
+    def reserve(self, rows: int) -> None:
+        """Method to make every column buffer hold at least the given rows, doubling them"""
+        for position, column in enumerate(self.columns):
+            if len(column) < rows:
+                grown = self.new_column(max(rows, len(column) * 2))
+                grown[: len(column)] = column
+                self.columns[position] = grown
+
+    def slot(self) -> int:
+        """Method to return the buffer position of the current row"""
+        if self.date_range is None:
+            return self.row_number - self.offset
+        return len(self.index)
+
+    def start(self, tag: str, attrib: dict) -> None:
+        if self.done:
+            return
+        if tag == CELL_TAG:
+            reference = attrib.get("r")
+            if reference:
+                self.column = column_number(reference.rstrip("0123456789"))
+            else:
+                self.column += 1
+            self.data_type = attrib.get("t", "n")
+            style = attrib.get("s")
+            self.style_id = int(style) if style else 0
+            self.parts = []
+        elif tag == VALUE_TAG or tag == TEXT_TAG:
+            self.in_value = not self.in_phonetic
+        elif tag == ROW_TAG:
+            number = attrib.get("r")
+            if number:
+                self.row_number = int(number) - 1 - self.header_row
+            else:
+                self.row_number += 1
+            self.column = -1
+            if self.nrows is not None and self.row_number > self.nrows:
+                self.done = True
+            elif self.row_number > 0:
+                if self.date_range is not None:
+                    self.date_value = ""
+                    if self.row_number > self.last_row + 1:
+                        self.drop_blank(self.last_row + 1)
+                self.reserve(self.slot() + 1)
+            self.last_row = self.row_number
+        elif tag == PHONETIC_TAG:
+            self.in_phonetic = True
+        elif tag == DIMENSION_TAG:
+            rows, columns = sheet_shape(attrib.get("ref"))
+            if self.targets is None:
+                self.columns, self.samples, self.empty_from = [], [], []
+                self.add_columns(columns, 0)
+            if self.date_range is None:
+                self.reserve(rows - 1)
+
+    def data(self, text: str) -> None:
+        if self.in_value:
+            self.parts.append(text)
+
+    def end(self, tag: str) -> None:
+        if self.done:
+            return
+        if tag == VALUE_TAG or tag == TEXT_TAG:
+            self.in_value = False
+        elif tag == CELL_TAG:
+            self.end_cell()
+        elif tag == ROW_TAG and self.row_number == 0:
+            while self.header and self.header[-1] == "":
+                self.header.pop()
+            self.width = max(self.width, len(self.header))
+        elif tag == ROW_TAG and self.row_number > 0 and self.date_range is not None:
+            self.end_row()
+        elif tag == PHONETIC_TAG:
+            self.in_phonetic = False
+
+    def end_cell(self) -> None:
+        """Method to store the cell that has just been parsed"""
+        column = self.column
+        text = "".join(self.parts) if self.parts else None
+        if self.row_number == 0:
+            value = self.workbook.cell_value(self.data_type, self.style_id, text)
+            self.header += [""] * (column - len(self.header)) + [value]
+            return
+        if self.row_number < 0:
+            if not self.workbook.is_empty(self.data_type, text):
+                self.width = max(self.width, column + 1)
+            return
+        if self.date_range is not None and column == self.date_range.column:
+            self.date_value = self.workbook.cell_value(
+                self.data_type, self.style_id, text
+            )
+
+        if self.targets is None:
+            if column >= len(self.columns):
+                rows = len(self.columns[0]) if self.columns else self.slot() + 1
+                self.add_columns(column + 1 - len(self.columns), rows)
+            target = column
+        else:
+            target = self.targets.get(column)
+
+        if target is None:
+            is_empty = self.workbook.is_empty(self.data_type, text)
+        else:
+            value = self.workbook.cell_value(self.data_type, self.style_id, text)
+            self.columns[target][self.slot()] = value
+            is_empty = isinstance(value, str) and value == ""
+        if not is_empty:
+            self.size = self.row_number
+            self.width = max(self.width, column + 1)
+
+    def end_row(self) -> None:
+        """Method to keep the row just parsed if it is in the date range, or to drop it"""
+        if self.date_range.contains(self.date_value):
+            self.index.append(self.row_number - 1)
+            return
+        slot = len(self.index)
+        if self.row_number == 1:
+            self.head = [column[slot] for column in self.columns]
+        for target, column in enumerate(self.columns):
+            value = column[slot]
+            if isinstance(value, str) and value == "":
+                if self.empty_from[target] is None:
+                    self.empty_from[target] = self.row_number
+            else:
+                add_sample(self.samples[target], value)
+                column[slot] = ""
+        if self.dropped is None:
+            self.dropped = self.row_number
+
+    def drop_blank(self, row_number: int) -> None:
+        """Method to drop the rows missing from the XML from the given one, all empty"""
+        self.empty_from = [
+            row_number if first is None else first for first in self.empty_from
+        ]
+        if self.dropped is None:
+            self.dropped = row_number
+        if row_number == 1:
+            self.head = []
+
+    def selection(self) -> Optional[tuple]:
+        """Method to return what the date range left of the rows, None without it.
+
+        That is (index, samples, empty_from, dropped, head, last_row): the
+        index of the kept rows, the samples and the first row where each
+        column was empty among the dropped ones, the first dropped row, the
+        first row when it was dropped and the last row of the XML.
+        """
+        if self.date_range is None:
+            return None
+        return (
+            self.index,
+            self.samples,
+            self.empty_from,
+            self.dropped,
+            self.head,
+            self.last_row,
+        )
+
+    def close(self) -> None:
+        pass
+
+
+def feed(source, handler, chunk_size: int = 1024 * 1024) -> None:
+    """Stream an XML part through a parser target, stopping once the target is done"""
+    parser = ET.XMLParser(target=handler)
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        parser.feed(chunk)
+        if getattr(handler, "done", False):
+            return
+    parser.close()
+
+
+def header_names(header: list) -> list:
+    """Return the labels pandas gives to a header row.
+
+    Empty cells become "Unnamed: n" and duplicates are renamed as "X.1",
+    "X.2", skipping names already in the header; named columns are renamed
+    before the unnamed ones, as the pandas python parser does.
+    """
+    names = [
+        f"Unnamed: {position}" if name == "" else name
+        for position, name in enumerate(header)
+    ]
+    unnamed = [position for position, name in enumerate(header) if name == ""]
+    named = [position for position in range(len(names)) if position not in unnamed]
+    counts: dict = defaultdict(int)
+    for position in named + unnamed:
+        name = original = names[position]
+        count = counts[name]
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts[name]
+        names[position] = name
+        counts[name] = count + 1
+    return names
+
+
+def sheet_shape(dimension: Optional[str]) -> tuple:
+    """Return the (rows, columns) announced by the <dimension> of a sheet, (0, 0) if unknown"""
+    match = re.search(r"([A-Z]+)(\d+)$", dimension or "")
+    if not match:
+        return 0, 0
+    return int(match.group(2)), column_number(match.group(1)) + 1
+
+
+def split_sheet(xml: bytes, parts: int) -> Optional[tuple]:
+    """Split the rows of a sheet XML in ranges that can be parsed on their own.
+
+    Returns (prefix, suffix, chunks): every chunk is an (offset, xml) pair
+    holding a run of whole <row> elements, offset being the 0-based number of
+    its first row (1 for the first chunk), and prefix + xml + suffix is a
+    valid sheet holding only those rows. Returns None when the sheet cannot
+    be split.
+    """
+    root = re.search(rb"<((?:\w+:)?)worksheet\b[^>]*>", xml)
+    if root is None:
+        return None
+    namespace = re.escape(root.group(1))
+    sheet_data = re.compile(rb"<" + namespace + rb"sheetData\b[^>]*>")
+    start = sheet_data.search(xml, root.end())
+    if start is None or xml[start.end() - 2 : start.end()] == b"/>":
+        return None
+    end = xml.rfind(b"</" + root.group(1) + b"sheetData>")
+    if end < start.end():
+        return None
+
+    ## Rows are cut where a <row> starts; every range must know its row number
+    row_tag = re.compile(rb"<" + namespace + rb"row\b[^>]*?\sr=\"(\d+)\"")
+    boundaries = [start.end()]
+    step = (end - start.end()) // parts
+    for part in range(1, parts):
+        row = row_tag.search(xml, max(boundaries[-1] + 1, start.end() + part * step))
+        if row is None or row.start() >= end:
+            break
+        boundaries.append(row.start())
+    boundaries.append(end)
+    prefix = root.group(0) + start.group(0)
+    suffix = b"</" + root.group(1) + b"sheetData></" + root.group(1) + b"worksheet>"
+    chunks = [
+        (
+            1 if position == 0 else int(row_tag.match(xml, begin).group(1)) - 1,
+            xml[begin:finish],
+        )
+        for position, (begin, finish) in enumerate(zip(boundaries, boundaries[1:]))
+    ]
+    return prefix, suffix, chunks
+
+
+def open_worker_workbook(file_path: str) -> None:
+    """Initializer of the worker processes: read the shared strings and styles once"""
+    global _worker_workbook
+    with zipfile.ZipFile(file_path) as archive:
+        _worker_workbook = XlsxWorkbook(archive)
+
+
+def parse_rows(
+    prefix: bytes,
+    suffix: bytes,
+    chunk: tuple,
+    usecols: Optional[list],
+    date_range: Optional[DateRange] = None,
+    header: int = 0,
+) -> tuple:
+    """Parse a row range of a sheet in a worker process.
+
+    Returns (offset, header, width, size, columns, selection), with size the
+    last row with data (0-based), the columns cut to the rows of the range
+    (to the kept ones with a date_range) and selection as in SheetHandler.
+    """
+    offset, xml = chunk
+    handler = SheetHandler(_worker_workbook, usecols, None, offset, date_range, header)
+    parser = ET.XMLParser(target=handler)
+    for part in (prefix, xml, suffix):
+        parser.feed(part)
+    parser.close()
+    if date_range is None:
+        rows = max(handler.size - offset + 1, 0)
+    else:
+        rows = len(handler.index)
+    columns = [column[:rows] for column in handler.columns]
+    return (
+        offset,
+        handler.header,
+        handler.width,
+        handler.size,
+        columns,
+        handler.selection(),
+    )
+
+
+def parse_in_workers(
+    file_path: str,
+    tasks: list,
+    usecols: Optional[list],
+    workers: int,
+    date_range: Optional[DateRange] = None,
+    header: int = 0,
+) -> Optional[list]:
+    """Run parse_rows on every (prefix, suffix, chunk) task in worker processes.
+
+    Returns the results in the order of the tasks, or None when the worker
+    processes cannot be started (the caller then parses in-process).
+    """
+    try:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            initializer=open_worker_workbook,
+            initargs=(file_path,),
+        ) as executor:
+            return list(
+                executor.map(
+                    parse_rows,
+                    [prefix for prefix, _, _ in tasks],
+                    [suffix for _, suffix, _ in tasks],
+                    [chunk for _, _, chunk in tasks],
+                    [usecols] * len(tasks),
+                    [date_range] * len(tasks),
+                    [header] * len(tasks),
+                )
+            )
+    except (OSError, RuntimeError):
+        return None  # No worker processes here (e.g. a broken pool)
+
+
+def merge_selections(parts: list, count: int) -> tuple:
+    """Join the (offset, selection) of consecutive row ranges of a sheet into one selection"""
+    index: list = []
+    samples: list = [{} for _ in range(count)]
+    empty_from: list = [None] * count
+    dropped = head = last_row = None
+    for offset, selection in parts:
+        part_index, part_samples, part_empty_from, part_dropped, part_head, _ = (
+            selection
+        )
+        ## Rows missing from the XML between two ranges are dropped empty rows
+        if last_row is not None and offset > max(last_row, 0) + 1:
+            empty_from = [
+                last_row + 1 if first is None else first for first in empty_from
+            ]
+            dropped = last_row + 1 if dropped is None else dropped
+        index += part_index
+        for target in range(count):
+            if target < len(part_samples):
+                for value in part_samples[target].values():
+                    add_sample(samples[target], value)
+                first = part_empty_from[target]
+            else:
+                first = part_dropped
+            if empty_from[target] is None:
+                empty_from[target] = first
+        if dropped is None:
+            dropped = part_dropped
+        if head is None:
+            head = part_head
+        last_row = selection[5]
+    return index, samples, empty_from, dropped, head, last_row
+
+
+def read_rows_parallel(
+    file_path: str,
+    xml: bytes,
+    usecols: Optional[list],
+    workers: int,
+    date_range: Optional[DateRange] = None,
+    header: int = 0,
+) -> Optional[tuple]:
+    """Parse the rows of a sheet XML in worker processes, each one a row range.
+
+    Returns (header, width, size, columns, selection) like a SheetHandler fed
+    with the whole sheet, the ranges put back at their original row numbers
+    (one after the other with a date_range); None when the sheet cannot be
+    split or the worker processes cannot be started.
+    """
+    split = split_sheet(xml, workers)
+    if split is None or len(split[2]) < 2:
+        return None
+    prefix, suffix, chunks = split
+    ## Offsets count from the header row; ranges above it start at the first row
+    chunks = [(max(offset - header, 1), chunk) for offset, chunk in chunks]
+    results = parse_in_workers(
+        file_path,
+        [(prefix, suffix, chunk) for chunk in chunks],
+        usecols,
+        workers,
+        date_range,
+        header,
+    )
+    if results is None:
+        return None
+
+    header = next((result[1] for result in results if result[1]), [])
+    width = max(result[2] for result in results)
+    size = max(result[3] for result in results)
+    count = width if usecols is None else len(set(usecols))
+    selection = None
+    if date_range is not None:
+        selection = merge_selections(
+            [(result[0], result[5]) for result in results], count
+        )
+    rows = size if selection is None else len(selection[0])
+    columns = [np.full(rows, "", dtype=object) for _ in range(count)]
+    start = 0
+    for offset, _, _, _, parts, part_selection in results:
+        if part_selection is None:
+            start = offset - 1
+        for position, part in enumerate(parts[:count]):
+            columns[position][start : start + len(part)] = part
+        if part_selection is not None:
+            start += len(part_selection[0])
+    return header, width, size, columns, selection
+
+
+def parse_sheet(
+    workbook: XlsxWorkbook,
+    path: str,
+    usecols: Optional[list],
+    nrows: Optional[int],
+    date_range: Optional[DateRange] = None,
+    header: int = 0,
+) -> tuple:
+    """Parse a sheet in-process, returning (header, width, size, columns, selection)"""
+    handler = SheetHandler(
+        workbook, usecols, nrows, date_range=date_range, header_row=header
+    )
+    with workbook.archive.open(path) as source:
+        feed(source, handler)
+    return (
+        handler.header,
+        handler.width,
+        handler.size,
+        handler.columns,
+        handler.selection(),
+    )
+
+
+def header_positions(
+    workbook: XlsxWorkbook, path: str, names: list, header: int = 0
+) -> list:
+    """Return the positions of the columns labeled with the given names.
+
+    Only the sheet rows down to the header are parsed. The labels are the
+    ones pandas gives to the header row (see header_names); missing names
+    raise the ValueError of pd.read_excel.
+    """
+    handler = SheetHandler(workbook, [], 0, header_row=header)
+    with workbook.archive.open(path) as source:
+        feed(source, handler)
+    labels = header_names(handler.header)
+    ## Columns past the last label are the unnamed ones pandas adds up to the width
+    width = max(
+        [len(labels)]
+        + [int(name[9:]) + 1 for name in names if re.fullmatch(r"Unnamed: \d+", name)]
+    )
+    labels += [f"Unnamed: {position}" for position in range(len(labels), width)]
+    missing = [name for name in names if name not in labels]
+    if missing:
+        raise ValueError(
+            f"Usecols do not match columns, columns expected but not found: {missing}"
+        )
+    return [labels.index(name) for name in names]
+
+
+def default_workers() -> int:
+    """Return the worker processes a read uses: one per CPU, none inside a worker process"""
+    if current_process().daemon:
+        return 1  # Worker processes cannot start their own
+    return min(os.cpu_count() or 1, PARALLEL_MAX_WORKERS)
+
+
+def sample_rows(selection: tuple, size: int, count: int) -> list:
+    """Return rows holding the samples of the dropped rows, one column after the other.
+
+    A column gets an empty sample when it was empty in a dropped row before
+    the last row with data, the ones after it not being part of the frame.
+    Shorter columns repeat their first sample, which does not change their dtype.
+    """
+    _, samples, empty_from, dropped, _, _ = selection
+    values: list = []
+    for target in range(count):
+        column = list(samples[target].values()) if target < len(samples) else []
+        first = empty_from[target] if target < len(empty_from) else dropped
+        if first is not None and first <= size:
+            column.append("")
+        values.append(column)
+    height = max((len(column) for column in values), default=0)
+    padded = [column + column[:1] * (height - len(column)) for column in values]
+    return [list(row) for row in zip(*padded)] if height else []
+
+
+def is_missing(value) -> bool:
+    """Method to tell whether a cell value is read as NaN by the pandas parser"""
+    return value is None or (is_float(value) and value != value)
+
+
+def parsed_booleans(values: np.ndarray) -> np.ndarray:
+    """Return a column as booleans when it only holds booleans, their texts and empty cells.
+
+    Like the pandas parser, the empty cells keep the column as objects, and
+    any other value leaves it as it is.
+    """
+    flags = np.zeros(len(values), dtype=bool)
+    missing = np.zeros(len(values), dtype=bool)
+    for position, value in enumerate(values):
+        if is_bool(value):
+            flags[position] = value
+        elif is_missing(value):
+            missing[position] = True
+        elif isinstance(value, str) and value in TRUE_TEXTS:
+            flags[position] = True
+        elif not (isinstance(value, str) and value in FALSE_TEXTS):
+            return values
+    if not missing.any():
+        return flags
+    result = flags.astype(object)
+    result[missing] = np.nan
+    return result
+
+
+def sanitize_column(values: np.ndarray) -> None:
+    """Method to turn the NA texts of a column into NaN, as the pandas parser does.
+
+    Equal cells share the first one of them, so a True after a 1 reads as 1.
+    """
+    seen: dict = {}
+    for position, value in enumerate(values):
+        if isinstance(value, str) and value in NA_TEXTS:
+            values[position] = np.nan
+        else:
+            values[position] = seen.setdefault(value, value)
+
+
+def typed_column(values: np.ndarray, name: str, dtype):
+    """Type a column of parsed cells the way the pandas parser of pd.read_excel does.
+
+    The column is tried as numbers and as booleans, unless it is read with an
+    extension or string dtype, and is cast to the requested dtype at last.
+    """
+    cast = None if dtype is None else pandas_dtype(dtype)
+    is_extension = isinstance(cast, ExtensionDtype)
+    values = values.copy()
+    if cast is None or not (is_extension or is_string_dtype(cast)):
+        numbers = values.copy()
+        for position, value in enumerate(numbers):
+            if isinstance(value, str) and value in NA_TEXTS:
+                numbers[position] = np.nan
+        try:
+            result = pd.to_numeric(numbers)
+        except (ValueError, TypeError):
+            sanitize_column(values)
+            result = values
+        ## Like the pandas parser, booleans are looked for in the cells read
+        if result.dtype == object and (
+            len(result) == 0 or not isinstance(result[0], int)
+        ):
+            result = parsed_booleans(values)
+        values = result
+    else:
+        sanitize_column(values)
+    if cast is None or (values.dtype == cast and not is_extension):
+        return values
+    if not is_extension and cast == np.bool_ and pd.isna(values).any():
+        raise ValueError(f"Bool column has NA values in column {name}")
+    if is_extension:
+        strings = values
+        options = {}
+        if isinstance(cast, pd.BooleanDtype):
+            strings = [str(value) for value in values]
+            options = {"none_values": list(NA_TEXTS)}
+        return cast.construct_array_type()._from_sequence_of_strings(
+            strings, dtype=cast, **options
+        )
+    if cast.type is np.str_:
+        return np.array(
+            [value if is_missing(value) else str(value) for value in values],
+            dtype=object,
+        )
+    try:
+        return values.astype(cast)
+    except ValueError as e:
+        raise ValueError(f"Unable to convert column {name} to type {cast}") from e
+
+
+def build_frame(parsed: tuple, usecols: Optional[list], dtype) -> pd.DataFrame:
+    """Type the parsed cells of a sheet like the pandas parser of pd.read_excel does.
+
+    The rows of a date range selection are typed together with the samples of
+    the dropped rows, after the first row of the sheet when it was dropped;
+    those are taken out afterwards, so every column gets the dtype and the
+    values it has when the whole sheet is read.
+    """
+    header, width, size, columns, selection = parsed
+    if not header and not size:
+        return pd.DataFrame()
+    rows_count = size if selection is None else len(selection[0])
+    header = header + [""] * (width - len(header))
+    names = header_names(header)
+    if usecols is None:
+        positions = list(range(width))
+        columns = columns[:width]
+        columns += [
+            np.full(rows_count, "", dtype=object) for _ in range(width - len(columns))
+        ]
+    else:
+        positions = sorted(set(usecols))
+        missing = [position for position in positions if position >= width]
+        if missing:
+            raise ValueError(
+                "Defining usecols with out-of-bounds indices is not allowed. "
+                f"{missing} are out-of-bounds."
+            )
+
+    rows = np.empty((rows_count, len(positions)), dtype=object)
+    for position, column in enumerate(columns):
+        rows[:, position] = column[:rows_count]
+    rows = rows.tolist()
+    leading = 0
+    if selection is not None:
+        head = selection[4]
+        if head is not None and size > 0:
+            head = head + [""] * (len(positions) - len(head))
+            rows.insert(0, head[: len(positions)])
+            leading = 1
+        rows += sample_rows(selection, size, len(positions))
+
+    names = [names[position] for position in positions]
+    if rows:
+        cells = np.empty((len(rows), len(positions)), dtype=object)
+        cells[:] = rows
+        first = cells[0, 0] if len(positions) else None
+        if isinstance(first, str) and first.startswith(BOM):
+            cells[0, 0] = first[1:]
+        cast = None if dtype is None else pandas_dtype(dtype)
+        data = {}
+        for position, name in enumerate(names):
+            values = typed_column(cells[:, position], name, dtype)
+            if cast in (np.str_, np.object_):
+                values = pd.Series(values, dtype=cast)
+            data[name] = values
+        data_frame = pd.DataFrame(data, columns=names, index=pd.RangeIndex(len(rows)))
+    else:
+        ## Without rows the pandas parser only casts its empty object columns
+        data_frame = pd.DataFrame(columns=names, index=pd.RangeIndex(0), dtype=object)
+        if dtype is not None:
+            data_frame = data_frame.astype(dtype)
+    if selection is not None:
+        data_frame = data_frame.iloc[leading : leading + rows_count]
+        positions = np.asarray(selection[0], dtype=np.int64)
+        data_frame.index = pd.RangeIndex(size).take(positions)
+    return data_frame
+
+
+def read_xlsx(
+    file_path: str,
+    sheet_name=0,
+    usecols: Optional[list] = None,
+    nrows: Optional[int] = None,
+    dtype=None,
+    workers: Optional[int] = None,
+    date_range: Optional[DateRange] = None,
+    header: int = 0,
+) -> pd.DataFrame:
+    """Read a sheet streaming its XML, returning the same frame as pd.read_excel.
+
+    Cells are decoded straight from the sheet XML into a preallocated object
+    buffer holding only the usecols positions, without building openpyxl cell
+    objects. The buffer is then typed by the pandas parser, so NA values,
+    numeric and boolean columns end up exactly as with engine="openpyxl".
+
+    Sheets larger than PARALLEL_MIN_BYTES are split in row ranges parsed by
+    up to workers processes (one per CPU by default, 1 to disable it); the
+    rows keep their position, so row.name + 2 is still their Excel row.
+
+    With a date_range the rows out of it are dropped while the sheet is
+    streamed; the result is the whole sheet frame filtered by the range.
+
+    header is the sheet row (0-based) holding the column labels, the rows
+    above it being skipped, and usecols can name columns by their labels,
+    as in pd.read_excel.
+    """
+    if workers is None:
+        workers = default_workers()
+    with zipfile.ZipFile(file_path) as archive:
+        workbook = XlsxWorkbook(archive)
+        path = workbook.sheet_path(sheet_name)
+        if usecols is not None and all(isinstance(name, str) for name in usecols):
+            usecols = header_positions(workbook, path, usecols, header)
+        parsed = None
+        if (
+            workers > 1
+            and nrows is None
+            and archive.getinfo(path).file_size >= PARALLEL_MIN_BYTES
+        ):
+            parsed = read_rows_parallel(
+                file_path, archive.read(path), usecols, workers, date_range, header
+            )
+        if parsed is None:
+            parsed = parse_sheet(workbook, path, usecols, nrows, date_range, header)
+    return build_frame(parsed, usecols, dtype)
+
+
+def read_xlsx_sheets(
+    file_path: str,
+    sheet_names: list,
+    usecols: Optional[list] = None,
+    nrows: Optional[int] = None,
+    dtype=None,
+    workers: Optional[int] = None,
+    date_range: Optional[DateRange] = None,
+) -> dict:
+    """Read several sheets of a workbook, returning {sheet_name: frame} like pd.read_excel.
+
+    The archive is opened and its shared strings and styles are decoded once
+    for all the sheets. When they add up to more than PARALLEL_MIN_BYTES the
+    sheets are parsed at the same time by up to workers processes. A
+    date_range filters every sheet as in read_xlsx.
+    """
+    if workers is None:
+        workers = default_workers()
+    with zipfile.ZipFile(file_path) as archive:
+        workbook = XlsxWorkbook(archive)
+        paths = {
+            sheet_name: workbook.sheet_path(sheet_name) for sheet_name in sheet_names
+        }
+        size = sum(archive.getinfo(path).file_size for path in paths.values())
+        results = None
+        if (
+            workers > 1
+            and nrows is None
+            and len(paths) > 1
+            and size >= PARALLEL_MIN_BYTES
+        ):
+            tasks = [(b"", b"", (1, archive.read(path))) for path in paths.values()]
+            results = parse_in_workers(file_path, tasks, usecols, workers, date_range)
+        if results is None:
+            parsed = {
+                sheet_name: parse_sheet(workbook, path, usecols, nrows, date_range)
+                for sheet_name, path in paths.items()
+            }
+        else:
+            parsed = {
+                sheet_name: result[1:] for sheet_name, result in zip(paths, results)
+            }
+    return {
+        sheet_name: build_frame(parsed[sheet_name], usecols, dtype)
+        for sheet_name in paths
+    }
+
+
+def written_number(number):
+    """Return the number pd.read_excel gets back for a number openpyxl wrote ("%.16g")"""
+    number = parse_number("%.16g" % number)
+    return int(number) if int(number) == number else number
+
+
+def written_value(value):
+    """Return the cell value pd.read_excel gets back for a value written by DataFrame.to_excel"""
+    ## What pandas hands to openpyxl (ExcelFormatter and ExcelWriter._value_with_fmt)
+    if is_scalar(value) and pd.isna(value):
+        return ""
+    if is_bool(value):
+        return bool(value)
+    if is_integer(value) or is_float(value):
+        if np.isinf(value):
+            return "inf" if value > 0 else "-inf"
+        return written_number(value)
+    if isinstance(value, (datetime, date)):
+        ## Stored as a serial number with a date format, read back as a datetime
+        return from_excel(parse_number("%.16g" % to_excel(value)))
+    if isinstance(value, timedelta):
+        return written_number(value.total_seconds() / 86400)
+    text = str(value)[:32767]
+    ## openpyxl stores "=..." as a formula (read back empty) and "#N/A" as an error
+    if len(text) > 1 and text.startswith("="):
+        return ""
+    if text in ERROR_CODES:
+        return np.nan
+    return text
+
+
+def written_column(values: pd.Series) -> np.ndarray:
+    """Return the cell values pd.read_excel gets back for a column written by to_excel"""
+    kind = values.dtype.kind if isinstance(values.dtype, np.dtype) else "O"
+    if kind == "b":
+        return values.to_numpy().astype(object)
+    if kind in "iuf":
+        numbers = values.to_numpy()
+        cells = numbers.astype(object)
+        ## Integers below 1e16 are written ("%.16g") and read back exactly
+        exact = np.abs(numbers) < 1e16
+        if kind == "f":
+            exact &= numbers == np.floor(numbers)
+            cells[exact] = numbers[exact].astype(np.int64).astype(object)
+        inexact = np.flatnonzero(~exact)
+        cells[inexact] = [written_value(number) for number in numbers[inexact]]
+        return cells
+    cells = np.empty(len(values), dtype=object)
+    cells[:] = [written_value(value) for value in values]
+    return cells
+
+
+def written_frame(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Return the frame pd.read_excel gives for a sheet written by to_excel(index=False).
+
+    Every cell goes through the conversions pandas and openpyxl apply when
+    writing and reading it back, and the result is typed by the same parser
+    as read_xlsx, so the frame matches the one parsed from the written file.
+    """
+    header = [written_value(label) for label in data_frame.columns]
+    while header and header[-1] == "":
+        header.pop()
+    columns = [
+        written_column(data_frame.iloc[:, position])
+        for position in range(data_frame.shape[1])
+    ]
+
+    width, size = len(header), 0
+    for position, column in enumerate(columns):
+        filled = np.flatnonzero(column != "")
+        if len(filled):
+            width = max(width, position + 1)
+            size = max(size, filled[-1] + 1)
+    return build_frame((header, width, size, columns, None), None, None)
@@ -0,0 +1,287 @@
+import pandas as pd  # type: ignore
+import numpy as np  # type: ignore
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE  # type: ignore
+from openpyxl.utils.datetime import to_excel  # type: ignore
+from openpyxl.utils.exceptions import IllegalCharacterError  # type: ignore
+from pandas.api.types import is_bool, is_float, is_integer, is_scalar  # type: ignore
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+from xml.sax.saxutils import escape, quoteattr
+import os
+import zipfile
+
+from utils.coordinates import COLUMN_LETTERS
+
+## Rows turned into XML at once, the memory used does not grow past them
+CHUNK_ROWS = 10000
+
+## Styles of styles.xml: the number formats pandas gives dates and durations
+DATETIME_STYLE, DATE_STYLE, DAYS_STYLE = 1, 2, 3
+STYLE_IDS = (DATETIME_STYLE, DATE_STYLE, DAYS_STYLE)
+
+## Days between the Excel epoch (1899-12-30) and the Unix one
+EPOCH_DAYS = 25569
+DAY_MICROSECONDS = 86400 * 10**6
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    "</Types>"
+)
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<bookViews><workbookView activeTab="0"/></bookViews>'
+    '<sheets><sheet name={name} sheetId="1" r:id="rId1"/></sheets>'
+    "</workbook>"
+)
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    "</Relationships>"
+)
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="YYYY-MM-DD HH:MM:SS"/>'
+    '<numFmt numFmtId="165" formatCode="YYYY-MM-DD"/></numFmts>'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/>'
+    '<scheme val="minor"/></font></fonts>'
+    '<fills count="2"><fill><patternFill/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="1" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    "</cellXfs>"
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    "</styleSheet>"
+)
+SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    "{dimension}<sheetData>"
+)
+SHEET_END = "</sheetData></worksheet>"
+
+
+def number_body(number, style: int = 0) -> str:
+    """Return the XML of a numeric cell after its reference, written as openpyxl does ("%.16g")"""
+    style_attribute = f' s="{style}"' if style else ""
+    return f'{style_attribute} t="n"><v>{"%.16g" % number}</v></c>'
+
+
+def text_body(text: str) -> str:
+    """Return the XML of a text cell after its reference, with the formula and error texts openpyxl detects"""
+    text = text[:32767]
+    if ILLEGAL_CHARACTERS_RE.search(text):
+        raise IllegalCharacterError(f"{text} cannot be used in worksheets.")
+    if text == "":
+        return ""
+    if len(text) > 1 and text.startswith("="):
+        return f"><f>{escape(text[1:])}</f><v /></c>"
+    if text in ERROR_CODES:
+        return f' t="e"><v>{text}</v></c>'
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    text = escape(text).replace("\r", "&#13;")
+    return f' t="inlineStr"><is><t{space}>{text}</t></is></c>'
+
+
+def value_body(value, styles: tuple = STYLE_IDS) -> str:
+    """Return the XML after its reference of the cell to_excel writes for a value, empty for missing values.
+
+    styles are the ids of the (datetime, date, duration) cell styles.
+    """
+    ## What pandas hands to openpyxl (ExcelFormatter and ExcelWriter._value_with_fmt)
+    if is_scalar(value) and pd.isna(value):
+        return ""
+    if is_float(value) and np.isinf(value):
+        return text_body("inf" if value > 0 else "-inf")
+    if getattr(value, "tzinfo", None) is not None:
+        raise ValueError(
+            "Excel does not support datetimes with timezones. Please ensure that "
+            "datetimes are timezone unaware before writing to Excel."
+        )
+    if is_integer(value) or is_float(value) or isinstance(value, Decimal):
+        return number_body(value)
+    if is_bool(value):
+        return f' t="b"><v>{int(value)}</v></c>'
+    datetime_style, date_style, days_style = styles
+    if isinstance(value, datetime):
+        return number_body(to_excel(value), datetime_style)
+    if isinstance(value, date):
+        return number_body(to_excel(value), date_style)
+    if isinstance(value, timedelta):
+        return number_body(value.total_seconds() / 86400, days_style)
+    return text_body(str(value))
+
+
+def datetime_serials(values: np.ndarray) -> np.ndarray:
+    """Return the Excel serials of naive datetime64 values, computed as openpyxl's to_excel does"""
+    microseconds = values.astype("datetime64[us]").astype(np.int64)
+    days, rest = np.divmod(microseconds, DAY_MICROSECONDS)
+    days = days + EPOCH_DAYS
+    ## Excel counts the inexistent 1900-02-29, openpyxl shifts the days before it
+    days = np.where((days > 0) & (days <= 60), days - 1, days)
+    seconds, fraction = np.divmod(rest, 10**6)
+    return days + (seconds + fraction / 10**6) / 86400
+
+
+def column_bodies(values: pd.Series, styles: tuple = STYLE_IDS) -> list:
+    """Return the XML after their reference of the cells of a column (empty for missing values)"""
+    kind = values.dtype.kind if isinstance(values.dtype, np.dtype) else "O"
+    if kind == "b":
+        return [
+            f' t="b"><v>{int(value)}</v></c>' for value in values.to_numpy().tolist()
+        ]
+    if kind in "iu":
+        return [
+            f' t="n"><v>{"%.16g" % value}</v></c>'
+            for value in values.to_numpy().tolist()
+        ]
+    if kind == "f":
+        numbers = values.to_numpy()
+        bodies = [f' t="n"><v>{"%.16g" % value}</v></c>' for value in numbers.tolist()]
+        for position in np.flatnonzero(~np.isfinite(numbers)):
+            bodies[position] = value_body(numbers[position], styles)
+        return bodies
+    if kind == "M":
+        stamps = values.to_numpy()
+        bodies = [
+            number_body(serial, styles[0])
+            for serial in datetime_serials(stamps).tolist()
+        ]
+        for position in np.flatnonzero(np.isnat(stamps)):
+            bodies[position] = ""
+        return bodies
+    ## Texts repeat a lot in the bases, each one is converted once
+    texts: dict = {}
+    bodies = []
+    for value in values.tolist():
+        if type(value) is str:
+            body = texts.get(value)
+            if body is None:
+                body = texts[value] = text_body(value)
+        else:
+            body = value_body(value, styles)
+        bodies.append(body)
+    return bodies
+
+
+def row_xml(row: int, letters: np.ndarray, bodies: tuple) -> str:
+    """Return the XML of a row from the bodies of its cells, leaving the empty ones out"""
+    cells = "".join(
+        f'<c r="{letter}{row}"{body}' for letter, body in zip(letters, bodies) if body
+    )
+    return f'<row r="{row}">{cells}</row>'
+
+
+def sheet_start(shape: Optional[tuple] = None) -> str:
+    """Return the XML a sheet starts with, declaring its (rows, columns) shape when known"""
+    dimension = ""
+    if shape is not None:
+        rows, columns = shape
+        last = COLUMN_LETTERS[max(columns, 1) - 1]
+        dimension = f'<dimension ref="A1:{last}{max(rows, 1)}"/>'
+    return SHEET_START.format(dimension=dimension)
+
+
+def frame_xml(data_frame: pd.DataFrame, first_row: int, styles: tuple = STYLE_IDS):
+    """Yield the XML of the rows of a frame (without its index or header) CHUNK_ROWS rows at a time"""
+    for start in range(0, len(data_frame), CHUNK_ROWS):
+        chunk = data_frame.iloc[start : start + CHUNK_ROWS]
+        columns = [
+            column_bodies(chunk.iloc[:, position], styles)
+            for position in range(chunk.shape[1])
+        ]
+        row = first_row + start
+        yield "".join(
+            row_xml(number, COLUMN_LETTERS, bodies)
+            for number, bodies in zip(range(row, row + len(chunk)), zip(*columns))
+        )
+
+
+class SheetWriter:
+    """Write-only workbook of a single sheet, streamed to the file as the rows come.
+
+    DataFrame.to_excel builds an openpyxl cell for every value and keeps the
+    whole workbook in memory until it is saved. The writer turns CHUNK_ROWS
+    rows at a time into the sheet XML, column by column, and streams it into
+    the zip, so its memory does not grow with the rows written. The cells
+    are the ones to_excel(index=False) writes with openpyxl: numbers and
+    booleans as such, dates as serials with the pandas formats and texts
+    inline, so the workbook reads back the same (see xlsx_reader.written_frame).
+    """
+
+    def __init__(
+        self, file_path: str, sheet_name: str = "Sheet1", shape: Optional[tuple] = None
+    ):
+        self.file_path = file_path
+        self.row_number = 0
+        self.archive = zipfile.ZipFile(file_path, "w", zipfile.ZIP_DEFLATED)
+        self.archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        self.archive.writestr("_rels/.rels", ROOT_RELS)
+        self.archive.writestr(
+            "xl/workbook.xml", WORKBOOK.format(name=quoteattr(sheet_name))
+        )
+        self.archive.writestr("xl/_rels/workbook.xml.rels", WORKBOOK_RELS)
+        self.archive.writestr("xl/styles.xml", STYLES)
+        self.sheet = self.archive.open(
+            "xl/worksheets/sheet1.xml", "w", force_zip64=True
+        )
+        self.sheet.write(sheet_start(shape).encode())
+
+    def __enter__(self) -> "SheetWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+        if exc_type is not None and os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def write_row(self, values: list) -> None:
+        """Method to write a row of values, e.g. the header"""
+        self.row_number += 1
+        bodies = tuple(value_body(value) for value in values)
+        self.sheet.write(row_xml(self.row_number, COLUMN_LETTERS, bodies).encode())
+
+    def write_frame(self, data_frame: pd.DataFrame) -> None:
+        """Method to write the rows of a frame (without its index or header)"""
+        for xml in frame_xml(data_frame, self.row_number + 1):
+            self.sheet.write(xml.encode())
+        self.row_number += len(data_frame)
+
+    def close(self) -> None:
+        """Method to end the sheet and the workbook"""
+        if self.sheet is None:
+            return
+        self.sheet.write(SHEET_END.encode())
+        self.sheet.close()
+        self.archive.close()
+        self.sheet = None
+
+
+def write_xlsx(data_frame: pd.DataFrame, file_path: str, sheet_name="Sheet1") -> None:
+    """Write a frame as the only sheet of a workbook, like to_excel(index=False) in constant memory"""
+    with SheetWriter(
+        file_path, sheet_name, (len(data_frame) + 1, data_frame.shape[1])
+    ) as writer:
+        writer.write_row(list(data_frame.columns))
+        writer.write_frame(data_frame)